@@ -0,0 +1,50 @@
+"""Gunicorn settings for the combined API + dashboard deployment.
+
+    gunicorn -c config/gunicorn.conf.py src.wsgi:application
+
+Workers, threads and timeouts come from the environment. The master process
+starts one Streamlit sidecar before forking the workers and stops it on exit.
+Each worker and the sidecar open their own connection pool, so the database
+sees up to (WEB_CONCURRENCY + 1) * DB_POOL_MAX_SIZE connections.
+"""
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# WEB_CONCURRENCY is set by Heroku from the dyno size
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# gthread workers serve API requests from a thread pool; dashboard WebSockets
+# are relayed on each worker's event loop and hold no thread. The dashboard
+# proxy supports no other worker class.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Safe to preload: the connection pool is only opened on first use, inside a worker
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Set STREAMLIT_SIDECAR=false to serve the API only
+STREAMLIT_SIDECAR = os.environ.get('STREAMLIT_SIDECAR', 'true').lower() == 'true'
+
+
+def on_starting(server):
+    if STREAMLIT_SIDECAR:
+        from src.wsgi import check_worker_class, start_streamlit
+        try:
+            check_worker_class(server.cfg.worker_class)
+            start_streamlit()
+        except RuntimeError as e:
+            server.log.error(str(e))
+            sys.exit(1)
+
+
+def on_exit(server):
+    if STREAMLIT_SIDECAR:
+        from src.wsgi import stop_streamlit
+        stop_streamlit()
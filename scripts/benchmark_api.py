@@ -0,0 +1,234 @@
+"""Load-test every API route and check the results against a stored baseline.
+
+    python scripts/benchmark_api.py --scale 1 10 100 --output benchmarks/latest.json
+    python scripts/benchmark_api.py --baseline benchmarks/baseline.json
+
+For each scale the season files in data/ are copied with every player cloned
+that many times, the API is started on them, and each endpoint is measured on
+its own at every concurrency level. Results are printed and written as JSON.
+With --baseline, the run fails when an endpoint's throughput drops, or its p95
+latency grows, by more than --tolerance.
+
+The local backend (default) serves the files from memory. With
+--backend postgres the database at --database-url is dropped and reloaded
+from the files for every scale, so never point it at a database you need.
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+# Add the project root directory to the Python path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from measure_throughput import measure, summarize
+from compare_servers import free_port, server_commands, wait_until_ready
+from src.database import DATA_DIR, iter_json_records
+from src.schema import POSITIONS
+
+# Stored player ids are VARCHAR(10)
+MAX_PLAYERID_LENGTH = 10
+
+def scale_season_files(data_dir, dest, factor, seed=0):
+    """Write the season files to ``dest`` with every player cloned ``factor`` times.
+
+    The original keeps its id; clones get the id with a three-digit suffix and
+    stats scaled by a random factor between 0.8 and 1.2. Ranks are recomputed
+    from the new TotalPoints.
+    """
+    if factor > 1000:
+        raise ValueError("Scale factors above 1000 do not fit the player id column")
+    rng = random.Random(seed)
+    shutil.copy(os.path.join(data_dir, 'teams.json'), dest)
+    for position in POSITIONS.values():
+        stats = {source for column in position.stat_columns for source in column.sources}
+        stats.add('TotalPoints')
+        records = []
+        for record in iter_json_records(os.path.join(data_dir, position.filename)):
+            records.append(record)
+            for copy_number in range(1, factor):
+                clone = dict(record)
+                clone['PlayerId'] = f"{record['PlayerId']}{copy_number:03d}"
+                if len(clone['PlayerId']) > MAX_PLAYERID_LENGTH:
+                    raise ValueError(f"Player id {record['PlayerId']} is too long to clone")
+                clone['PlayerName'] = f"{record['PlayerName']} {copy_number}"
+                jitter = rng.uniform(0.8, 1.2)
+                for key in stats & clone.keys():
+                    if clone[key] not in (None, ''):
+                        value = float(clone[key]) * jitter
+                        clone[key] = f"{value:.2f}" if key == 'TotalPoints' else str(round(value))
+                records.append(clone)
+        records.sort(key=lambda record: -float(record.get('TotalPoints') or 0))
+        for rank, record in enumerate(records, 1):
+            record['Rank'] = rank
+        with open(os.path.join(dest, position.filename), 'w') as f:
+            json.dump(records, f)
+
+def endpoints(data_dir):
+    """{name: path or (path, JSON body)} covering every route of src/app.py"""
+    teams = list(iter_json_records(os.path.join(data_dir, 'teams.json')))
+    team = teams[0]['team_code']
+    qb = next(iter_json_records(os.path.join(data_dir, POSITIONS['QB'].filename)))
+    batch = {'requests': [
+        {'type': 'players', 'position': 'QB'},
+        {'type': 'players', 'position': 'RB', 'profile': 'half_ppr'},
+        {'type': 'team', 'team': team},
+        {'type': 'teams'},
+        {'type': 'player_ids', 'ids': [qb['PlayerId']]},
+        {'type': 'search', 'name': 'allen', 'limit': 5},
+    ]}
+    return {
+        'root': '/',
+        'health': '/api/health',
+        'teams': '/api/teams',
+        'players': '/api/players/WR',
+        'players_page': '/api/players/DB?limit=50&sort=tackles&fields=playername,team,tackles',
+        'players_profile': '/api/players/RB?profile=ppr&limit=25',
+        'team_players': f'/api/teams/{team}/players',
+        'team_players_profile': f'/api/teams/{team}/players?profile=half_ppr',
+        'search': '/api/search?name=allen',
+        'search_position': '/api/search?name=jo&position=WR&limit=10',
+        'batch': ('/api/batch', json.dumps(batch).encode('utf-8')),
+    }
+
+def seed_database(env):
+    """Drop and reload the database at env['DATABASE_URL'] from env['DATA_DIR']"""
+    subprocess.run([sys.executable, '-m', 'src.database', '--mode', 'copy', 'reset'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+def run_scale(factor, args, env):
+    """Result rows of every endpoint and concurrency level at one scale"""
+    rows = []
+    with tempfile.TemporaryDirectory(prefix=f'nfl-bench-{factor}x-') as data_dir:
+        scale_season_files(DATA_DIR, data_dir, factor, args.seed)
+        env = dict(env, DATA_DIR=data_dir)
+        if args.backend == 'postgres':
+            print(f"Seeding the database with {factor}x players...")
+            seed_database(env)
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        command = server_commands(port, args.workers)[args.server]
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url, process, timeout=300)
+            for name, path in endpoints(data_dir).items():
+                if args.endpoints and name not in args.endpoints:
+                    continue
+                # Warm the caches and search index before measuring
+                measure(base_url, [path], 2, 0.5)
+                for concurrency in args.concurrency:
+                    results = measure(base_url, [path], concurrency, args.duration)
+                    row = {'scale': factor, 'endpoint': name, 'concurrency': concurrency,
+                           'requests': results['requests'], 'errors': results['errors'],
+                           **summarize(results)}
+                    print_row(row)
+                    rows.append(row)
+        finally:
+            process.terminate()
+            process.wait(30)
+    return rows
+
+def print_row(row):
+    def ms(value):
+        return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+    print(f"{row['scale']:>5}x {row['endpoint']:<22} {row['concurrency']:>5} "
+          f"{row['throughput']:>9,.0f} {ms(row['p50_ms'])} {ms(row['p95_ms'])} "
+          f"{ms(row['p99_ms'])} {row['errors']:>6}")
+
+def find_regressions(rows, baseline, tolerance):
+    """Descriptions of rows that are worse than their baseline row by more than ``tolerance``"""
+    previous = {(row['scale'], row['endpoint'], row['concurrency']): row for row in baseline['results']}
+    regressions = []
+    for row in rows:
+        label = f"{row['endpoint']} at {row['scale']}x, {row['concurrency']} clients"
+        if row['errors']:
+            regressions.append(f"{label}: {row['errors']} failed requests")
+        base = previous.get((row['scale'], row['endpoint'], row['concurrency']))
+        if base is None:
+            continue
+        if row['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {row['throughput']:,.0f} req/s, "
+                               f"baseline {base['throughput']:,.0f} req/s")
+        if (row['p95_ms'] is not None and base['p95_ms'] is not None
+                and row['p95_ms'] > base['p95_ms'] * (1 + tolerance)):
+            regressions.append(f"{label}: p95 {row['p95_ms']:.1f}ms, baseline {base['p95_ms']:.1f}ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API endpoint and compare against a baseline")
+    parser.add_argument('--backend', choices=['local', 'postgres'], default='local',
+                        help="serve the files from memory, or from a database seeded with them")
+    parser.add_argument('--database-url',
+                        help="database dropped and reloaded for --backend postgres")
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1],
+                        help="players per original player, e.g. 1 10 100")
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                        help="endpoint to measure, repeatable (default: all)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16])
+    parser.add_argument('--duration', type=float, default=5, help="seconds per endpoint and level")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the scaled-up stats")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed fractional drop in throughput or growth in p95 (default: 0.2)")
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    # API only, without request logging
+    env.update({'STREAMLIT_SIDECAR': 'false', 'GUNICORN_ACCESS_LOG': '/dev/null',
+                'PYTHONPATH': ROOT, 'DATA_BACKEND': args.backend})
+    if args.backend == 'postgres':
+        if not args.database_url:
+            parser.error("--backend postgres needs --database-url; that database is dropped and reloaded")
+        env['DATABASE_URL'] = args.database_url
+
+    print(f"{args.server} server, {args.backend} backend, {args.workers} workers, "
+          f"{args.duration:g}s per endpoint and level")
+    print(f"{'scale':>6} {'endpoint':<22} {'conc':>5} {'req/s':>9} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    rows = []
+    for factor in args.scale:
+        rows += run_scale(factor, args, env)
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'server': args.server,
+        'backend': args.backend,
+        'workers': args.workers,
+        'duration': args.duration,
+        'results': rows,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for setting in ('server', 'backend', 'workers', 'duration'):
+            if baseline.get(setting) != results[setting]:
+                print(f"Warning: baseline {setting} is {baseline.get(setting)!r}, this run used {results[setting]!r}")
+        regressions = find_regressions(rows, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if any(row['errors'] for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
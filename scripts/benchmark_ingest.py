@@ -0,0 +1,139 @@
+"""Measure how fast each load mode ingests synthetic season files.
+
+    python scripts/benchmark_ingest.py --database-url postgresql://localhost/nfl_bench --players 50000 --seasons 3
+    python scripts/benchmark_ingest.py --database-url ... --data-dir /tmp/seasons --mode copy --workers 1 4
+
+Seasons are generated with scripts/generate_seasons.py, unless --data-dir
+points at directories it wrote before. For every mode and worker count, the
+tables at --database-url are dropped and recreated. A fresh process then loads
+each season in order, so the first season inserts and later ones mostly
+update. That database is wiped, so use a scratch one.
+
+The loader reaches Postgres through a local proxy that counts round trips,
+which adds a little latency to each one. --direct skips the proxy.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import psycopg2
+
+from compare_servers import LatencyProxy, proxied_url
+from generate_seasons import generate_seasons
+from src.database import DB_SSLMODE, LOAD_BATCH_SIZE, LOAD_MODES, LOAD_EXECUTORS, create_tables
+
+def ingest(season_dirs, mode, batch_size, workers, executor):
+    """Load every season in order; runs in its own process.
+
+    Returns (rows written, seconds, peak RSS in KB of this process and its workers).
+    """
+    # The loader reports every position; only the totals are wanted here
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    from src.database import connect, load_json_data
+
+    rows = 0
+    started = time.perf_counter()
+    for season_dir in season_dirs:
+        results = load_json_data(connect(), mode, batch_size, workers, executor, data_dir=season_dir)
+        rows += sum(result['rows'] for result in results)
+    elapsed = time.perf_counter() - started
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return rows, elapsed, peak
+
+def run(database_url, season_dirs, mode, batch_size, workers, executor, proxy):
+    conn = psycopg2.connect(database_url, sslmode=DB_SSLMODE)
+    try:
+        # Schema setup is not part of the measurement
+        sys.stdout, stdout = open(os.devnull, 'w'), sys.stdout
+        try:
+            create_tables(conn)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    finally:
+        conn.close()
+
+    if proxy is not None:
+        proxy.round_trips = 0
+    # A fresh interpreter per run, so peak RSS is this run's own
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        rows, elapsed, peak = pool.submit(ingest, season_dirs, mode, batch_size, workers, executor).result()
+    return {
+        'mode': mode, 'workers': workers, 'executor': executor, 'rows': rows, 'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else None,
+        'peak_rss_mb': peak / 1024,
+        'round_trips': proxy.round_trips if proxy is not None else None,
+    }
+
+def print_row(row):
+    round_trips = f"{row['round_trips']:>12,}" if row['round_trips'] is not None else f"{'-':>12}"
+    print(f"{row['mode']:<12} {row['workers']:>7} {row['rows']:>10,} {row['seconds']:>8.2f} "
+          f"{row['rows_per_sec']:>10,.0f} {row['peak_rss_mb']:>8.0f} {round_trips}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the season loader on synthetic data")
+    parser.add_argument('--database-url', required=True,
+                        help="scratch database; its tables are dropped and reloaded for every run")
+    parser.add_argument('--data-dir', help="parent of season directories from generate_seasons.py")
+    parser.add_argument('--players', type=int, default=50000, help="players per generated season")
+    parser.add_argument('--seasons', type=int, default=2, help="generated seasons, loaded in order")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', choices=LOAD_MODES, action='append', dest='modes',
+                        help="load mode to measure, repeatable (default: all)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4],
+                        help="position tables loaded concurrently")
+    parser.add_argument('--executor', choices=LOAD_EXECUTORS, default='thread')
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE)
+    parser.add_argument('--direct', action='store_true',
+                        help="connect straight to the database and skip counting round trips")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='nfl-ingest-') as tmp:
+        if args.data_dir:
+            season_dirs = sorted(os.path.join(args.data_dir, name) for name in os.listdir(args.data_dir)
+                                 if os.path.isdir(os.path.join(args.data_dir, name)))
+        else:
+            print(f"Generating {args.seasons} season(s) of {args.players:,} players...")
+            season_dirs = generate_seasons(tmp, args.players, args.seasons, seed=args.seed)
+        if not season_dirs:
+            parser.error(f"No season directories in {args.data_dir}")
+
+        proxy = None
+        if args.direct:
+            os.environ['DATABASE_URL'] = args.database_url
+        else:
+            proxy = LatencyProxy(None, 0)
+            os.environ['DATABASE_URL'], proxy.upstream = proxied_url(args.database_url, proxy.port)
+            proxy.start()
+
+        print(f"{len(season_dirs)} season(s), batch size {args.batch_size}, {args.executor} executor")
+        print(f"{'mode':<12} {'workers':>7} {'rows':>10} {'seconds':>8} {'rows/sec':>10} "
+              f"{'peak MB':>8} {'round trips':>12}")
+        rows = []
+        for mode in args.modes or LOAD_MODES:
+            for workers in args.workers:
+                row = run(args.database_url, season_dirs, mode, args.batch_size, workers,
+                          args.executor, proxy)
+                print_row(row)
+                rows.append(row)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'seasons': len(season_dirs), 'batch_size': args.batch_size, 'results': rows}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
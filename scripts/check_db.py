@@ -4,36 +4,37 @@ import os
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.database import get_db_connection
+from src.database import pooled_connection, close_pool
 
 def check_database_connection():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Test query
-        cur.execute("SELECT version();")
-        version = cur.fetchone()
-        print("Successfully connected to the database!")
-        print(f"PostgreSQL version: {version[0]}")
-        
-        # Test tables
-        cur.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public'
-        """)
-        tables = cur.fetchall()
-        print("\nAvailable tables:")
-        for table in tables:
-            print(f"- {table[0]}")
+        with pooled_connection() as conn:
+            cur = conn.cursor()
             
-        cur.close()
-        conn.close()
+            # Test query
+            cur.execute("SELECT version();")
+            version = cur.fetchone()
+            print("Successfully connected to the database!")
+            print(f"PostgreSQL version: {version[0]}")
+            
+            # Test tables
+            cur.execute("""
+                SELECT table_name 
+                FROM information_schema.tables 
+                WHERE table_schema = 'public'
+            """)
+            tables = cur.fetchall()
+            print("\nAvailable tables:")
+            for table in tables:
+                print(f"- {table[0]}")
+                
+            cur.close()
         return True
     except Exception as e:
         print(f"Error connecting to database: {e}")
         return False
+    finally:
+        close_pool()
 
 if __name__ == "__main__":
     check_database_connection() 
\ No newline at end of file
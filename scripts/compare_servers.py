@@ -0,0 +1,177 @@
+"""Benchmark the Flask/gunicorn API against the asyncio/uvicorn one, side by side.
+
+    python scripts/compare_servers.py --db-latency-ms 20 --concurrency 16 64 256
+
+Each server is started in turn with the same number of workers and pool size,
+then measured with scripts/measure_throughput.py at every concurrency level.
+With --db-latency-ms, both reach the database through a local proxy that
+delays every packet, imitating a remote host such as RDS.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+import urllib.request
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+# Add the project root directory to the Python path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from measure_throughput import DEFAULT_PATHS, measure, summarize
+from src.database import DATABASE_URL
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def server_commands(port, workers):
+    """{name: command} of the servers being compared"""
+    return {
+        'flask': [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'config', 'gunicorn.conf.py'),
+                  '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'src.app:app'],
+        'asgi': [sys.executable, '-m', 'uvicorn', 'src.asgi:app', '--host', '127.0.0.1',
+                 '--port', str(port), '--workers', str(workers), '--no-access-log'],
+    }
+
+class LatencyProxy:
+    """TCP proxy that delays each chunk by ``delay`` seconds in each direction.
+
+    ``round_trips`` counts the times a server replied after the client sent
+    something, summed over every proxied connection.
+    """
+
+    def __init__(self, upstream, delay):
+        # (host, port), or the path of a Unix socket
+        self.upstream = upstream
+        self.delay = delay
+        self.port = free_port()
+        self.round_trips = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, '127.0.0.1', self.port), self._loop
+        ).result()
+        return self
+
+    async def _handle(self, client_reader, client_writer):
+        if isinstance(self.upstream, str):
+            reader, writer = await asyncio.open_unix_connection(self.upstream)
+        else:
+            reader, writer = await asyncio.open_connection(*self.upstream)
+        # Whether the client has sent anything since the server last replied
+        waiting = [False]
+        await asyncio.gather(self._pipe(client_reader, writer, waiting, True),
+                             self._pipe(reader, client_writer, waiting, False))
+
+    async def _pipe(self, reader, writer, waiting, from_client):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if from_client:
+                    waiting[0] = True
+                elif waiting[0]:
+                    waiting[0] = False
+                    self.round_trips += 1
+                # Timers with the same delay fire in order, so the stream stays intact
+                loop.call_later(self.delay, writer.write, data)
+        finally:
+            loop.call_later(self.delay, writer.close)
+
+def proxied_url(database_url, port):
+    """``database_url`` pointed at the proxy, and the address the proxy forwards to"""
+    url = urlparse(database_url)
+    query = parse_qs(url.query)
+    socket_dir = query.pop('host', [None])[0]
+    if url.hostname is None and socket_dir is None:
+        socket_dir = '/var/run/postgresql'
+    if socket_dir is not None and socket_dir.startswith('/'):
+        upstream = os.path.join(socket_dir, f".s.PGSQL.{url.port or 5432}")
+    else:
+        upstream = (socket_dir or url.hostname, url.port or 5432)
+    credentials = url.netloc.rpartition('@')[0]
+    netloc = f"{credentials}@127.0.0.1:{port}" if credentials else f"127.0.0.1:{port}"
+    return urlunparse(url._replace(netloc=netloc, query=urlencode(query, doseq=True))), upstream
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"Server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + '/api/health', timeout=5) as response:
+                response.read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise Exception(f"Server at {base_url} did not become ready in {timeout}s")
+
+def run_server(name, command, env, base_url, paths, levels, duration):
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(base_url, process)
+        # Warm the caches and search index before measuring
+        measure(base_url, paths, 4, 1)
+        rows = []
+        for concurrency in levels:
+            results = measure(base_url, paths, concurrency, duration)
+            summary = summarize(results)
+            rows.append((name, concurrency, results['errors'], summary))
+            print(f"{name:<6} {concurrency:>6} {summary['throughput']:>10,.0f} "
+                  f"{summary['mean_ms'] or 0:>10.1f} {summary['p95_ms'] or 0:>10.1f} {results['errors']:>7}")
+        return rows
+    finally:
+        process.terminate()
+        process.wait(30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Flask and ASGI servers under the same load")
+    parser.add_argument('--server', choices=['flask', 'asgi'], action='append', dest='servers',
+                        help="server to measure, repeatable (default: both)")
+    parser.add_argument('--path', action='append', dest='paths',
+                        help=f"path to request, repeatable (default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--db-latency-ms', type=float, default=0,
+                        help="added delay each way between the servers and the database")
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    # API only, without request logging, so both servers do the same work
+    env.update({'STREAMLIT_SIDECAR': 'false', 'GUNICORN_ACCESS_LOG': '/dev/null',
+                'PYTHONPATH': ROOT})
+    if args.db_latency_ms:
+        proxy = LatencyProxy(None, args.db_latency_ms / 1000)
+        env['DATABASE_URL'], proxy.upstream = proxied_url(DATABASE_URL, proxy.port)
+        proxy.start()
+        print(f"Database reached through a proxy adding {args.db_latency_ms:g}ms each way")
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    paths = args.paths or DEFAULT_PATHS
+    commands = server_commands(port, args.workers)
+    print(f"{args.workers} workers per server, {args.duration:.0f}s per level")
+    print(f"{'server':<6} {'conc':>6} {'req/s':>10} {'mean ms':>10} {'p95 ms':>10} {'errors':>7}")
+    errors = 0
+    for name in args.servers or list(commands):
+        for _, _, failed, _ in run_server(name, commands[name], env, base_url, paths,
+                                          args.concurrency, args.duration):
+            errors += failed
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Write synthetic season files for load testing.
+
+    python scripts/generate_seasons.py /tmp/seasons --players 50000 --seasons 3
+
+Each season is a directory (``<dest>/2022``, ``<dest>/2023``, ...) with
+teams.json and one file per position, in the same shape as the files in
+data/. Every key a position's schema reads is present, including the kicker
+``FgMade_*``/``FgMiss_*`` ranges, with empty strings for zeros as in the real
+files. Players are split across positions in the real proportions. Most carry
+over to the next season, with a new stat line and sometimes a new team; the
+rest retire and are replaced by rookies with new ids. TotalPoints and Rank
+come from the installed scoring profile, the IDP profile for defenders, or
+field goals and extra points for kickers.
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import numpy as np
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DATA_DIR, iter_json_records
+from src.schema import POSITIONS
+from src.scoring import PROFILES, ScoringProfile, get_profile
+
+# Share of players at each position, as in the 2024 files
+POSITION_SHARES = {'QB': 0.053, 'RB': 0.091, 'WR': 0.166, 'TE': 0.082,
+                   'LB': 0.162, 'DL': 0.188, 'DB': 0.238, 'K': 0.020}
+
+OFFENSE_KEYS = ('PassingYDS', 'PassingTD', 'PassingInt', 'RushingYDS', 'RushingTD',
+                'ReceivingRec', 'ReceivingYDS', 'ReceivingTD', 'RetTD', 'FumTD', '2PT', 'Fum',
+                'FanPtsAgainst-pts', 'TouchCarries', 'TouchReceptions', 'Touches',
+                'TargetsReceptions', 'Targets', 'ReceptionPercentage', 'RzTarget', 'RzTouch', 'RzG2G')
+DEFENSE_KEYS = ('TacklesTot', 'TacklesAst', 'TacklesSck', 'TacklesTfl', 'TurnoverInt',
+                'TurnoverFrcFum', 'TurnoverFumRec', 'ScoreIntTd', 'ScoreFumTd', 'ScoreBlkTd',
+                'ScoreSaf', 'ScoreDef2ptRet', 'Blk', 'PDef', 'QBHit', 'ReturnIntYds', 'ReturnFumYds')
+KICKER_KEYS = ('PatMade', 'PatMissed', 'FgMade_0-19', 'FgMade_20-29', 'FgMade_30-39',
+               'FgMade_40-49', 'FgMade_50', 'FgMiss_0-19', 'FgMiss_20-29', 'FgMiss_30-39')
+
+# Season totals of a top player; others get a fraction of them
+CEILINGS = {
+    'QB': {'PassingYDS': 5000, 'PassingTD': 45, 'PassingInt': 18, 'RushingYDS': 900, 'RushingTD': 10,
+           '2PT': 2, 'Fum': 12, 'TouchCarries': 140, 'RzTouch': 15, 'RzG2G': 8},
+    'RB': {'RushingYDS': 1900, 'RushingTD': 18, 'ReceivingRec': 80, 'ReceivingYDS': 700,
+           'ReceivingTD': 6, 'RetTD': 1, 'Fum': 6, 'TouchCarries': 350, 'Targets': 100,
+           'RzTarget': 12, 'RzTouch': 60, 'RzG2G': 25},
+    'WR': {'RushingYDS': 100, 'ReceivingRec': 125, 'ReceivingYDS': 1700, 'ReceivingTD': 16,
+           'RetTD': 1, 'Fum': 4, 'TouchCarries': 10, 'Targets': 170, 'RzTarget': 25, 'RzTouch': 8, 'RzG2G': 12},
+    'TE': {'ReceivingRec': 110, 'ReceivingYDS': 1200, 'ReceivingTD': 12, 'Fum': 3,
+           'Targets': 140, 'RzTarget': 22, 'RzTouch': 6, 'RzG2G': 10},
+    'LB': {'TacklesTot': 160, 'TacklesAst': 80, 'TacklesSck': 10, 'TacklesTfl': 15, 'TurnoverInt': 3,
+           'TurnoverFrcFum': 4, 'TurnoverFumRec': 2, 'ScoreIntTd': 1, 'Blk': 1, 'PDef': 8,
+           'QBHit': 15, 'ReturnIntYds': 60, 'ReturnFumYds': 20},
+    'DL': {'TacklesTot': 70, 'TacklesAst': 35, 'TacklesSck': 17, 'TacklesTfl': 20, 'TurnoverInt': 1,
+           'TurnoverFrcFum': 5, 'TurnoverFumRec': 2, 'ScoreFumTd': 1, 'ScoreSaf': 1, 'Blk': 2,
+           'PDef': 5, 'QBHit': 35, 'ReturnFumYds': 20},
+    'DB': {'TacklesTot': 120, 'TacklesAst': 50, 'TacklesSck': 3, 'TacklesTfl': 8, 'TurnoverInt': 8,
+           'TurnoverFrcFum': 3, 'TurnoverFumRec': 2, 'ScoreIntTd': 2, 'Blk': 1, 'PDef': 20,
+           'QBHit': 5, 'ReturnIntYds': 150, 'ReturnFumYds': 30},
+    'K': {'PatMade': 55, 'PatMissed': 4, 'FgMade_0-19': 2, 'FgMade_20-29': 12, 'FgMade_30-39': 14,
+          'FgMade_40-49': 12, 'FgMade_50': 10, 'FgMiss_0-19': 1, 'FgMiss_20-29': 2, 'FgMiss_30-39': 3},
+}
+
+FIRST_NAMES = ('Josh', 'Lamar', 'Patrick', 'Justin', 'Joe', 'Jalen', 'Derrick', 'Saquon', 'Christian',
+               'Bijan', 'Tyreek', 'CeeDee', 'Amon-Ra', 'Travis', 'George', 'Sam', 'Micah', 'Fred',
+               'Roquan', 'Budda', 'Kyle', 'Trey', 'Aaron', 'Chris', 'Brandon', 'Harrison', 'Marcus',
+               'Jordan', 'Devon', 'Malik', 'Tee', 'DeVonta', 'Brock', 'Ja\'Marr', 'Puka', 'Nick')
+LAST_NAMES = ('Allen', 'Jackson', 'Mahomes', 'Herbert', 'Burrow', 'Hurts', 'Henry', 'Barkley',
+              'McCaffrey', 'Robinson', 'Hill', 'Lamb', 'Brown', 'Kelce', 'Kittle', 'Hubbard',
+              'Parsons', 'Warner', 'Smith', 'Baker', 'Hamilton', 'Hendrickson', 'Donald', 'Boswell',
+              'Johnson', 'Williams', 'Davis', 'Moore', 'Taylor', 'Thomas', 'Harris', 'Walker',
+              'Nacua', 'Chase', 'Higgins', 'Bosa')
+
+# No built-in profile scores kickers; their synthetic points count field goals and extra points
+KICKER_SCORING = ScoringProfile('kicker', {'K': {'fieldgoals': 3, 'extrapoints': 1}})
+
+# Chance that a player retires, or changes teams, between seasons
+RETIRE_RATE = 0.12
+TRADE_RATE = 0.10
+
+class Roster:
+    """Players of every position, carried from one season to the next"""
+
+    def __init__(self, players, team_codes, rng):
+        self.rng = rng
+        self.team_codes = team_codes
+        self.next_id = 2500000
+        self.players = {code: [self.rookie() for _ in range(max(1, round(players * share)))]
+                        for code, share in POSITION_SHARES.items()}
+
+    def rookie(self):
+        rng = self.rng
+        self.next_id += rng.randint(1, 9)
+        return {
+            'PlayerId': str(self.next_id),
+            'PlayerName': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'Team': rng.choice(self.team_codes),
+            # Most players see little of the field; a few are stars
+            'talent': rng.betavariate(1.1, 3.5),
+        }
+
+    def next_season(self):
+        rng = self.rng
+        for code, players in self.players.items():
+            for i, player in enumerate(players):
+                if rng.random() < RETIRE_RATE:
+                    players[i] = self.rookie()
+                    continue
+                player['talent'] = min(1.0, player['talent'] * rng.uniform(0.8, 1.2))
+                if rng.random() < TRADE_RATE:
+                    player['Team'] = rng.choice(self.team_codes)
+
+def _count(value):
+    return str(value) if value else ''
+
+def stat_line(code, talent, rng):
+    """Season-file stats of one player, as strings"""
+    ceilings = CEILINGS[code]
+    keys = OFFENSE_KEYS if code in ('QB', 'RB', 'WR', 'TE') else KICKER_KEYS if code == 'K' else DEFENSE_KEYS
+    stats = {}
+    for key in keys:
+        value = ceilings.get(key, 0) * talent * rng.uniform(0.6, 1.2)
+        if key == 'TacklesSck':
+            # Sacks are shared in halves
+            stats[key] = f"{round(value * 2) / 2:g}" if value >= 0.25 else ''
+        else:
+            stats[key] = _count(round(value))
+    if code in ('QB', 'RB', 'WR', 'TE'):
+        receptions = int(stats['ReceivingRec'] or 0)
+        targets = max(receptions, int(stats['Targets'] or 0))
+        carries = int(stats['TouchCarries'] or 0)
+        stats['Targets'] = _count(targets)
+        stats['TouchReceptions'] = stats['TargetsReceptions'] = _count(receptions)
+        stats['Touches'] = _count(carries + receptions)
+        stats['ReceptionPercentage'] = _count(round(100 * receptions / targets) if targets else 0)
+        stats['FanPtsAgainst-pts'] = f"{rng.uniform(10, 35):.2f}"
+    return stats
+
+def score(code, records):
+    """Set TotalPoints and Rank of a position's records, best first"""
+    position = POSITIONS[code]
+    profile = next(profile for profile in (get_profile(), PROFILES['idp'], KICKER_SCORING)
+                   if profile.scores(code))
+    rows = [position.convert(record) for record in records]
+    columns = {name: np.array([row[i] for row in rows], dtype=np.float64)
+               for i, name in enumerate(position.column_names) if name in position.numeric_columns}
+    points = profile.points(code, columns)
+    for record, value in zip(records, points.tolist()):
+        record['TotalPoints'] = f"{value:.2f}"
+    order = np.argsort(-points, kind='stable')
+    records[:] = [records[i] for i in order]
+    for rank, record in enumerate(records, 1):
+        record['Rank'] = rank
+
+def write_records(path, records, ndjson=False):
+    with open(path, 'w') as f:
+        if ndjson:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            return
+        f.write('[')
+        for i, record in enumerate(records):
+            f.write((',' if i else '') + json.dumps(record))
+        f.write(']')
+
+def generate_seasons(dest, players, seasons=1, last_season=2024, seed=0, ndjson=False, data_dir=DATA_DIR):
+    """Write ``seasons`` season directories under ``dest`` with ``players`` players each.
+
+    Returns the directories, oldest first.
+    """
+    rng = random.Random(seed)
+    teams_path = os.path.join(data_dir, 'teams.json')
+    team_codes = [team['team_code'] for team in iter_json_records(teams_path)]
+    roster = Roster(players, team_codes, rng)
+    directories = []
+    for season in range(last_season - seasons + 1, last_season + 1):
+        if directories:
+            roster.next_season()
+        directory = os.path.join(dest, str(season))
+        os.makedirs(directory, exist_ok=True)
+        shutil.copy(teams_path, directory)
+        for code, position in POSITIONS.items():
+            records = [{
+                'PlayerName': player['PlayerName'],
+                'PlayerId': player['PlayerId'],
+                'Pos': code,
+                'Team': player['Team'],
+                **stat_line(code, player['talent'], rng),
+            } for player in roster.players[code]]
+            score(code, records)
+            write_records(os.path.join(directory, position.filename), records, ndjson)
+        directories.append(directory)
+    return directories
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic season files for load testing")
+    parser.add_argument('dest', help="directory to write one subdirectory per season into")
+    parser.add_argument('--players', type=int, default=2600, help="players per season, over all positions")
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--last-season', type=int, default=2024)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ndjson', action='store_true', help="write newline-delimited JSON instead of arrays")
+    args = parser.parse_args()
+
+    for directory in generate_seasons(args.dest, args.players, args.seasons, args.last_season,
+                                      args.seed, args.ndjson):
+        print(f"Wrote {directory}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import sys
+import math
+import time
+import argparse
+import threading
+import urllib.request
+import urllib.error
+
+DEFAULT_PATHS = ['/api/teams', '/api/players/QB', '/api/teams/KC/players', '/api/search?name=allen']
+
+def build_request(base_url, path):
+    """GET ``path``, or POST a JSON body when given a (path, body bytes) pair"""
+    if isinstance(path, tuple):
+        path, body = path
+        return urllib.request.Request(base_url + path, data=body,
+                                      headers={'Content-Type': 'application/json'})
+    return base_url + path
+
+def worker(base_url, paths, deadline, results, lock):
+    count = errors = 0
+    latencies = []
+    i = 0
+    while time.perf_counter() < deadline:
+        request = build_request(base_url, paths[i % len(paths)])
+        i += 1
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            count += 1
+            latencies.append(time.perf_counter() - started)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    with lock:
+        results['requests'] += count
+        results['errors'] += errors
+        results['latencies'].extend(latencies)
+
+def measure(base_url, paths, concurrency, duration):
+    """Hit ``paths`` round-robin from ``concurrency`` threads for ``duration`` seconds"""
+    results = {'requests': 0, 'errors': 0, 'latencies': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, paths, deadline, results, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results['seconds'] = time.perf_counter() - started
+    return results
+
+def percentile(latencies, fraction):
+    """Nearest-rank percentile of sorted ``latencies``"""
+    return latencies[max(math.ceil(len(latencies) * fraction) - 1, 0)]
+
+def summarize(results):
+    """Throughput (req/s), mean and p50/p95/p99 latency (ms) of a ``measure`` run"""
+    latencies = sorted(results['latencies'])
+    summary = {'throughput': results['requests'] / results['seconds'], 'mean_ms': None,
+               'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    if latencies:
+        summary['mean_ms'] = sum(latencies) / len(latencies) * 1000
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            summary[name] = percentile(latencies, fraction) * 1000
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput of a running deployment")
+    parser.add_argument('base_url', nargs='?', default='http://127.0.0.1:5000')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help=f"path to request, repeatable (default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"Measuring {args.base_url} with {args.concurrency} clients for {args.duration:.0f}s...")
+    results = measure(args.base_url.rstrip('/'), paths, args.concurrency, args.duration)
+
+    summary = summarize(results)
+    print(f"Requests: {results['requests']}, errors: {results['errors']}")
+    print(f"Throughput: {summary['throughput']:,.0f} req/s")
+    if summary['mean_ms'] is not None:
+        print(f"Latency: mean {summary['mean_ms']:.1f}ms, p50 {summary['p50_ms']:.1f}ms, "
+              f"p95 {summary['p95_ms']:.1f}ms, p99 {summary['p99_ms']:.1f}ms")
+    return 1 if results['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,10 +4,12 @@ import os
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.database import get_db_connection
+from src.database import get_pool, close_pool, bump_data_version, refresh_all_players
+from src.scoring import refresh_profile_points
 
 def test_procedures():
-    conn = get_db_connection()
+    pool = get_pool()
+    conn = pool.getconn()
     cur = conn.cursor()
     
     try:
@@ -42,6 +44,9 @@ def test_procedures():
         except Exception as e:
             print(f"Rank validation worked! Error: {str(e)}")
 
+        refresh_profile_points(cur, ['QB'])
+        refresh_all_players(cur)
+        bump_data_version(cur)
         conn.commit()
         print("\nAll tests completed successfully!")
         
@@ -50,7 +55,8 @@ def test_procedures():
         conn.rollback()
     finally:
         cur.close()
-        conn.close()
+        pool.putconn(conn)
+        close_pool()
 
 if __name__ == '__main__':
     test_procedures() 
\ No newline at end of file
@@ -1,13 +1,26 @@
-from flask import Flask, jsonify, request, Blueprint
+from flask import Flask, jsonify, request, Blueprint, Response, json
 from flask_cors import CORS
-from src.database import get_db_connection
+from src.database import get_pool, get_data_version, get_readiness, PoolTimeout
+from src.instrumentation import (
+    METRICS, CONTENT_TYPE, SERVER_TIMING, start_request, finish_request, serializing
+)
+from src.schema import POSITIONS, POSITION_CODES, ALL_PLAYERS_VIEW, PYTHON_TYPES
+from src.search import PlayerSearchIndex
+from src.serialization import JSON, dumps, dumps_rows, negotiate, encode
 import psycopg2
-from functools import wraps
+from functools import wraps, lru_cache
 import time
+import math
 import os
 import logging
-from decimal import Decimal
 import traceback
+import hashlib
+import base64
+from urllib.parse import urlencode
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 
 # Configure logging
 logging.basicConfig(
@@ -21,21 +34,28 @@ api = Blueprint('api', __name__, url_prefix='/api')
 app = Flask(__name__)
 CORS(app)
 
-# Custom JSON encoder to handle Decimal types
-class CustomJSONEncoder(Flask.json_encoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
+@app.before_request
+def start_request_timing():
+    start_request()
 
-app.json_encoder = CustomJSONEncoder
+@app.after_request
+def add_server_timing(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    stats = finish_request(request.method, endpoint, response.status_code)
+    if stats is not None and SERVER_TIMING:
+        response.headers['Server-Timing'] = stats.server_timing()
+    return response
 
 # Error handling middleware
 @app.errorhandler(Exception)
 def handle_error(error):
     logger.error(f"An error occurred: {str(error)}")
     logger.error(traceback.format_exc())
-    
+    response, status_code = error_payload(error)
+    return jsonify(response), status_code
+
+def error_payload(error):
+    """JSON body and status for an unhandled exception, also used by src.asgi"""
     status_code = 500
     if hasattr(error, 'code'):
         status_code = error.code
@@ -51,158 +71,694 @@ def handle_error(error):
             'message': 'An unexpected error occurred. Please try again later.'
         }
     
-    return jsonify(response), status_code
+    return response, status_code
+
+# Every player of every position, used to build the search index
+SEARCH_PLAYERS_SQL = (
+    f"SELECT position, playerid, playername, team, totalpoints, rank FROM {ALL_PLAYERS_VIEW}"
+)
+
+TEAMS_SQL = """
+    SELECT team_code, team_name, division
+    FROM teams
+    ORDER BY division, team_name
+"""
+
+# Offensive skill players of several teams (a list of team codes is the parameter)
+TEAM_PLAYERS_SQL = f"""
+    SELECT position, playerid, playername, team, yards, touchdowns, totalpoints, rank
+    FROM {ALL_PLAYERS_VIEW}
+    WHERE team = ANY(%s) AND position IN ('QB', 'RB', 'WR', 'TE')
+    ORDER BY totalpoints DESC, playerid
+"""
+
+# The same, scored by the profile named by the second parameter
+PROFILE_TEAM_PLAYERS_SQL = f"""
+    SELECT p.position, p.playerid, p.playername, p.team, p.yards, p.touchdowns,
+           pp.points AS totalpoints, pp.rank
+    FROM {ALL_PLAYERS_VIEW} p
+    JOIN profile_points pp ON pp.position = p.position AND pp.playerid = p.playerid
+    JOIN scoring_profiles sp ON sp.id = pp.profile_id
+    WHERE p.team = ANY(%s) AND p.position IN ('QB', 'RB', 'WR', 'TE') AND sp.name = %s
+    ORDER BY pp.points DESC, p.playerid
+"""
+
+# Players of any position by id (a list of ids is the parameter)
+PLAYERS_BY_ID_SQL = f"""
+    SELECT position, playerid, playername, team, yards, touchdowns, totalpoints, rank
+    FROM {ALL_PLAYERS_VIEW}
+    WHERE playerid = ANY(%s)
+    ORDER BY totalpoints DESC, playerid
+"""
+
+PROFILE_NAMES_SQL = "SELECT name FROM scoring_profiles ORDER BY id"
 
 # Database connection decorator
 def with_db_connection(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        pool = get_pool()
         conn = None
         try:
-            conn = get_db_connection()
+            conn = pool.getconn()
             return f(conn, *args, **kwargs)
         except Exception as e:
             logger.error(f"Database error in {f.__name__}: {str(e)}")
             raise
         finally:
             if conn:
-                conn.close()
+                pool.putconn(conn)
     return decorated_function
 
-# API Routes - all under /api prefix
-@api.route('/health')
-@with_db_connection
-def health_check(conn):
-    try:
+# Seconds between data version checks against the database
+DATA_VERSION_CHECK_INTERVAL = float(os.environ.get('DATA_VERSION_CHECK_INTERVAL', 1))
+# Serialized responses kept in memory, and for how long
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 64))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+# Page size limits for /api/players/<position>?limit=
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 25))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+PAGE_PARAMS = ('limit', 'cursor', 'sort', 'order', 'fields')
+# Sub-requests accepted by /api/batch, and the threads fetching uncached positions
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 100))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+# Seconds a readiness result is reused, and how long the check waits for a pooled connection
+READINESS_CHECK_INTERVAL = float(os.environ.get('READINESS_CHECK_INTERVAL', 2))
+READINESS_POOL_TIMEOUT = float(os.environ.get('READINESS_POOL_TIMEOUT', 1))
+# Replica lag and data version age beyond which the instance is not ready (0: no limit)
+READY_MAX_REPLICATION_LAG = float(os.environ.get('READY_MAX_REPLICATION_LAG', 30))
+READY_MAX_DATA_AGE = float(os.environ.get('READY_MAX_DATA_AGE', 0))
+# Where API data is read from: 'postgres', or 'local' to serve the season files from memory
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'postgres').lower()
+
+# NUMERIC values are read as floats rather than Decimals, so they serialize natively
+DECIMAL_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, 'DECIMAL_AS_FLOAT',
+    lambda value, cur: float(value) if value is not None else None
+)
+
+def api_cursor(conn):
+    """A cursor reading NUMERIC as float; the caster applies to this cursor only"""
+    cur = conn.cursor()
+    psycopg2.extensions.register_type(DECIMAL_AS_FLOAT, cur)
+    return cur
+
+def fetch_dicts(cur):
+    columns = [desc[0] for desc in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+def group_by_team(players):
+    teams = {}
+    for player in players:
+        teams.setdefault(player['team'], []).append(player)
+    return teams
+
+class PostgresBackend:
+    """API data read from Postgres through the connection pool.
+
+    ``src.local_store.LocalStore`` provides the same methods without a database.
+    """
+
+    @staticmethod
+    @with_db_connection
+    def data_version(conn):
+        cur = conn.cursor()
+        try:
+            return get_data_version(cur)
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def health(conn):
         cur = conn.cursor()
         cur.execute('SELECT 1')
         cur.close()
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected'
-        })
+        return {'status': 'healthy', 'database': 'connected'}
+
+    @staticmethod
+    def readiness():
+        """(database facts, pool stats) for the readiness check"""
+        pool = get_pool()
+        # A saturated pool fails the check quickly instead of queueing behind requests
+        with pool.connection(READINESS_POOL_TIMEOUT) as conn:
+            cur = conn.cursor()
+            try:
+                facts = get_readiness(cur)
+            finally:
+                cur.close()
+        return facts, pool.stats()
+
+    @staticmethod
+    @with_db_connection
+    def profile_names(conn):
+        """Names of the stored scoring profiles"""
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT to_regclass('scoring_profiles') IS NOT NULL")
+            if not cur.fetchone()[0]:
+                return []
+            cur.execute(PROFILE_NAMES_SQL)
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def players(conn, position, profile=None):
+        """Every player of a position ordered by rank, scored by ``profile`` if given: (columns, rows)"""
+        schema = POSITIONS[position]
+        cur = api_cursor(conn)
+        try:
+            if profile:
+                cur.execute(schema.profile_select_sql, (profile,))
+            else:
+                cur.execute(schema.select_sql)
+            return [desc[0] for desc in cur.description], cur.fetchall()
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def players_page(conn, position, fields, sort, descending, after, limit, profile=None):
+        """Up to ``limit`` players after the ``(sort value, playerid)`` pair: (columns, rows)"""
+        query, params = POSITIONS[position].page_query(fields, sort, descending, after, limit, profile)
+        cur = api_cursor(conn)
+        try:
+            cur.execute(query, params)
+            return [desc[0] for desc in cur.description], cur.fetchall()
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def teams(conn):
+        cur = api_cursor(conn)
+        try:
+            cur.execute(TEAMS_SQL)
+            return fetch_dicts(cur)
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def team_players(conn, team_code, profile=None):
+        """Offensive skill players of the team, from the all_players view"""
+        return PostgresBackend._team_players(conn, [team_code], profile).get(team_code, [])
+
+    @staticmethod
+    @with_db_connection
+    def teams_players(conn, team_codes, profile=None):
+        """{team code: players} for several teams, read in one query"""
+        return PostgresBackend._team_players(conn, team_codes, profile)
+
+    @staticmethod
+    def _team_players(conn, team_codes, profile):
+        cur = api_cursor(conn)
+        try:
+            if profile:
+                cur.execute(PROFILE_TEAM_PLAYERS_SQL, (list(team_codes), profile))
+            else:
+                cur.execute(TEAM_PLAYERS_SQL, (list(team_codes),))
+            return group_by_team(fetch_dicts(cur))
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def players_by_id(conn, playerids):
+        """Players of any position by id, from the all_players view"""
+        cur = api_cursor(conn)
+        try:
+            cur.execute(PLAYERS_BY_ID_SQL, (list(playerids),))
+            return fetch_dicts(cur)
+        finally:
+            cur.close()
+
+    @staticmethod
+    @with_db_connection
+    def all_players(conn):
+        """Every player of every position, used to build the search index"""
+        cur = api_cursor(conn)
+        try:
+            cur.execute(SEARCH_PLAYERS_SQL)
+            return fetch_dicts(cur)
+        finally:
+            cur.close()
+
+def create_backend(name=DATA_BACKEND):
+    if name == 'local':
+        # Imported here so the Postgres deployment does not need NumPy
+        from src.local_store import LocalStore
+        return LocalStore()
+    if name != 'postgres':
+        raise ValueError(f"Unknown DATA_BACKEND {name!r}, expected postgres or local")
+    return PostgresBackend()
+
+backend = create_backend()
+
+class DataVersion:
+    """Data version published by the loader, re-read at most once per interval"""
+
+    def __init__(self, interval=DATA_VERSION_CHECK_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._version = self._fetch()
+                self._checked_at = now
+            return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = None
+
+    @staticmethod
+    def _fetch():
+        return backend.data_version()
+
+class CachedResponse:
+    """Serialized JSON response body with its validator and extra headers"""
+
+    def __init__(self, body, version, headers=None):
+        self.body = body
+        self.version = version
+        self.headers = headers or {}
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.stored_at = time.monotonic()
+        self._variants = {}
+
+    def variant(self, media_type, encoding):
+        """(body, content encoding, etag) in another format, converted once per entry"""
+        key = (media_type, encoding)
+        if key not in self._variants:
+            with serializing():
+                body, applied = encode(self.body, media_type, encoding)
+            # Every representation needs its own strong validator
+            suffixes = [] if media_type == JSON else [media_type.split('/')[-1]]
+            if applied:
+                suffixes.append(applied)
+            self._variants[key] = (body, applied, '-'.join([self.etag] + suffixes))
+        return self._variants[key]
+
+class ResponseCache:
+    """LRU cache of serialized responses with TTL eviction.
+
+    Entries are tagged with the data version they were built from and are
+    treated as missing once the version moves on.
+    """
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or version is None or entry.version != version \
+                    or time.monotonic() - entry.stored_at > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, headers=None):
+        entry = CachedResponse(body, version, headers)
+        if version is None:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def readiness_report(facts, pool=None):
+    """(body, status) of a readiness check from the backend's facts and pool stats"""
+    reasons = []
+    lag = facts.get('database', {}).get('replication_lag_seconds')
+    if READY_MAX_REPLICATION_LAG and lag is not None and lag > READY_MAX_REPLICATION_LAG:
+        reasons.append(f"Replication lag of {lag:.1f}s exceeds {READY_MAX_REPLICATION_LAG:g}s")
+    age = facts['data']['age_seconds']
+    if READY_MAX_DATA_AGE and age is not None and age > READY_MAX_DATA_AGE:
+        reasons.append(f"Data version is {age:.0f}s old, more than {READY_MAX_DATA_AGE:g}s")
+    body = {'status': 'not ready' if reasons else 'ready', **facts}
+    if pool is not None:
+        body['pool'] = {key: pool[key] for key in ('size', 'idle', 'in_use', 'waiting', 'max_size')
+                        if key in pool}
+        body['pool']['saturation'] = round(pool['in_use'] / pool['max_size'], 3)
+    if reasons:
+        body['reasons'] = reasons
+    return body, 503 if reasons else 200
+
+def readiness_failure(error):
+    logger.warning(f"Readiness check failed: {str(error)}")
+    problem = "Connection pool exhausted" if isinstance(error, PoolTimeout) else "Database unavailable"
+    return {'status': 'not ready', 'reasons': [f"{problem}: {str(error).strip()}"]}, 503
+
+class ReadinessCheck:
+    """Result of the last readiness check, re-checked at most once per interval.
+
+    Load balancers poll every instance every few seconds; this keeps that to
+    one pooled query per interval however many probes arrive.
+    """
+
+    def __init__(self, interval=READINESS_CHECK_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = None
+
+    def get(self):
+        """(body, status), with the age of the result in the body"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._result = self._check()
+                self._checked_at = now = time.monotonic()
+            body, status = self._result
+            return {**body, 'checked_seconds_ago': round(now - self._checked_at, 3)}, status
+
+    @staticmethod
+    def _check():
+        try:
+            return readiness_report(*backend.readiness())
+        except Exception as e:
+            return readiness_failure(e)
+
+data_version = DataVersion()
+players_cache = ResponseCache()
+readiness = ReadinessCheck()
+
+def negotiated_response(body, media_type, encoding, status=200):
+    response = Response(body, status=status, mimetype=media_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def cached_response(entry):
+    """Serve a cached body in the negotiated format, or 304 when the client already has it"""
+    media_type, encoding = negotiate(request.accept_mimetypes, request.accept_encodings)
+    body, encoding, etag = entry.variant(media_type, encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.vary.update(('Accept', 'Accept-Encoding'))
+    else:
+        response = negotiated_response(body, media_type, encoding)
+    response.headers.extend(entry.headers)
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def json_body(data):
+    # Same key order as jsonify
+    with serializing():
+        return dumps(data, app.config['JSON_SORT_KEYS'])
+
+def send_body(body, status=200):
+    """Send a JSON body in the negotiated format"""
+    media_type, encoding = negotiate(request.accept_mimetypes, request.accept_encodings)
+    with serializing():
+        body, encoding = encode(body, media_type, encoding)
+    return negotiated_response(body, media_type, encoding, status)
+
+def send_data(data, status=200):
+    return send_body(json_body(data), status)
+
+# API Routes - all under /api prefix
+@api.route('/health')
+def health_check():
+    try:
+        return jsonify(backend.health())
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         raise
 
+@api.route('/health/live')
+def liveness_check():
+    """The process is up and serving requests; touches no database"""
+    return jsonify({'status': 'alive'})
+
+@api.route('/health/ready')
+def readiness_check():
+    """Whether this instance should receive traffic, checked at most once per interval"""
+    body, status = readiness.get()
+    return jsonify(body), status
+
+# Connection pool figures exported by /api/metrics: (stats key, type, help)
+POOL_METRICS = (
+    ('size', 'gauge', "Open pooled connections"),
+    ('idle', 'gauge', "Pooled connections not checked out"),
+    ('in_use', 'gauge', "Pooled connections checked out"),
+    ('waiting', 'gauge', "Callers waiting for a pooled connection"),
+    ('max_size', 'gauge', "Most connections the pool will open"),
+    ('checkouts', 'counter', "Connections checked out of the pool"),
+    ('timeouts', 'counter', "Checkouts that gave up waiting"),
+    ('connections_opened', 'counter', "Connections the pool has opened"),
+)
+
+def pool_metrics(stats):
+    """(name, type, help, value) of each figure present in ``stats``"""
+    return [
+        (f"nfl_db_pool_{key}{'_total' if kind == 'counter' else ''}", kind, help, stats[key])
+        for key, kind, help in POOL_METRICS if key in stats
+    ]
+
+def cache_metrics(cache):
+    return [
+        ('nfl_api_response_cache_hits_total', 'counter', "Response cache hits", cache.hits),
+        ('nfl_api_response_cache_misses_total', 'counter', "Response cache misses", cache.misses),
+        ('nfl_api_response_cache_entries', 'gauge', "Responses held in the cache", len(cache)),
+    ]
+
+@api.route('/metrics')
+def metrics():
+    """Prometheus metrics of this worker process"""
+    extra = cache_metrics(players_cache)
+    if isinstance(backend, PostgresBackend):
+        extra += pool_metrics(get_pool().stats())
+    return Response(METRICS.render(extra), content_type=CONTENT_TYPE)
+
+class InvalidParameter(ValueError):
+    """A query parameter failed validation; reported as 400 Bad Request"""
+
+def bad_request(message, **extra):
+    return jsonify({'error': 'Bad Request', 'message': message, **extra}), 400
+
+def encode_cursor(sort, order, value, playerid, profile=None):
+    # A NULL sort value stays null, not the string 'None'
+    value = None if value is None else str(value)
+    fields = [sort, order, value, playerid] + ([profile] if profile else [])
+    payload = json.dumps(fields).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode('ascii')
+
+# Range of a Postgres INTEGER, so a tampered cursor cannot overflow the cast
+INTEGER_RANGE = range(-2 ** 31, 2 ** 31)
+
+def decode_cursor(cursor, sort, order, sql_type, profile=None):
+    """The ``(sort value, playerid)`` pair a cursor continues from.
+
+    The value is converted to the Python type of the ``sql_type`` sort column.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, playerid, *cursor_profile = \
+            json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidParameter('Malformed cursor')
+    if not isinstance(value, (str, type(None))) or not isinstance(playerid, str):
+        raise InvalidParameter('Malformed cursor')
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise InvalidParameter('Cursor was issued for a different sort order')
+    if (cursor_profile or [None])[0] != profile:
+        raise InvalidParameter('Cursor was issued for a different scoring profile')
+    if value is not None:
+        try:
+            value = PYTHON_TYPES[sql_type](value)
+        except ValueError:
+            raise InvalidParameter('Malformed cursor')
+        if not math.isfinite(value) or (sql_type == 'INTEGER' and value not in INTEGER_RANGE):
+            raise InvalidParameter('Malformed cursor')
+    return value, playerid
+
+@lru_cache(maxsize=4)
+def cached_profile_names(version):
+    return backend.profile_names()
+
+def profile_names(version):
+    """Stored scoring profiles, re-read when the data version changes or is unknown"""
+    if version is None:
+        return backend.profile_names()
+    return cached_profile_names(version)
+
+def check_profile(profile, names=None):
+    """Raise InvalidParameter unless ``profile`` is None or one of ``names`` (default: stored profiles)"""
+    if profile is None:
+        return None
+    if names is None:
+        names = profile_names(data_version.get())
+    if profile not in names:
+        raise InvalidParameter(f'profile must be one of: {", ".join(names) or "(none stored)"}')
+    return profile
+
+def parse_profile():
+    """The ``profile`` query parameter, checked against the stored profiles; None if absent"""
+    return check_profile(request.args.get('profile'))
+
+def parse_page_params(position, profile=None, args=None):
+    """Validate limit, cursor, sort, order and fields against the position's columns.
+
+    ``args`` defaults to the current request's query parameters.
+    """
+    schema = POSITIONS[position]
+    args = request.args if args is None else args
+
+    sort = args.get('sort', 'rank')
+    if sort not in schema.numeric_columns:
+        raise InvalidParameter(f'sort must be one of: {", ".join(schema.numeric_columns)}')
+    order = args.get('order', 'asc' if sort == 'rank' else 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise InvalidParameter('order must be asc or desc')
+
+    if 'fields' in args:
+        fields = tuple(dict.fromkeys(f.strip() for f in args['fields'].split(',') if f.strip()))
+        unknown = [f for f in fields if f not in schema.columns_by_name]
+        if unknown or not fields:
+            raise InvalidParameter(
+                f'Unknown fields: {", ".join(unknown) or "(none given)"}. '
+                f'Available: {", ".join(schema.column_names)}'
+            )
+    else:
+        fields = schema.column_names
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidParameter('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidParameter(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    after = None
+    if args.get('cursor'):
+        after = decode_cursor(args['cursor'], sort, order, schema.columns_by_name[sort].sql_type, profile)
+    return {'fields': fields, 'sort': sort, 'order': order, 'limit': limit, 'after': after}
+
+# API Routes - all under /api prefix
 @api.route('/players/<position>', methods=['GET'])
-@with_db_connection
-def get_players_by_position(conn, position):
-    valid_positions = {'QB', 'RB', 'WR', 'TE', 'K', 'LB', 'DL', 'DB'}
-    if position not in valid_positions:
+def get_players_by_position(position):
+    if position not in POSITIONS:
         return jsonify({
             'error': 'Invalid position',
-            'message': f'Position must be one of: {", ".join(valid_positions)}'
+            'message': f'Position must be one of: {", ".join(POSITION_CODES)}'
         }), 400
 
+    paginated = any(name in request.args for name in PAGE_PARAMS)
     try:
-        cur = conn.cursor()
-        
-        if position == 'QB':
-            query = """
-                SELECT playerid, playername, team, passingyards, passingtds, 
-                       interceptions, rushingyards, rushingtds, totalpoints, rank
-                FROM qb_stats
-                ORDER BY rank ASC
-            """
-        elif position == 'RB':
-            query = """
-                SELECT playerid, playername, team, rushingyards, rushingtds,
-                       receptions, receivingyards, receivingtds, totalpoints, rank
-                FROM rb_stats
-                ORDER BY rank ASC
-            """
-        elif position in ('WR', 'TE'):
-            query = f"""
-                SELECT playerid, playername, team, receptions, targets,
-                       receivingyards, receivingtds, totalpoints, rank
-                FROM {position.lower()}_stats
-                ORDER BY rank ASC
-            """
-        elif position in ('LB', 'DL', 'DB'):
-            query = f"""
-                SELECT playerid, playername, team, tackles, sacks,
-                       tackles_for_loss, forced_fumbles, totalpoints, rank
-                FROM {position.lower()}_stats
-                ORDER BY rank ASC
-            """
-        else:  # K
-            query = """
-                SELECT playerid, playername, team, fieldgoals, fieldgoal_attempts,
-                       extrapoints, extrapoint_attempts, totalpoints, rank
-                FROM k_stats
-                ORDER BY rank ASC
-            """
-        
-        cur.execute(query)
-        columns = [desc[0] for desc in cur.description]
-        players = [dict(zip(columns, row)) for row in cur.fetchall()]
-        
-        return jsonify(players)
+        profile = parse_profile()
+        if paginated:
+            page = parse_page_params(position, profile)
+    except InvalidParameter as e:
+        return bad_request(str(e))
+    if not paginated:
+        return cached_response(players_entry(position, profile))
+
+    key = (position, profile, page['fields'], page['sort'], page['order'], page['limit'], page['after'])
+    version = data_version.get()
+    entry = players_cache.get(key, version)
+    if entry is None:
+        body, headers = fetch_players_page(position, page, profile)
+        entry = players_cache.put(key, version, body, headers)
+    return cached_response(entry)
+
+def players_entry(position, profile=None):
+    """Cached response holding every player of a position"""
+    key = (position, profile)
+    version = data_version.get()
+    entry = players_cache.get(key, version)
+    if entry is None:
+        entry = players_cache.put(key, version, fetch_players_body(position, profile))
+    return entry
+
+def fetch_players_body(position, profile=None):
+    try:
+        columns, rows = backend.players(position, profile)
+        with serializing():
+            return dumps_rows(columns, rows, app.config['JSON_SORT_KEYS'])
 
     except Exception as e:
         logger.error(f"Error fetching {position} players: {str(e)}")
         raise
 
+def page_body(columns, rows, page, profile, args, base_url):
+    """JSON body and next-page headers for rows fetched with one extra row"""
+    headers = {}
+    sort, limit = page['sort'], page['limit']
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = encode_cursor(sort, page['order'], last[sort], last['playerid'], profile)
+        args = {**args, 'cursor': next_cursor}
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{base_url}?{urlencode(args)}>; rel="next"'
+
+    # The sort and playerid columns added for the cursor are left out
+    with serializing():
+        body = dumps_rows(columns[:len(page['fields'])], rows, app.config['JSON_SORT_KEYS'])
+    return body, headers
+
+def fetch_players_page(position, page, profile=None):
+    """One keyset page of players, with a next-page cursor when more rows remain"""
+    try:
+        fields, sort, limit = page['fields'], page['sort'], page['limit']
+        # Fetch one extra row to learn whether another page exists
+        columns, rows = backend.players_page(
+            position, fields, sort, page['order'] == 'desc', page['after'], limit + 1, profile
+        )
+
+        return page_body(columns, rows, page, profile, request.args.to_dict(), request.base_url)
+
+    except Exception as e:
+        logger.error(f"Error fetching {position} players page: {str(e)}")
+        raise
+
 @api.route('/teams', methods=['GET'])
-@with_db_connection
-def get_teams(conn):
+def get_teams():
     try:
-        cur = conn.cursor()
+        teams = backend.teams()
         
-        query = """
-            SELECT team_code, team_name, division
-            FROM teams
-            ORDER BY division, team_name
-        """
-        
-        cur.execute(query)
-        columns = [desc[0] for desc in cur.description]
-        teams = [dict(zip(columns, row)) for row in cur.fetchall()]
-        
-        return jsonify(teams)
+        return send_data(teams)
         
     except Exception as e:
         logger.error(f"Error fetching teams: {str(e)}")
         raise
 
 @api.route('/teams/<team_code>/players', methods=['GET'])
-@with_db_connection
-def get_team_players(conn, team_code):
+def get_team_players(team_code):
     try:
-        cur = conn.cursor()
-        
-        # Get all players from all position tables for the given team
-        query = """
-            SELECT 'QB' as position, playerid, playername, team, 
-                   passingyards as yards, passingtds as touchdowns, 
-                   totalpoints, rank
-            FROM qb_stats 
-            WHERE team = %s
-            UNION ALL
-            SELECT 'RB' as position, playerid, playername, team, 
-                   rushingyards as yards, rushingtds as touchdowns, 
-                   totalpoints, rank
-            FROM rb_stats 
-            WHERE team = %s
-            UNION ALL
-            SELECT 'WR' as position, playerid, playername, team, 
-                   receivingyards as yards, receivingtds as touchdowns, 
-                   totalpoints, rank
-            FROM wr_stats 
-            WHERE team = %s
-            UNION ALL
-            SELECT 'TE' as position, playerid, playername, team, 
-                   receivingyards as yards, receivingtds as touchdowns, 
-                   totalpoints, rank
-            FROM te_stats 
-            WHERE team = %s
-            ORDER BY totalpoints DESC
-        """
-        
-        cur.execute(query, (team_code, team_code, team_code, team_code))
-        columns = [desc[0] for desc in cur.description]
-        players = [dict(zip(columns, row)) for row in cur.fetchall()]
+        try:
+            profile = parse_profile()
+        except InvalidParameter as e:
+            return bad_request(str(e))
+        players = backend.team_players(team_code, profile)
         
         if not players:
             return jsonify({
@@ -210,17 +766,49 @@ def get_team_players(conn, team_code):
                 'message': f'No players found for team {team_code}'
             }), 404
         
-        return jsonify(players)
+        return send_data(players)
         
     except Exception as e:
         logger.error(f"Error fetching players for team {team_code}: {str(e)}")
         raise
 
+class SearchIndexCache:
+    """Holds the player search index and rebuilds it when the data version changes"""
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = None
+
+    def get(self):
+        version = data_version.get()
+        with self._lock:
+            index = self._index
+            stale = (
+                index is None
+                or index.version != version
+                # Without a version counter, fall back to rebuilding on a timer
+                or (version is None and time.monotonic() - self._built_at > self.ttl)
+            )
+            if stale:
+                started = time.perf_counter()
+                index = PlayerSearchIndex(self._fetch_players(), version)
+                self._index, self._built_at = index, time.monotonic()
+                logger.info(f"Built search index of {len(index)} players "
+                            f"in {time.perf_counter() - started:.3f}s (data version {version})")
+            return index
+
+    @staticmethod
+    def _fetch_players():
+        return backend.all_players()
+
+search_index = SearchIndexCache()
+
 @api.route('/search', methods=['GET'])
-@with_db_connection
-def search_players(conn):
+def search_players():
     try:
-        name = request.args.get('name', '').strip().lower()
+        name = request.args.get('name', '').strip()
         position = request.args.get('position', '').strip().upper()
         
         if not name:
@@ -229,68 +817,21 @@ def search_players(conn):
                 'message': 'Name parameter is required'
             }), 400
             
-        valid_positions = {'QB', 'RB', 'WR', 'TE', 'K', 'LB', 'DL', 'DB'}
-        if position and position not in valid_positions:
+        if position and position not in POSITIONS:
             return jsonify({
                 'error': 'Bad Request',
-                'message': f'Invalid position. Must be one of: {", ".join(valid_positions)}',
+                'message': f'Invalid position. Must be one of: {", ".join(POSITION_CODES)}',
                 'provided': position
             }), 400
-            
-        cur = conn.cursor()
-        
-        # If no position specified, search across all positions
-        if not position:
-            query = """
-                SELECT 'QB' as position, playerid, playername, team, totalpoints, rank
-                FROM qb_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'RB' as position, playerid, playername, team, totalpoints, rank
-                FROM rb_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'WR' as position, playerid, playername, team, totalpoints, rank
-                FROM wr_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'TE' as position, playerid, playername, team, totalpoints, rank
-                FROM te_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'K' as position, playerid, playername, team, totalpoints, rank
-                FROM k_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'LB' as position, playerid, playername, team, totalpoints, rank
-                FROM lb_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'DL' as position, playerid, playername, team, totalpoints, rank
-                FROM dl_stats 
-                WHERE LOWER(playername) LIKE %s
-                UNION ALL
-                SELECT 'DB' as position, playerid, playername, team, totalpoints, rank
-                FROM db_stats 
-                WHERE LOWER(playername) LIKE %s
-                ORDER BY totalpoints DESC
-            """
-            search_pattern = f'%{name}%'
-            cur.execute(query, (search_pattern,) * 8)
-        else:
-            # Search specific position
-            table = f"{position.lower()}_stats"
-            query = f"""
-                SELECT %s as position, playerid, playername, team, totalpoints, rank
-                FROM {table}
-                WHERE LOWER(playername) LIKE %s
-                ORDER BY totalpoints DESC
-            """
-            search_pattern = f'%{name}%'
-            cur.execute(query, (position, search_pattern))
-        
-        columns = [desc[0] for desc in cur.description]
-        players = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return bad_request('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return bad_request(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+        players = search_index.get().search(name, position=position or None, limit=limit)
         
         if not players:
             return jsonify({
@@ -299,27 +840,184 @@ def search_players(conn):
                 + (f' with position {position}' if position else '')
             }), 404
         
-        return jsonify(players)
+        return send_data(players)
         
     except Exception as e:
         logger.error(f"Error searching players: {str(e)}")
         raise
 
+# Shared by batch requests; threads are only started once work is submitted
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+def error_body(error, message):
+    return json_body({'error': error, 'message': message})
+
+BATCH_TYPES = ('players', 'team', 'teams', 'player_ids', 'search')
+
+def parse_batch_request(sub, names=None):
+    """Validate one sub-request of /api/batch; returns its type and normalized arguments.
+
+    ``names`` are the stored profile names, looked up when not given.
+    """
+    if not isinstance(sub, dict):
+        raise InvalidParameter('Each request must be a JSON object')
+    kind = sub.get('type')
+    if kind == 'players':
+        position = sub.get('position')
+        if position not in POSITIONS:
+            raise InvalidParameter(f'Position must be one of: {", ".join(POSITION_CODES)}')
+        return kind, (position, check_profile(sub.get('profile'), names))
+    if kind == 'team':
+        team = sub.get('team')
+        if not isinstance(team, str) or not team:
+            raise InvalidParameter('team is required')
+        return kind, (team, check_profile(sub.get('profile'), names))
+    if kind == 'teams':
+        return kind, ()
+    if kind == 'player_ids':
+        ids = sub.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+            raise InvalidParameter('ids must be a non-empty list of player ids')
+        if len(ids) > MAX_PAGE_SIZE:
+            raise InvalidParameter(f'At most {MAX_PAGE_SIZE} ids per request')
+        return kind, tuple(ids)
+    if kind == 'search':
+        name = sub.get('name')
+        if not isinstance(name, str) or not name.strip():
+            raise InvalidParameter('name is required')
+        position = (sub.get('position') or '').upper()
+        if position and position not in POSITIONS:
+            raise InvalidParameter(f'Invalid position. Must be one of: {", ".join(POSITION_CODES)}')
+        limit = sub.get('limit', DEFAULT_PAGE_SIZE)
+        if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+            raise InvalidParameter(f'limit must be an integer between 1 and {MAX_PAGE_SIZE}')
+        return kind, (name.strip(), position or None, limit)
+    raise InvalidParameter(f'type must be one of: {", ".join(BATCH_TYPES)}')
+
+@api.route('/batch', methods=['POST'])
+def batch():
+    """Answer several sub-requests with one response.
+
+    The body is ``{"requests": [...]}``, each sub-request one of::
+
+        {"type": "players", "position": "QB", "profile": "ppr"}
+        {"type": "team", "team": "KC", "profile": "ppr"}
+        {"type": "teams"}
+        {"type": "player_ids", "ids": ["2560757", "2560955"]}
+        {"type": "search", "name": "allen", "position": "QB", "limit": 5}
+
+    ``profile`` is optional, and an ``id`` given in a sub-request is echoed in
+    its result. Results come back in request order as ``{"id", "status",
+    "body"}``, where ``body`` is what the matching GET endpoint would return.
+    All team rosters are read in one query per profile and all player ids in
+    one query; positions come from the response cache, uncached ones fetched
+    in parallel over up to BATCH_WORKERS pooled connections.
+    """
+    try:
+        subrequests, results, parsed = parse_batch(request.get_json(silent=True))
+    except InvalidParameter as e:
+        return bad_request(str(e))
+
+    fetchers = {'players': players_entry, 'teams_players': backend.teams_players,
+                'players_by_id': backend.players_by_id, 'teams': backend.teams}
+    # Each fetch runs in a copy of this context, so its queries count towards this request
+    futures = {
+        key: batch_executor.submit(contextvars.copy_context().run, fetchers[fetch], *args)
+        for key, (fetch, args) in plan_batch(parsed).items()
+    }
+    index = search_index.get() if any(kind == 'search' for kind, _ in parsed.values()) else None
+    fetched = {key: future.result() for key, future in futures.items()}
+    return send_body(batch_body(subrequests, results, parsed, fetched, index))
+
+def parse_batch(payload, names=None):
+    """Validate a /api/batch body: (sub-requests, results, {index: (type, arguments)}).
+
+    Results start out holding the (status, body) of every invalid sub-request.
+    """
+    subrequests = payload.get('requests') if isinstance(payload, dict) else None
+    if not isinstance(subrequests, list) or not subrequests:
+        raise InvalidParameter('Body must be a JSON object with a non-empty "requests" list')
+    if len(subrequests) > BATCH_MAX_REQUESTS:
+        raise InvalidParameter(f'At most {BATCH_MAX_REQUESTS} requests per batch')
+
+    results = [None] * len(subrequests)
+    parsed = {}
+    for i, sub in enumerate(subrequests):
+        try:
+            parsed[i] = parse_batch_request(sub, names)
+        except InvalidParameter as e:
+            results[i] = (400, error_body('Bad Request', str(e)))
+    return subrequests, results, parsed
+
+def plan_batch(parsed):
+    """{key: (fetch, arguments)}: one fetch per position and profile, per roster profile, and for all ids.
+
+    ``fetch`` is ``players`` (a cached position list) or the name of a backend method.
+    """
+    tasks = {}
+    for kind, args in parsed.values():
+        if kind == 'players':
+            tasks.setdefault(('players', args), ('players', args))
+        elif kind == 'team':
+            tasks.setdefault(('team', args[1]), ('teams_players', (set(), args[1])))[1][0].add(args[0])
+        elif kind == 'player_ids':
+            tasks.setdefault(('player_ids',), ('players_by_id', (set(),)))[1][0].update(args)
+        elif kind == 'teams':
+            tasks.setdefault(('teams',), ('teams', ()))
+    return tasks
+
+def batch_body(subrequests, results, parsed, fetched, index=None):
+    """The /api/batch response body, from the results of ``plan_batch``'s fetches"""
+    for i, (kind, args) in parsed.items():
+        if kind == 'players':
+            results[i] = (200, fetched['players', args].body)
+            continue
+        if kind == 'team':
+            data = fetched['team', args[1]].get(args[0])
+            missing = f'No players found for team {args[0]}'
+        elif kind == 'player_ids':
+            found = {player['playerid']: player for player in fetched['player_ids',]}
+            data = [found[playerid] for playerid in dict.fromkeys(args) if playerid in found]
+            missing = 'No players found with the given ids'
+        elif kind == 'teams':
+            data = fetched['teams',]
+            missing = 'No teams found'
+        else:
+            name, position, limit = args
+            data = index.search(name, position=position, limit=limit)
+            missing = f'No players found matching "{name}"' + (f' with position {position}' if position else '')
+        if data:
+            results[i] = (200, json_body(data))
+        else:
+            results[i] = (404, error_body('Not Found', missing))
+
+    # Cached bodies are spliced in as they are, without decoding them again
+    parts = []
+    for i, (status, body) in enumerate(results):
+        sub = subrequests[i]
+        sub_id = sub.get('id', i) if isinstance(sub, dict) else i
+        parts.append(b'{"id":' + dumps(sub_id)
+                     + b',"status":' + str(status).encode('ascii') + b',"body":' + body + b'}')
+    return b'{"results":[' + b','.join(parts) + b']}'
+
 # Register the API blueprint
 app.register_blueprint(api)
 
+ROOT_INFO = {
+    'message': 'NFL Stats API',
+    'endpoints': {
+        'search': '/api/search?name={player_name}&position={optional_position}&limit={optional_limit}',
+        'players_by_position': '/api/players/{position}?profile={optional_scoring_profile}',
+        'teams': '/api/teams',
+        'team_players': '/api/teams/{team_code}/players?profile={optional_scoring_profile}',
+        'batch': 'POST /api/batch {"requests": [{"type": "players", "position": "QB"}, ...]}'
+    }
+}
+
 # Root route to handle non-API requests
 @app.route('/')
 def root():
-    return jsonify({
-        'message': 'NFL Stats API',
-        'endpoints': {
-            'search': '/api/search?name={player_name}&position={optional_position}',
-            'players_by_position': '/api/players/{position}',
-            'teams': '/api/teams',
-            'team_players': '/api/teams/{team_code}/players'
-        }
-    })
+    return jsonify(ROOT_INFO)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,574 @@
+"""Asynchronous serving mode: the /api routes on an ASGI server over an asyncpg pool.
+
+    uvicorn src.asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+A gunicorn thread waits out every database round-trip, so a worker serves at
+most ``threads`` slow requests at once. Here one event loop keeps thousands
+of client connections open and only holds a pooled connection while a query
+runs. Validation, SQL, caching, serialization and error bodies are shared
+with ``src.app``, so both modes answer every request the same way.
+"""
+import asyncio
+import itertools
+import logging
+import time
+import traceback
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import asyncpg
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Match, Route
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.exceptions import InternalServerError, default_exceptions
+from werkzeug.http import parse_accept_header, parse_etags
+
+from src import app as api
+from src.database import (
+    DATABASE_URL, DB_SSLMODE, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    PoolTimeout, REPLICATION_SQL, DATA_AGE_SQL, readiness_facts
+)
+from src.instrumentation import (
+    METRICS, CONTENT_TYPE, SERVER_TIMING, start_request, finish_request, serializing,
+    record_acquire, record_query, statement_kind, explainable, explain_sql, log_slow_query
+)
+from src.schema import POSITIONS, POSITION_CODES
+from src.search import PlayerSearchIndex
+from src.serialization import JSON, negotiate, encode
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=256)
+def numbered(query):
+    """A psycopg2 query with its %s placeholders numbered for asyncpg ($1, $2, ...)"""
+    counter = itertools.count(1)
+    parts = query.split('%s')
+    return ''.join(part + (f'${next(counter)}' if i < len(parts) - 1 else '')
+                   for i, part in enumerate(parts))
+
+async def init_connection(conn):
+    # NUMERIC as float, like src.app.api_cursor
+    await conn.set_type_codec('numeric', schema='pg_catalog', format='text',
+                              encoder=str, decoder=float)
+
+class AsyncpgBackend:
+    """API data read from Postgres through an asyncpg pool; mirrors src.app.PostgresBackend"""
+
+    def __init__(self, dsn=DATABASE_URL, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def open(self):
+        logger.info(f"Creating asyncpg pool (min={self.min_size}, max={self.max_size})")
+        self.pool = await asyncpg.create_pool(
+            self.dsn, ssl=DB_SSLMODE, min_size=self.min_size, max_size=self.max_size,
+            init=init_connection
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def _connection(self, timeout=DB_POOL_TIMEOUT):
+        """A pooled connection; the wait for it counts as connection-acquire time"""
+        started = time.perf_counter()
+        async with self.pool.acquire(timeout=timeout) as conn:
+            record_acquire(time.perf_counter() - started)
+            yield conn
+
+    async def _timed(self, conn, run, query, args, rows=len):
+        """Await ``run``, recording it like src.instrumentation.InstrumentedCursor does"""
+        started = time.perf_counter()
+        result = await run
+        elapsed = time.perf_counter() - started
+        kind = statement_kind(query)
+        if record_query(kind, elapsed, rows(result)):
+            plan = None
+            if explainable(kind):
+                plan = await self._explain(conn, kind, query, args)
+            log_slow_query(elapsed, query, plan)
+        return result
+
+    @staticmethod
+    async def _explain(conn, kind, query, args):
+        """Like src.instrumentation._explain: the EXPLAIN runs in a transaction (or savepoint) that is rolled back"""
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            return '\n'.join(row[0] for row in await conn.fetch(explain_sql(kind, query), *args))
+        except asyncpg.PostgresError as e:
+            return f"(EXPLAIN failed: {str(e).strip()})"
+        finally:
+            await transaction.rollback()
+
+    async def _value(self, conn, query, *args):
+        return await self._timed(conn, conn.fetchval(query, *args), query, args, rows=lambda value: 1)
+
+    async def _fetch(self, query, *args):
+        """(columns, rows) of a query written with psycopg2 placeholders"""
+        query = numbered(query)
+        async with self._connection() as conn:
+            async def run():
+                statement = await conn.prepare(query)
+                return statement, await statement.fetch(*args)
+            statement, rows = await self._timed(conn, run(), query, args, rows=lambda result: len(result[1]))
+            return [attribute.name for attribute in statement.get_attributes()], rows
+
+    async def _fetch_dicts(self, query, *args):
+        _, rows = await self._fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    async def data_version(self):
+        async with self._connection() as conn:
+            if not await self._value(conn, "SELECT to_regclass('data_version') IS NOT NULL"):
+                return None
+            return await self._value(conn, "SELECT version FROM data_version")
+
+    async def health(self):
+        async with self._connection() as conn:
+            await self._value(conn, 'SELECT 1')
+        return {'status': 'healthy', 'database': 'connected'}
+
+    async def readiness(self):
+        """(database facts, pool stats) for the readiness check"""
+        try:
+            facts = await self._readiness_facts()
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"No database connection available after {api.READINESS_POOL_TIMEOUT:.1f}s "
+                              f"(pool size {self.max_size})")
+        return facts, self.pool_stats()
+
+    async def _readiness_facts(self):
+        async with self._connection(api.READINESS_POOL_TIMEOUT) as conn:
+            in_recovery, lag, has_version = await self._timed(
+                conn, conn.fetchrow(REPLICATION_SQL), REPLICATION_SQL, (), rows=lambda row: 1)
+            version = age = None
+            if has_version:
+                row = await self._timed(conn, conn.fetchrow(DATA_AGE_SQL), DATA_AGE_SQL, (),
+                                        rows=lambda row: 1 if row else 0)
+                if row:
+                    version, age = row
+        return readiness_facts(in_recovery, lag, version, age)
+
+    async def profile_names(self):
+        async with self._connection() as conn:
+            if not await self._value(conn, "SELECT to_regclass('scoring_profiles') IS NOT NULL"):
+                return []
+            return [row[0] for row in await self._timed(
+                conn, conn.fetch(api.PROFILE_NAMES_SQL), api.PROFILE_NAMES_SQL, ())]
+
+    def pool_stats(self):
+        """Pool figures named like src.database.ConnectionPool.stats"""
+        size, idle = self.pool.get_size(), self.pool.get_idle_size()
+        return {'size': size, 'idle': idle, 'in_use': size - idle, 'max_size': self.pool.get_max_size()}
+
+    async def players(self, position, profile=None):
+        schema = POSITIONS[position]
+        if profile:
+            return await self._fetch(schema.profile_select_sql, profile)
+        return await self._fetch(schema.select_sql)
+
+    async def players_page(self, position, fields, sort, descending, after, limit, profile=None):
+        query, params = POSITIONS[position].page_query(fields, sort, descending, after, limit, profile)
+        return await self._fetch(query, *params)
+
+    async def teams(self):
+        return await self._fetch_dicts(api.TEAMS_SQL)
+
+    async def team_players(self, team_code, profile=None):
+        return (await self.teams_players([team_code], profile)).get(team_code, [])
+
+    async def teams_players(self, team_codes, profile=None):
+        if profile:
+            players = await self._fetch_dicts(api.PROFILE_TEAM_PLAYERS_SQL, list(team_codes), profile)
+        else:
+            players = await self._fetch_dicts(api.TEAM_PLAYERS_SQL, list(team_codes))
+        return api.group_by_team(players)
+
+    async def players_by_id(self, playerids):
+        return await self._fetch_dicts(api.PLAYERS_BY_ID_SQL, list(playerids))
+
+    async def all_players(self):
+        return await self._fetch_dicts(api.SEARCH_PLAYERS_SQL)
+
+class AsyncLocalBackend:
+    """src.local_store.LocalStore's methods as coroutines; they only read memory, so they run inline"""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args):
+            return method(*args)
+        return call
+
+def create_backend(name=api.DATA_BACKEND):
+    if name == 'local':
+        # src.app already loaded the season files for this mode
+        return AsyncLocalBackend(api.backend)
+    return AsyncpgBackend()
+
+backend = create_backend()
+
+class DataVersion:
+    """Data version published by the loader, re-read at most once per interval"""
+
+    def __init__(self, interval=api.DATA_VERSION_CHECK_INTERVAL):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._version = None
+        self._checked_at = None
+
+    def _stale(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.interval
+
+    async def get(self):
+        if self._stale():
+            # One request re-reads the version while the others wait for it
+            async with self._lock:
+                if self._stale():
+                    self._version = await backend.data_version()
+                    self._checked_at = time.monotonic()
+        return self._version
+
+class ReadinessCheck:
+    """Result of the last readiness check, re-checked at most once per interval"""
+
+    def __init__(self, interval=api.READINESS_CHECK_INTERVAL):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._result = None
+        self._checked_at = None
+
+    def _stale(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.interval
+
+    async def get(self):
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    try:
+                        self._result = api.readiness_report(*await backend.readiness())
+                    except Exception as e:
+                        self._result = api.readiness_failure(e)
+                    self._checked_at = time.monotonic()
+        body, status = self._result
+        return {**body, 'checked_seconds_ago': round(time.monotonic() - self._checked_at, 3)}, status
+
+class SearchIndexCache:
+    """Holds the player search index and rebuilds it when the data version changes"""
+
+    def __init__(self, ttl=api.RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = asyncio.Lock()
+        self._index = None
+        self._built_at = None
+
+    def _stale(self, version):
+        index = self._index
+        return (
+            index is None
+            or index.version != version
+            # Without a version counter, fall back to rebuilding on a timer
+            or (version is None and time.monotonic() - self._built_at > self.ttl)
+        )
+
+    async def get(self):
+        version = await data_version.get()
+        if self._stale(version):
+            async with self._lock:
+                if self._stale(version):
+                    started = time.perf_counter()
+                    players = await backend.all_players()
+                    # Building the index is CPU-bound; keep it off the event loop
+                    index = await asyncio.to_thread(PlayerSearchIndex, players, version)
+                    self._index, self._built_at = index, time.monotonic()
+                    logger.info(f"Built search index of {len(index)} players "
+                                f"in {time.perf_counter() - started:.3f}s (data version {version})")
+        return self._index
+
+data_version = DataVersion()
+players_cache = api.ResponseCache()
+search_index = SearchIndexCache()
+readiness = ReadinessCheck()
+_profile_names = {}
+
+async def profile_names(version):
+    """Stored scoring profiles, re-read when the data version changes or is unknown"""
+    if version is None:
+        return await backend.profile_names()
+    if version not in _profile_names:
+        names = await backend.profile_names()
+        _profile_names.clear()
+        _profile_names[version] = names
+    return _profile_names[version]
+
+async def check_profile(profile):
+    if profile is None:
+        return None
+    return api.check_profile(profile, await profile_names(await data_version.get()))
+
+def negotiated(request):
+    return negotiate(parse_accept_header(request.headers.get('accept'), MIMEAccept),
+                     parse_accept_header(request.headers.get('accept-encoding'), Accept))
+
+def negotiated_response(body, media_type, encoding, status=200, headers=None):
+    headers = dict(headers or {})
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    return Response(body, status_code=status, media_type=media_type, headers=headers)
+
+def cached_response(request, entry):
+    """Serve a cached body in the negotiated format, or 304 when the client already has it"""
+    media_type, encoding = negotiated(request)
+    body, encoding, etag = entry.variant(media_type, encoding)
+    # Clients may keep the body but must revalidate it on every use
+    headers = {**entry.headers, 'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return Response(status_code=304, headers={**headers, 'Vary': 'Accept, Accept-Encoding'})
+    return negotiated_response(body, media_type, encoding, headers=headers)
+
+def send_body(request, body, status=200):
+    media_type, encoding = negotiated(request)
+    with serializing():
+        body, encoding = encode(body, media_type, encoding)
+    return negotiated_response(body, media_type, encoding, status)
+
+def send_data(request, data, status=200):
+    return send_body(request, api.json_body(data), status)
+
+def json_response(data, status=200):
+    """A plain JSON response, as jsonify sends errors and health checks"""
+    return Response(api.json_body(data), status_code=status, media_type=JSON)
+
+def bad_request(message, **extra):
+    return json_response({'error': 'Bad Request', 'message': message, **extra}, 400)
+
+async def health_check(request):
+    return json_response(await backend.health())
+
+async def liveness_check(request):
+    return json_response({'status': 'alive'})
+
+async def readiness_check(request):
+    body, status = await readiness.get()
+    return json_response(body, status)
+
+async def metrics(request):
+    """Prometheus metrics of this worker process"""
+    extra = api.cache_metrics(players_cache)
+    if isinstance(backend, AsyncpgBackend) and backend.pool is not None:
+        extra += api.pool_metrics(backend.pool_stats())
+    return Response(METRICS.render(extra), headers={'Content-Type': CONTENT_TYPE})
+
+async def players_entry(position, profile=None):
+    """Cached response holding every player of a position"""
+    key = (position, profile)
+    version = await data_version.get()
+    entry = players_cache.get(key, version)
+    if entry is None:
+        columns, rows = await backend.players(position, profile)
+        with serializing():
+            body = api.dumps_rows(columns, rows, api.app.config['JSON_SORT_KEYS'])
+        entry = players_cache.put(key, version, body)
+    return entry
+
+async def get_players_by_position(request):
+    position = request.path_params['position']
+    if position not in POSITIONS:
+        return json_response({
+            'error': 'Invalid position',
+            'message': f'Position must be one of: {", ".join(POSITION_CODES)}'
+        }, 400)
+
+    args = request.query_params
+    paginated = any(name in args for name in api.PAGE_PARAMS)
+    try:
+        profile = await check_profile(args.get('profile'))
+        if paginated:
+            page = api.parse_page_params(position, profile, args)
+    except api.InvalidParameter as e:
+        return bad_request(str(e))
+    if not paginated:
+        return cached_response(request, await players_entry(position, profile))
+
+    key = (position, profile, page['fields'], page['sort'], page['order'], page['limit'], page['after'])
+    version = await data_version.get()
+    entry = players_cache.get(key, version)
+    if entry is None:
+        # Fetch one extra row to learn whether another page exists
+        columns, rows = await backend.players_page(
+            position, page['fields'], page['sort'], page['order'] == 'desc', page['after'],
+            page['limit'] + 1, profile
+        )
+        base_url = str(request.url.replace(query=''))
+        body, headers = api.page_body(columns, rows, page, profile, dict(args), base_url)
+        entry = players_cache.put(key, version, body, headers)
+    return cached_response(request, entry)
+
+async def get_teams(request):
+    return send_data(request, await backend.teams())
+
+async def get_team_players(request):
+    team_code = request.path_params['team_code']
+    try:
+        profile = await check_profile(request.query_params.get('profile'))
+    except api.InvalidParameter as e:
+        return bad_request(str(e))
+    players = await backend.team_players(team_code, profile)
+    if not players:
+        return json_response({
+            'error': 'Not Found',
+            'message': f'No players found for team {team_code}'
+        }, 404)
+    return send_data(request, players)
+
+async def search_players(request):
+    name = request.query_params.get('name', '').strip()
+    position = request.query_params.get('position', '').strip().upper()
+
+    if not name:
+        return json_response({
+            'error': 'Bad Request',
+            'message': 'Name parameter is required'
+        }, 400)
+
+    if position and position not in POSITIONS:
+        return json_response({
+            'error': 'Bad Request',
+            'message': f'Invalid position. Must be one of: {", ".join(POSITION_CODES)}',
+            'provided': position
+        }, 400)
+
+    try:
+        limit = int(request.query_params.get('limit', api.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return bad_request('limit must be an integer')
+    if not 1 <= limit <= api.MAX_PAGE_SIZE:
+        return bad_request(f'limit must be between 1 and {api.MAX_PAGE_SIZE}')
+
+    players = (await search_index.get()).search(name, position=position or None, limit=limit)
+    if not players:
+        return json_response({
+            'error': 'Not Found',
+            'message': f'No players found matching "{name}"'
+            + (f' with position {position}' if position else '')
+        }, 404)
+    return send_data(request, players)
+
+async def batch(request):
+    """Answer several sub-requests with one response, like src.app.batch.
+
+    The fetches of one batch run concurrently on the pool.
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    try:
+        names = await profile_names(await data_version.get())
+        subrequests, results, parsed = api.parse_batch(payload, names)
+    except api.InvalidParameter as e:
+        return bad_request(str(e))
+
+    fetchers = {'players': players_entry, 'teams_players': backend.teams_players,
+                'players_by_id': backend.players_by_id, 'teams': backend.teams}
+    plan = api.plan_batch(parsed)
+    values = await asyncio.gather(*(fetchers[fetch](*args) for fetch, args in plan.values()))
+    index = await search_index.get() if any(kind == 'search' for kind, _ in parsed.values()) else None
+    body = api.batch_body(subrequests, results, parsed, dict(zip(plan, values)), index)
+    return send_body(request, body)
+
+async def root(request):
+    return json_response(api.ROOT_INFO)
+
+async def http_error(request, exc):
+    # Werkzeug's exception for the status gives the same name and message as Flask
+    error = default_exceptions.get(exc.status_code, InternalServerError)()
+    body, status = api.error_payload(error)
+    return json_response(body, status)
+
+async def server_error(request, exc):
+    logger.error(f"An error occurred: {str(exc)}")
+    logger.error(''.join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+    body, status = api.error_payload(exc)
+    return json_response(body, status)
+
+class RequestTiming:
+    """ASGI middleware: per-request stats, request metrics and the Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def endpoint(self, scope):
+        # Labelled with Flask's rule syntax, so both modes report the same endpoints
+        for route in routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path.replace('{', '<').replace('}', '>')
+        return 'unmatched'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        stats = start_request()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if SERVER_TIMING:
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', stats.server_timing().encode('latin-1')))
+                    message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            finish_request(scope['method'], self.endpoint(scope), status)
+
+@asynccontextmanager
+async def lifespan(app):
+    await backend.open()
+    try:
+        yield
+    finally:
+        await backend.close()
+
+routes = [
+    Route('/', root),
+    Route('/api/health', health_check),
+    Route('/api/health/live', liveness_check),
+    Route('/api/health/ready', readiness_check),
+    Route('/api/metrics', metrics),
+    Route('/api/players/{position}', get_players_by_position),
+    Route('/api/teams', get_teams),
+    Route('/api/teams/{team_code}/players', get_team_players),
+    Route('/api/search', search_players),
+    Route('/api/batch', batch, methods=['POST']),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(RequestTiming), Middleware(CORSMiddleware, allow_origins=['*'])],
+    exception_handlers={HTTPException: http_error, Exception: server_error},
+    lifespan=lifespan,
+)
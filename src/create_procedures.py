@@ -1,7 +1,19 @@
-import psycopg2
-from database import get_db_connection
+import sys
+import os
+import argparse
 
-def create_procedures_and_triggers():
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import get_db_connection, refresh_all_players, bump_data_version
+from src.scoring import (
+    PROFILES, SCORING_PROFILE, SCORED_POSITIONS, get_profile, install_scoring, rescore,
+    refresh_profile_points
+)
+from src.schema import POSITIONS
+
+def create_procedures_and_triggers(profile_name=SCORING_PROFILE, codes=SCORED_POSITIONS):
+    profile = get_profile(profile_name)
     conn = get_db_connection()
     cur = conn.cursor()
     
@@ -17,109 +29,30 @@ def create_procedures_and_triggers():
             ) AS $$
             BEGIN
                 RETURN QUERY
-                WITH team_stats AS (
-                    SELECT 
-                        q.playername::VARCHAR,
-                        'QB'::VARCHAR as pos,
-                        t.team_name::VARCHAR as team_name,
-                        q.totalpoints::NUMERIC as points
-                    FROM qb_stats q
-                    JOIN teams t ON t.team_code = q.team
-                    WHERE q.team = team_code_param
-                    UNION ALL
-                    SELECT 
-                        r.playername::VARCHAR,
-                        'RB'::VARCHAR,
-                        t.team_name::VARCHAR,
-                        r.totalpoints::NUMERIC
-                    FROM rb_stats r
-                    JOIN teams t ON t.team_code = r.team
-                    WHERE r.team = team_code_param
-                    UNION ALL
-                    SELECT 
-                        w.playername::VARCHAR,
-                        'WR'::VARCHAR,
-                        t.team_name::VARCHAR,
-                        w.totalpoints::NUMERIC
-                    FROM wr_stats w
-                    JOIN teams t ON t.team_code = w.team
-                    WHERE w.team = team_code_param
-                    UNION ALL
-                    SELECT 
-                        te.playername::VARCHAR,
-                        'TE'::VARCHAR,
-                        t.team_name::VARCHAR,
-                        te.totalpoints::NUMERIC
-                    FROM te_stats te
-                    JOIN teams t ON t.team_code = te.team
-                    WHERE te.team = team_code_param
-                    UNION ALL
-                    SELECT 
-                        k.playername::VARCHAR,
-                        'K'::VARCHAR,
-                        t.team_name::VARCHAR,
-                        k.totalpoints::NUMERIC
-                    FROM k_stats k
-                    JOIN teams t ON t.team_code = k.team
-                    WHERE k.team = team_code_param
-                )
-                SELECT * FROM team_stats ORDER BY points DESC;
+                SELECT 
+                    p.playername::VARCHAR,
+                    p.position::VARCHAR as pos,
+                    t.team_name::VARCHAR as team_name,
+                    p.totalpoints::NUMERIC as points
+                FROM all_players p
+                JOIN teams t ON t.team_code = p.team
+                WHERE p.team = team_code_param
+                  AND p.position IN ('QB', 'RB', 'WR', 'TE', 'K')
+                ORDER BY p.totalpoints DESC;
             END;
             $$ LANGUAGE plpgsql;
         """)
         
-        # Create points calculation triggers for each position
-        # QB Points Calculation
-        cur.execute("""
-            CREATE OR REPLACE FUNCTION calculate_qb_points()
-            RETURNS TRIGGER AS $$
-            DECLARE
-                passing_points NUMERIC;
-                td_points NUMERIC;
-                int_points NUMERIC;
-                rush_points NUMERIC;
-                rush_td_points NUMERIC;
-            BEGIN
-                passing_points := ROUND(COALESCE(NEW.passingyards::NUMERIC, 0) * 0.04, 2);
-                td_points := ROUND(COALESCE(NEW.passingtds::NUMERIC, 0) * 4, 2);
-                int_points := ROUND(COALESCE(NEW.interceptions::NUMERIC, 0) * -2, 2);
-                rush_points := ROUND(COALESCE(NEW.rushingyards::NUMERIC, 0) * 0.1, 2);
-                rush_td_points := ROUND(COALESCE(NEW.rushingtds::NUMERIC, 0) * 6, 2);
-                
-                NEW.totalpoints := ROUND(passing_points + td_points + int_points + rush_points + rush_td_points, 2);
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-            
-            DROP TRIGGER IF EXISTS calculate_qb_points_trigger ON qb_stats;
-            CREATE TRIGGER calculate_qb_points_trigger
-                BEFORE INSERT OR UPDATE ON qb_stats
-                FOR EACH ROW
-                EXECUTE FUNCTION calculate_qb_points();
-        """)
-
-        # RB Points Calculation
-        cur.execute("""
-            CREATE OR REPLACE FUNCTION calculate_rb_points()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                NEW.totalpoints = (
-                    COALESCE(NEW.rushingyards, 0) * 0.1 +
-                    COALESCE(NEW.rushingtds, 0) * 6 +
-                    COALESCE(NEW.receptions, 0) * 1 +
-                    COALESCE(NEW.receivingyards, 0) * 0.1 +
-                    COALESCE(NEW.receivingtds, 0) * 6
-                );
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-            
-            DROP TRIGGER IF EXISTS calculate_rb_points_trigger ON rb_stats;
-            CREATE TRIGGER calculate_rb_points_trigger
-                BEFORE INSERT OR UPDATE ON rb_stats
-                FOR EACH ROW
-                EXECUTE FUNCTION calculate_rb_points();
-        """)
+        # Points functions and triggers for every position the profile scores,
+        # then one set-based pass so existing rows match the profile
+        install_scoring(cur, profile, codes)
+        rescored = rescore(cur)
+        # Profiles that leave a position unscored rank it by totalpoints, which may have changed
+        refresh_profile_points(cur)
+        refresh_all_players(cur)
+        bump_data_version(cur)
+        print(f"Installed scoring profile {profile.name!r}, rescored "
+              f"{sum(rescored.values())} rows of {', '.join(rescored) or 'no positions'}")
         
         conn.commit()
         print("Successfully created team stats procedure and points calculation triggers!")
@@ -133,4 +66,11 @@ def create_procedures_and_triggers():
         conn.close()
 
 if __name__ == '__main__':
-    create_procedures_and_triggers() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the stored procedures and points triggers")
+    parser.add_argument('--profile', choices=list(PROFILES), default=SCORING_PROFILE,
+                        help="scoring profile used for totalpoints (default: SCORING_PROFILE or ppr)")
+    parser.add_argument('--positions', nargs='+', choices=list(POSITIONS), default=list(SCORED_POSITIONS),
+                        help="positions whose totalpoints and rank the profile computes; the rest keep "
+                             "the season files' points (default: SCORED_POSITIONS or QB RB)")
+    args = parser.parse_args()
+    create_procedures_and_triggers(args.profile, args.positions)
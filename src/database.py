@@ -1,32 +1,61 @@
 import os
+import re
 import json
+import argparse
+import hashlib
 import psycopg2
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.sql import text
 import logging
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
+from src.instrumentation import InstrumentedCursor, record_acquire
+from src.schema import POSITIONS, ALL_PLAYERS_VIEW, CREATE_ALL_PLAYERS_SQL, ALL_PLAYERS_INDEXES, INDEXES
+from src.scoring import (
+    PROFILE_TABLES, disable_scoring_triggers, rescore, create_scoring_tables, refresh_profile_points
+)
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Use the provided database URL unless one is configured in the environment
+DATABASE_URL = os.getenv(
+    'DATABASE_URL',
+    "postgres://u4frfq8rphkr89:pb906d5963e4ac1f17db49d71c8ff2cfddd55faa1f12a6f63aa9a1d1ac938b9a9@clhtb6lu92mj2.cluster-czz5s0kz4scl.eu-west-1.rds.amazonaws.com:5432/d1imqo8lepvt22"
+)
+# Replace postgres:// with postgresql:// for SQLAlchemy
+if DATABASE_URL.startswith('postgres://'):
+    DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+
+# Always use SSL for the hosted database
+DB_SSLMODE = os.getenv('DB_SSLMODE', 'require')
+
+# Connection pool settings, shared by the API, Streamlit and the scripts
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_POOL_IDLE_CHECK = float(os.getenv('DB_POOL_IDLE_CHECK', 30))
+DB_POOL_MAX_AGE = float(os.getenv('DB_POOL_MAX_AGE', 1800))
+
+
+def connect():
+    """Open a new raw connection to the database; its cursors are instrumented"""
+    return psycopg2.connect(DATABASE_URL, sslmode=DB_SSLMODE, cursor_factory=InstrumentedCursor)
+
 def get_db_connection():
     """Get database connection"""
     try:
         logger.info("Connecting to database...")
-        # Use the provided database URL
-        database_url = "postgres://u4frfq8rphkr89:pb906d5963e4ac1f17db49d71c8ff2cfddd55faa1f12a6f63aa9a1d1ac938b9a9@clhtb6lu92mj2.cluster-czz5s0kz4scl.eu-west-1.rds.amazonaws.com:5432/d1imqo8lepvt22"
-        
-        # Replace postgres:// with postgresql:// for SQLAlchemy
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
-        # Always use SSL for this database
-        logger.info("Using database connection with SSL")
-        conn = psycopg2.connect(database_url, sslmode='require')
+        logger.info(f"Using database connection with sslmode={DB_SSLMODE}")
+        conn = connect()
         
         # Test the connection
         with conn.cursor() as cur:
@@ -40,6 +69,233 @@ def get_db_connection():
         logger.error(error_msg)
         raise Exception(error_msg)
 
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+
+    Connections are handed out most-recently-used first so idle ones age out
+    naturally. A connection is only probed with ``SELECT 1`` on checkout when
+    it has been idle for longer than ``idle_check`` seconds, and it is closed
+    and replaced once it is older than ``max_age`` seconds.
+    """
+
+    def __init__(self, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, idle_check=DB_POOL_IDLE_CHECK,
+                 max_age=DB_POOL_MAX_AGE, connect=connect):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.max_age = max_age
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle = []       # [(conn, created_at, returned_at)], newest last
+        self._in_use = {}     # id(conn) -> created_at
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'validations': 0,
+            'failed_validations': 0,
+            'recycled': 0,
+            'wait_time': 0.0,
+        }
+        for _ in range(min_size):
+            conn = self._open()
+            with self._cond:
+                self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['connections_closed'] += 1
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self, timeout=None):
+        """Check a connection out of the pool"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise Exception("Connection pool is closed")
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size() >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats['timeouts'] += 1
+                            raise PoolTimeout(
+                                f"No database connection available after {timeout:.1f}s "
+                                f"(pool size {self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+                if self._idle:
+                    conn, created_at, returned_at = self._idle.pop()
+                    # Count the connection as checked out while it is validated
+                    self._in_use[id(conn)] = created_at
+                else:
+                    conn = None
+                    self._opening += 1
+
+            now = time.monotonic()
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use[id(conn)] = now
+            elif now - created_at > self.max_age:
+                self._release(conn)
+                with self._cond:
+                    self._stats['recycled'] += 1
+                continue
+            elif now - returned_at > self.idle_check and not self._validate(conn):
+                self._release(conn)
+                continue
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['wait_time'] += elapsed
+            record_acquire(elapsed)
+            return conn
+
+    def _release(self, conn):
+        with self._cond:
+            self._in_use.pop(id(conn), None)
+            self._cond.notify()
+        self._discard(conn)
+
+    def _validate(self, conn):
+        with self._cond:
+            self._stats['validations'] += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding stale pooled connection: {str(e)}")
+            with self._cond:
+                self._stats['failed_validations'] += 1
+            return False
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool"""
+        with self._cond:
+            if id(conn) not in self._in_use:
+                raise ValueError("Connection does not belong to this pool")
+
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        if discard or self._closed:
+            self._release(conn)
+            return
+        with self._cond:
+            created_at = self._in_use.pop(id(conn))
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        """Snapshot of pool-level counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size(),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+            })
+        return stats
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                logger.info(
+                    f"Creating connection pool (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})"
+                )
+                _pool = ConnectionPool()
+    return _pool
+
+def close_pool():
+    """Close the process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def pooled_connection(timeout=None):
+    """Borrow a connection from the process-wide pool"""
+    return get_pool().connection(timeout)
+
 def wait_for_db(max_retries=5, delay=2):
     """Wait for database to become available"""
     retries = 0
@@ -56,226 +312,320 @@ def wait_for_db(max_retries=5, delay=2):
                 time.sleep(delay)
     return False
 
-def create_tables(conn):
-    print("Creating tables...")
-    cur = conn.cursor()
-    
-    try:
-        # Drop existing tables and constraints in reverse order of dependencies
-        print("Dropping existing tables and constraints...")
-        cur.execute("""
-            DROP TABLE IF EXISTS qb_stats CASCADE;
-            DROP TABLE IF EXISTS rb_stats CASCADE;
-            DROP TABLE IF EXISTS wr_stats CASCADE;
-            DROP TABLE IF EXISTS te_stats CASCADE;
-            DROP TABLE IF EXISTS lb_stats CASCADE;
-            DROP TABLE IF EXISTS dl_stats CASCADE;
-            DROP TABLE IF EXISTS db_stats CASCADE;
-            DROP TABLE IF EXISTS k_stats CASCADE;
-            DROP TABLE IF EXISTS teams CASCADE;
-        """)
-        
-        # Drop any existing constraints that might cause issues
-        cur.execute("""
-            DO $$ 
-            BEGIN
-                -- Drop constraints if they exist
-                BEGIN
-                    ALTER TABLE IF EXISTS qb_stats DROP CONSTRAINT IF EXISTS unique_qb_rank;
-                    ALTER TABLE IF EXISTS rb_stats DROP CONSTRAINT IF EXISTS unique_rb_rank;
-                    ALTER TABLE IF EXISTS wr_stats DROP CONSTRAINT IF EXISTS unique_wr_rank;
-                    ALTER TABLE IF EXISTS te_stats DROP CONSTRAINT IF EXISTS unique_te_rank;
-                    ALTER TABLE IF EXISTS lb_stats DROP CONSTRAINT IF EXISTS unique_lb_rank;
-                    ALTER TABLE IF EXISTS dl_stats DROP CONSTRAINT IF EXISTS unique_dl_rank;
-                    ALTER TABLE IF EXISTS db_stats DROP CONSTRAINT IF EXISTS unique_db_rank;
-                    ALTER TABLE IF EXISTS k_stats DROP CONSTRAINT IF EXISTS unique_k_rank;
-                EXCEPTION 
-                    WHEN undefined_table THEN 
-                        NULL;
-                END;
-            END $$;
-        """)
-        print("Existing tables and constraints dropped")
+def create_data_version_table(cur):
+    """Create the single-row data version counter if it does not exist yet"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        INSERT INTO data_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    """)
 
-        # Create teams table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS teams (
-                team_code VARCHAR(3) PRIMARY KEY,
-                team_name VARCHAR(100) NOT NULL,
-                division VARCHAR(50)
-            )
-        """)
-        print("Created teams table")
+def bump_data_version(cur):
+    """Mark the stats data as changed; readers use this to invalidate caches.
 
-        # Create QB stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS qb_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                passingyards INTEGER,
-                passingtds INTEGER,
-                interceptions INTEGER,
-                rushingyards INTEGER,
-                rushingtds INTEGER,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created QB stats table")
+    Call it inside the transaction that changes the data so both commit together.
+    """
+    cur.execute("""
+        UPDATE data_version SET version = version + 1, updated_at = now()
+        RETURNING version
+    """)
+    return cur.fetchone()[0]
 
-        # Create RB stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS rb_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                rushingyards INTEGER,
-                rushingtds INTEGER,
-                receptions INTEGER,
-                receivingyards INTEGER,
-                receivingtds INTEGER,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created RB stats table")
+def get_data_version(cur):
+    """Current data version, or None if the counter table has not been created"""
+    cur.execute("SELECT to_regclass('data_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return None
+    cur.execute("SELECT version FROM data_version")
+    row = cur.fetchone()
+    return row[0] if row else None
 
-        # Create WR stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS wr_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                receptions INTEGER,
-                targets INTEGER,
-                receivingyards INTEGER,
-                receivingtds INTEGER,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created WR stats table")
+# Whether this server is a replica, how far its replay is behind, and whether
+# the data version table exists. An idle primary sends nothing to replay, so a
+# replica that has replayed everything it received counts as caught up.
+REPLICATION_SQL = """
+    SELECT pg_is_in_recovery(),
+           CASE WHEN NOT pg_is_in_recovery() THEN NULL
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8
+           END,
+           to_regclass('data_version') IS NOT NULL
+"""
 
-        # Create TE stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS te_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                receptions INTEGER,
-                targets INTEGER,
-                receivingyards INTEGER,
-                receivingtds INTEGER,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created TE stats table")
+DATA_AGE_SQL = "SELECT version, EXTRACT(EPOCH FROM now() - updated_at)::float8 FROM data_version"
 
-        # Create LB stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS lb_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                tackles NUMERIC,
-                tackles_ast NUMERIC,
-                sacks NUMERIC,
-                tackles_tfl NUMERIC,
-                interceptions NUMERIC,
-                forced_fumbles NUMERIC,
-                fumble_recoveries NUMERIC,
-                passes_defended NUMERIC,
-                qb_hits NUMERIC,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created LB_STATS table")
+def get_readiness(cur):
+    """Replication state and data version age, as reported by readiness checks"""
+    cur.execute(REPLICATION_SQL)
+    in_recovery, lag, has_version = cur.fetchone()
+    version = age = None
+    if has_version:
+        cur.execute(DATA_AGE_SQL)
+        row = cur.fetchone()
+        if row:
+            version, age = row
+    return readiness_facts(in_recovery, lag, version, age)
 
-        # Create DL stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS dl_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                tackles NUMERIC,
-                tackles_ast NUMERIC,
-                sacks NUMERIC,
-                tackles_tfl NUMERIC,
-                interceptions NUMERIC,
-                forced_fumbles NUMERIC,
-                fumble_recoveries NUMERIC,
-                passes_defended NUMERIC,
-                qb_hits NUMERIC,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created DL_STATS table")
+def readiness_facts(in_recovery, lag, version, age):
+    return {
+        'database': {'connected': True, 'in_recovery': in_recovery, 'replication_lag_seconds': lag},
+        'data': {'version': version, 'age_seconds': age},
+    }
 
-        # Create DB stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS db_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                tackles NUMERIC,
-                tackles_ast NUMERIC,
-                sacks NUMERIC,
-                tackles_tfl NUMERIC,
-                interceptions NUMERIC,
-                forced_fumbles NUMERIC,
-                fumble_recoveries NUMERIC,
-                passes_defended NUMERIC,
-                qb_hits NUMERIC,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created DB_STATS table")
+# Guard rails for ad-hoc queries, such as the dashboard's SQL tab
+QUERY_STATEMENT_TIMEOUT_MS = int(os.getenv('QUERY_STATEMENT_TIMEOUT_MS', 5000))
+QUERY_MAX_ROWS = int(os.getenv('QUERY_MAX_ROWS', 10000))
+QUERY_CHUNK_SIZE = int(os.getenv('QUERY_CHUNK_SIZE', 500))
 
-        # Create K stats table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS k_stats (
-                playerid VARCHAR(10) PRIMARY KEY,
-                playername VARCHAR(100) NOT NULL,
-                team VARCHAR(3) REFERENCES teams(team_code),
-                fieldgoals INTEGER,
-                fieldgoalattempts INTEGER,
-                extrapoints INTEGER,
-                extrapointattempts INTEGER,
-                totalpoints NUMERIC,
-                rank INTEGER
-            )
-        """)
-        print("Created K stats table")
+# SQL lexemes that may contain a semicolon without ending the statement
+_SQL_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<escape_string>[eE]'(?:[^'\\]|\\.|'')*'?)
+  | (?P<string>'(?:[^']|'')*'?)
+  | (?P<identifier>"(?:[^"]|"")*"?)
+  | (?P<dollar_quote>\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$)
+  | (?P<semicolon>;)
+  | (?P<word>[A-Za-z0-9_$]+)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
 
-        # Create triggers for team code validation
-        cur.execute("""
-            CREATE OR REPLACE FUNCTION validate_team_code()
-            RETURNS TRIGGER AS $$
+def single_statement(query):
+    """``query`` without its trailing semicolon; ValueError if it holds more than one statement.
+
+    Semicolons inside string literals, quoted identifiers, dollar-quoted
+    strings and comments do not end a statement.
+    """
+    end = None
+    pos = 0
+    while pos < len(query):
+        token = _SQL_TOKEN.match(query, pos)
+        kind, pos = token.lastgroup, token.end()
+        if kind == 'block_comment':
+            # Block comments nest in Postgres
+            depth = 1
+            while depth and pos < len(query):
+                if query.startswith('/*', pos):
+                    depth, pos = depth + 1, pos + 2
+                elif query.startswith('*/', pos):
+                    depth, pos = depth - 1, pos + 2
+                else:
+                    pos += 1
+        elif kind == 'dollar_quote':
+            close = query.find(token.group(), pos)
+            pos = len(query) if close < 0 else close + len(token.group())
+        if kind in ('space', 'line_comment', 'block_comment'):
+            continue
+        if end is not None:
+            raise ValueError("Only a single SQL statement is allowed")
+        if kind == 'semicolon':
+            end = token.start()
+    return query[:end].strip() if end is not None else query.strip()
+
+class ReadOnlyQuery:
+    """An ad-hoc query run in a read-only transaction with a statement timeout.
+
+    The query must be a single statement, and the session's transactions all
+    default to read-only while it runs, so a ``COMMIT`` cannot open a writable
+    one. Rows are fetched from a server-side (named) cursor ``chunk_size`` at
+    a time and never more than ``max_rows`` in total, so a runaway query
+    cannot fill the client's memory. ``cancel()`` may be called from another
+    thread to abort the statement running on the server.
+    """
+
+    def __init__(self, conn, query, chunk_size=QUERY_CHUNK_SIZE, max_rows=QUERY_MAX_ROWS,
+                 statement_timeout=QUERY_STATEMENT_TIMEOUT_MS):
+        self.conn = conn
+        self.query = single_statement(query)
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.statement_timeout = statement_timeout
+        self.columns = None
+        self.row_count = 0
+        self.truncated = False
+        self._begun = False
+
+    def _set_session(self, statement):
+        """Run ``statement`` outside any transaction, so a rollback does not undo it"""
+        self.conn.rollback()
+        self.conn.autocommit = True
+        cur = self.conn.cursor()
+        try:
+            cur.execute(statement)
+        finally:
+            cur.close()
+            self.conn.autocommit = False
+
+    def _begin(self):
+        if self._begun:
+            return
+        self._set_session("SET default_transaction_read_only = on")
+        cur = self.conn.cursor()
+        try:
+            cur.execute("SET TRANSACTION READ ONLY")
+            cur.execute("SET LOCAL statement_timeout = %s", (int(self.statement_timeout),))
+        finally:
+            cur.close()
+        self._begun = True
+
+    def explain(self):
+        """The planner's plan for the query, as text; the query itself is not run"""
+        self._begin()
+        cur = self.conn.cursor()
+        try:
+            cur.execute("EXPLAIN " + self.query)
+            return "\n".join(row[0] for row in cur.fetchall())
+        except Exception:
+            self.close()
+            raise
+        finally:
+            cur.close()
+
+    def chunks(self):
+        """Yield lists of rows until the result or the row cap is exhausted"""
+        self._begin()
+        cur = self.conn.cursor(name=f"adhoc_{id(self):x}")
+        try:
+            cur.execute(self.query)
+            while True:
+                # Fetch one row past the cap to tell a full result from a cut-off one
+                remaining = self.max_rows - self.row_count
+                size = min(self.chunk_size, remaining + 1)
+                rows = cur.fetchmany(size)
+                if self.columns is None and cur.description is not None:
+                    self.columns = [desc[0] for desc in cur.description]
+                if len(rows) > remaining:
+                    rows = rows[:remaining]
+                    self.truncated = True
+                if rows:
+                    self.row_count += len(rows)
+                    yield rows
+                if self.truncated or len(rows) < size:
+                    break
+        finally:
+            cur.close()
+            self.close()
+
+    def close(self):
+        """Roll back and give the connection back its writable session defaults"""
+        self._set_session("RESET default_transaction_read_only")
+        self._begun = False
+
+    def cancel(self):
+        """Abort the statement currently running on the server"""
+        self.conn.cancel()
+
+def create_all_players_view(cur):
+    """Create the all_players materialized view over every stats table, with its indexes"""
+    cur.execute(CREATE_ALL_PLAYERS_SQL)
+    for index in ALL_PLAYERS_INDEXES:
+        cur.execute(index.create_sql())
+
+def refresh_all_players(cur):
+    """Rebuild all_players from the stats tables without blocking readers.
+
+    Call it after changing the stats tables, before bump_data_version, so
+    caches keyed on the version never see the old view contents.
+    """
+    cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {ALL_PLAYERS_VIEW}")
+
+# Bookkeeping of the incremental sync, dropped with the stats tables on reset
+SYNC_TABLES = ('schema_migrations', 'sync_files', 'sync_records')
+
+def drop_tables(cur):
+    """Drop the stats tables, teams, the sync bookkeeping and the profile leaderboards"""
+    print("Dropping existing tables and constraints...")
+    cur.execute("".join(
+        f"DROP TABLE IF EXISTS {position.table} CASCADE;\n" for position in POSITIONS.values()
+    ) + "DROP TABLE IF EXISTS teams CASCADE;\n"
+      + "".join(f"DROP TABLE IF EXISTS {table};\n" for table in SYNC_TABLES + PROFILE_TABLES))
+
+    # Drop any existing constraints that might cause issues
+    drop_constraints = "\n".join(
+        f"                    ALTER TABLE IF EXISTS {position.table} "
+        f"DROP CONSTRAINT IF EXISTS unique_{position.code.lower()}_rank;"
+        for position in POSITIONS.values()
+    )
+    cur.execute(f"""
+        DO $$ 
+        BEGIN
+            -- Drop constraints if they exist
             BEGIN
-                IF NEW.team IS NOT NULL AND NOT EXISTS (SELECT 1 FROM teams WHERE team_code = NEW.team) THEN
-                    RAISE EXCEPTION 'Invalid team code: %', NEW.team;
-                END IF;
-                RETURN NEW;
+{drop_constraints}
+            EXCEPTION 
+                WHEN undefined_table THEN 
+                    NULL;
             END;
-            $$ LANGUAGE plpgsql;
+        END $$;
+    """)
+    print("Existing tables and constraints dropped")
+
+def create_schema(cur):
+    """Create teams, the stats tables, their indexes and triggers, and the all_players view.
+
+    Every statement is idempotent, so this is safe on a database that already has them.
+    """
+    # Create teams table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS teams (
+            team_code VARCHAR(3) PRIMARY KEY,
+            team_name VARCHAR(100) NOT NULL,
+            division VARCHAR(50)
+        )
+    """)
+    print("Created teams table")
+
+    # The data version survives reloads so API caches never see it go backwards
+    create_data_version_table(cur)
+
+    # Create one stats table per position from the schema registry
+    for position in POSITIONS.values():
+        cur.execute(position.create_table_sql)
+        for index in position.indexes:
+            cur.execute(index.create_sql())
+        print(f"Created {position.code} stats table")
+
+    # Create triggers for team code validation
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION validate_team_code()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.team IS NOT NULL AND NOT EXISTS (SELECT 1 FROM teams WHERE team_code = NEW.team) THEN
+                RAISE EXCEPTION 'Invalid team code: %', NEW.team;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Create triggers for each stats table
+    for table in (position.table for position in POSITIONS.values()):
+        cur.execute(f"""
+            DROP TRIGGER IF EXISTS validate_{table}_team ON {table};
+            CREATE TRIGGER validate_{table}_team
+                BEFORE INSERT OR UPDATE ON {table}
+                FOR EACH ROW
+                EXECUTE FUNCTION validate_team_code();
         """)
+    print("Created triggers")
 
-        # Create triggers for each stats table
-        for table in ['qb_stats', 'rb_stats', 'wr_stats', 'te_stats', 'lb_stats', 'dl_stats', 'db_stats', 'k_stats']:
-            cur.execute(f"""
-                DROP TRIGGER IF EXISTS validate_{table}_team ON {table};
-                CREATE TRIGGER validate_{table}_team
-                    BEFORE INSERT OR UPDATE ON {table}
-                    FOR EACH ROW
-                    EXECUTE FUNCTION validate_team_code();
-            """)
-        print("Created triggers")
+    create_all_players_view(cur)
+    print(f"Created {ALL_PLAYERS_VIEW} materialized view")
 
+def create_tables(conn):
+    """Drop and recreate every table; the data must be reloaded afterwards"""
+    print("Creating tables...")
+    cur = conn.cursor()
+    
+    try:
+        drop_tables(cur)
+        # Dropping the stats tables cascades to the view, so it is always rebuilt
+        migrate(cur)
+        bump_data_version(cur)
         conn.commit()
         print("All tables created successfully!")
     except Exception as e:
@@ -285,25 +635,388 @@ def create_tables(conn):
     finally:
         cur.close()
 
-def load_json_data(conn):
-    print("Loading data...")
+INDEX_ACTIONS = ('create', 'verify', 'rebuild', 'usage')
+
+def _index_states(cur):
+    """{index name: is valid} for the managed indexes that exist"""
+    cur.execute(
+        "SELECT c.relname, i.indisvalid FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = ANY(%s)",
+        ([index.name for index in INDEXES],)
+    )
+    return dict(cur.fetchall())
+
+def create_indexes(conn):
+    """Create any missing secondary index without blocking writes"""
+    cur = conn.cursor()
+    try:
+        existing = _index_states(cur)
+        for index in INDEXES:
+            if index.name in existing:
+                continue
+            started = time.perf_counter()
+            cur.execute(index.create_sql(concurrently=True))
+            print(f"Created index {index.name} in {time.perf_counter() - started:.2f}s")
+    finally:
+        cur.close()
+
+def verify_indexes(conn):
+    """Report missing or invalid secondary indexes; returns the problem indexes.
+
+    A CREATE INDEX CONCURRENTLY that fails part way leaves an invalid index
+    behind, which the planner ignores; ``rebuild`` repairs it.
+    """
+    cur = conn.cursor()
+    try:
+        existing = _index_states(cur)
+    finally:
+        cur.close()
+    problems = []
+    for index in INDEXES:
+        if index.name not in existing:
+            status = 'missing'
+        elif not existing[index.name]:
+            status = 'invalid'
+        else:
+            status = 'ok'
+        print(f"{index.name:<32} {status}")
+        if status != 'ok':
+            problems.append(index.name)
+    print(f"{len(INDEXES) - len(problems)} of {len(INDEXES)} indexes ok")
+    return problems
+
+def rebuild_indexes(conn):
+    """Rebuild every secondary index concurrently, creating missing ones"""
+    cur = conn.cursor()
+    try:
+        existing = _index_states(cur)
+        for index in INDEXES:
+            started = time.perf_counter()
+            if index.name in existing:
+                cur.execute(f"REINDEX INDEX CONCURRENTLY {index.name}")
+                print(f"Rebuilt index {index.name} in {time.perf_counter() - started:.2f}s")
+            else:
+                cur.execute(index.create_sql(concurrently=True))
+                print(f"Created index {index.name} in {time.perf_counter() - started:.2f}s")
+    finally:
+        cur.close()
+
+def index_usage(conn):
+    """Print scan counts per index next to each table's sequential scans"""
+    tables = sorted({index.table for index in INDEXES})
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT t.relname, t.seq_scan, COALESCE(t.idx_scan, 0),
+                   i.indexrelname, i.idx_scan, i.idx_tup_read,
+                   pg_size_pretty(pg_relation_size(i.indexrelid))
+            FROM pg_stat_user_tables t
+            LEFT JOIN pg_stat_user_indexes i ON i.relid = t.relid
+            WHERE t.relname = ANY(%s)
+            ORDER BY t.relname, i.indexrelname
+        """, (tables,))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    print(f"{'Table':<14} {'Seq scans':>10} {'Idx scans':>10}  {'Index':<32} {'Scans':>10} {'Tuples read':>12} {'Size':>8}")
+    for table, seq_scans, idx_scans, index, scans, tuples, size in rows:
+        print(f"{table:<14} {seq_scans:>10} {idx_scans:>10}  {index or '-':<32} "
+              f"{scans if scans is not None else '-':>10} {tuples if tuples is not None else '-':>12} {size or '-':>8}")
+    return rows
+
+def manage_indexes(action):
+    """Run one ``python -m src.database indexes`` action on its own connection"""
+    conn = connect()
+    # CONCURRENTLY statements cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        if action == 'create':
+            create_indexes(conn)
+        elif action == 'verify':
+            if verify_indexes(conn):
+                raise Exception("Some indexes are missing or invalid, run: python -m src.database indexes rebuild")
+        elif action == 'rebuild':
+            rebuild_indexes(conn)
+        elif action == 'usage':
+            index_usage(conn)
+        else:
+            raise ValueError(f"Unknown index action {action!r}, expected one of: {', '.join(INDEX_ACTIONS)}")
+    finally:
+        conn.close()
+
+LOAD_MODES = ('executemany', 'values', 'copy')
+
+# Rows handed to a single executemany or multi-row INSERT while streaming a season file
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 1000))
+
+# Position tables loaded concurrently, each on its own connection
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', 1))
+LOAD_EXECUTORS = ('thread', 'process')
+
+# Season files read by the loader and the local backend
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'))
+
+def iter_json_records(path, chunk_size=64 * 1024):
+    """Yield records one at a time from a JSON array or newline-delimited JSON file.
+
+    Only one chunk of the file plus the record being decoded is held in memory,
+    so large season files can be loaded without building the whole list first.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(chunk_size)
+        while buffer and not buffer.strip():
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+        start = len(buffer) - len(buffer.lstrip())
+        if buffer[start:start + 1] != '[':
+            # Newline-delimited JSON: one record per line
+            f.seek(0)
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{os.path.basename(path)} line {line_number}: {e}") from None
+            return
+
+        pos = start + 1
+        eof = False
+        while True:
+            # Skip separators between records, refilling the buffer as needed
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+
+            if pos >= len(buffer):
+                raise ValueError(f"{os.path.basename(path)}: unterminated JSON array")
+            if buffer[pos] == ']':
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # A value that runs to the end of the buffer may be truncated
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if complete:
+                yield record
+                pos = end
+                continue
+
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def convert_records(records, convert, label):
+    """Convert raw season records into table rows, skipping malformed players"""
+    for player in records:
+        try:
+            yield convert(player)
+        except Exception:
+            print(f"Skipping {label} {player.get('PlayerName', 'Unknown')}")
+
+def upsert_sql(table, columns, source=None, multirow=False):
+    """Build an upsert keyed on playerid, from VALUES or from another table.
+
+    With ``multirow`` the VALUES list is a single ``%s`` for ``execute_values``.
+    """
+    column_list = ', '.join(columns)
+    updates = ',\n                '.join(f"{c} = EXCLUDED.{c}" for c in columns if c != 'playerid')
+    if multirow:
+        rows = "VALUES %s"
+    elif source is None:
+        rows = f"VALUES ({', '.join(['%s'] * len(columns))})"
+    else:
+        # A staging table may hold the same player twice; keep the last copy
+        rows = (f"SELECT DISTINCT ON (playerid) {column_list} FROM {source} "
+                f"ORDER BY playerid, ctid DESC")
+    return f"""
+            INSERT INTO {table} ({column_list})
+            {rows}
+            ON CONFLICT (playerid) DO UPDATE
+            SET {updates}
+        """
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class CopyStream:
+    """File-like object that renders rows as COPY text format on demand"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += '\t'.join(map(_copy_value, row)) + '\n'
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    readline = read
+
+def copy_upsert(cur, table, columns, rows):
+    """Stream rows into a staging table with COPY, then merge them in one statement.
+
+    Returns the number of rows copied.
+    """
+    staging = f"{table}_staging"
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging}
+            (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+        TRUNCATE {staging};
+    """)
+    stream = CopyStream(rows)
+    cur.copy_expert(f"COPY {staging} ({', '.join(columns)}) FROM STDIN", stream)
+    if stream.count:
+        cur.execute(upsert_sql(table, columns, source=staging))
+    return stream.count
+
+def load_rows(cur, table, columns, rows, mode='executemany', batch_size=LOAD_BATCH_SIZE):
+    """Write converted rows into a stats table.
+
+    ``rows`` may be any iterable; it is consumed in batches of ``batch_size``
+    (executemany, or one multi-row INSERT per batch with ``values``) or streamed
+    straight into COPY, so it is never materialized.
+    Returns ``(row_count, elapsed_seconds)``.
+    """
+    started = time.perf_counter()
+    if mode == 'copy':
+        count = copy_upsert(cur, table, columns, rows)
+    elif mode == 'values':
+        count = 0
+        query = upsert_sql(table, columns, multirow=True)
+        for batch in batched(rows, batch_size):
+            # One INSERT cannot update the same row twice; keep each player's last record
+            execute_values(cur, query, list({row[0]: row for row in batch}.values()),
+                           page_size=batch_size)
+            count += len(batch)
+    else:
+        count = 0
+        query = upsert_sql(table, columns)
+        for batch in batched(rows, batch_size):
+            cur.executemany(query, batch)
+            count += len(batch)
+    return count, time.perf_counter() - started
+
+def report_load(label, count, elapsed):
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"Loaded {count} {label}s in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+def load_position(conn, pos, mode='executemany', batch_size=LOAD_BATCH_SIZE, data_dir=DATA_DIR):
+    """Load one position's season file on ``conn`` and commit it.
+
+    Returns a report entry instead of raising, so a failing position does not
+    stop the others.
+    """
+    position = POSITIONS[pos]
+    filename = position.filename
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        # Points are computed for the whole table afterwards, not row by row
+        disable_scoring_triggers(cur)
+        path = os.path.join(data_dir, filename)
+        rows = convert_records(iter_json_records(path), position.convert, pos)
+        # Hashed as they stream past, so the next sync knows these rows are current
+        hashes = {}
+        count, elapsed = load_rows(cur, position.table, position.column_names,
+                                   hash_rows(rows, hashes), mode, batch_size)
+        record_sync_state(cur, position, path, hashes)
+        # Committed but not yet published: the data version is bumped only once
+        # load_json_data has rescored the rows and refreshed the views
+        conn.commit()
+        report_load(pos, count, elapsed)
+        return {'position': pos, 'rows': count, 'seconds': time.perf_counter() - started, 'error': None}
+    except Exception as e:
+        print(f"Error loading {pos} from {filename}: {str(e)}")
+        conn.rollback()
+        return {'position': pos, 'rows': 0, 'seconds': time.perf_counter() - started, 'error': str(e)}
+    finally:
+        cur.close()
+
+def _load_position_task(pos, mode, batch_size, data_dir):
+    # Runs in a worker thread or process, each with its own connection
+    conn = connect()
+    try:
+        return load_position(conn, pos, mode, batch_size, data_dir)
+    finally:
+        conn.close()
+
+def print_load_report(results, elapsed):
+    """Print one consolidated summary of a load run"""
+    print("\nPosition  Rows      Seconds   Rows/sec  Status")
+    for result in results:
+        rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+        status = 'ok' if result['error'] is None else f"FAILED: {result['error']}"
+        print(f"{result['position']:<9} {result['rows']:<9} {result['seconds']:<9.2f} {rate:<9,.0f} {status}")
+    total = sum(result['rows'] for result in results)
+    failed = [result['position'] for result in results if result['error'] is not None]
+    print(f"Total: {total} rows in {elapsed:.2f}s, "
+          f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+
+def load_json_data(conn, mode='executemany', batch_size=LOAD_BATCH_SIZE,
+                   workers=LOAD_WORKERS, executor='thread', data_dir=DATA_DIR):
+    """Load the season files into the stats tables.
+
+    ``mode`` selects how rows are written: ``executemany`` upserts row by row,
+    ``values`` sends one multi-row upsert per batch, and ``copy`` streams them
+    into a staging table and merges them in one statement.
+    Season files are read incrementally and may be JSON arrays or NDJSON.
+
+    Teams are always loaded first on ``conn``. With ``workers`` > 1 the position
+    tables are then loaded concurrently, each on its own connection, using a
+    ``thread`` or ``process`` pool. Returns the per-position report.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode!r}, expected one of: {', '.join(LOAD_MODES)}")
+    if executor not in LOAD_EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of: {', '.join(LOAD_EXECUTORS)}")
+    print(f"Loading data ({mode}, {workers} worker{'s' if workers != 1 else ''})...")
     cur = conn.cursor()
     
     try:
         # Check if all required files exist
-        required_files = ['teams.json', 'QB_season.json', 'RB_season.json', 'WR_season.json', 
-                         'TE_season.json', 'LB_season.json', 'DL_season.json', 'DB_season.json', 
-                         'K_season.json']
-        
-        # Get the data directory path
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        
+        required_files = ['teams.json'] + [position.filename for position in POSITIONS.values()]
+
         missing_files = [f for f in required_files if not os.path.exists(os.path.join(data_dir, f))]
         if missing_files:
             raise FileNotFoundError(f"Missing required files: {', '.join(missing_files)}")
 
         # Load teams data first
-        with open(os.path.join(data_dir, 'teams.json'), 'r') as f:
+        teams_path = os.path.join(data_dir, 'teams.json')
+        with open(teams_path, 'r') as f:
             teams_data = json.load(f)
             print(f"Loading teams data...")
             loaded_count = 0
@@ -327,238 +1040,51 @@ def load_json_data(conn):
                     except Exception as e:
                         print(f"Error loading team {team.get('team_name')}: {str(e)}")
                         continue
+                if loaded_count == len(teams_data):
+                    _record_file(cur, 'teams.json', file_sha256(teams_path), loaded_count)
                 conn.commit()
                 print(f"Successfully loaded {loaded_count} teams!")
 
-        # Load QB stats
-        with open(os.path.join(data_dir, 'QB_season.json'), 'r') as f:
-            qb_data = json.load(f)
-            values = []
-            for player in qb_data:
+        # The position tables only depend on teams, so they can load independently
+        started = time.perf_counter()
+        positions = list(POSITIONS)
+        if workers > 1:
+            pool_class = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+            with pool_class(max_workers=workers) as pool:
+                futures = [pool.submit(_load_position_task, pos, mode, batch_size, data_dir)
+                           for pos in positions]
+            results = []
+            for pos, future in zip(positions, futures):
                 try:
-                    # Fast conversion with minimal validation
-                    values.append((
-                        player.get('PlayerId'), player.get('PlayerName'), player.get('Team'),
-                        int(player.get('PassingYDS', 0) or 0),
-                        int(player.get('PassingTD', 0) or 0),
-                        int(player.get('PassingInt', 0) or 0),
-                        int(player.get('RushingYDS', 0) or 0),
-                        int(player.get('RushingTD', 0) or 0),
-                        float(player.get('TotalPoints', 0) or 0),
-                        int(player.get('Rank', 999) or 999)
-                    ))
+                    results.append(future.result())
                 except Exception as e:
-                    print(f"Skipping QB {player.get('PlayerName', 'Unknown')}")
-                    continue
-
-            if values:
-                # Batch insert all QBs at once
-                cur.executemany("""
-                    INSERT INTO qb_stats (playerid, playername, team, passingyards, passingtds, interceptions, rushingyards, rushingtds, totalpoints, rank)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (playerid) DO UPDATE 
-                    SET playername = EXCLUDED.playername,
-                        team = EXCLUDED.team,
-                        passingyards = EXCLUDED.passingyards,
-                        passingtds = EXCLUDED.passingtds,
-                        interceptions = EXCLUDED.interceptions,
-                        rushingyards = EXCLUDED.rushingyards,
-                        rushingtds = EXCLUDED.rushingtds,
-                        totalpoints = EXCLUDED.totalpoints,
-                        rank = EXCLUDED.rank
-                """, values)
-                conn.commit()
-                print(f"Loaded {len(values)} QBs")
-
-        # Load RB stats
-        with open(os.path.join(data_dir, 'RB_season.json'), 'r') as f:
-            rb_data = json.load(f)
-            values = []
-            for player in rb_data:
-                try:
-                    # Fast conversion with minimal validation
-                    values.append((
-                        player.get('PlayerId'), player.get('PlayerName'), player.get('Team'),
-                        int(player.get('RushingYDS', 0) or 0),
-                        int(player.get('RushingTD', 0) or 0),
-                        int(player.get('ReceivingRec', 0) or 0),
-                        int(player.get('ReceivingYDS', 0) or 0),
-                        int(player.get('ReceivingTD', 0) or 0),
-                        float(player.get('TotalPoints', 0) or 0),
-                        int(player.get('Rank', 999) or 999)
-                    ))
-                except Exception as e:
-                    print(f"Skipping RB {player.get('PlayerName', 'Unknown')}")
-                    continue
-
-            if values:
-                # Batch insert all RBs at once
-                cur.executemany("""
-                    INSERT INTO rb_stats (playerid, playername, team, rushingyards, rushingtds, receptions, receivingyards, receivingtds, totalpoints, rank)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (playerid) DO UPDATE 
-                    SET playername = EXCLUDED.playername,
-                        team = EXCLUDED.team,
-                        rushingyards = EXCLUDED.rushingyards,
-                        rushingtds = EXCLUDED.rushingtds,
-                        receptions = EXCLUDED.receptions,
-                        receivingyards = EXCLUDED.receivingyards,
-                        receivingtds = EXCLUDED.receivingtds,
-                        totalpoints = EXCLUDED.totalpoints,
-                        rank = EXCLUDED.rank
-                """, values)
-                conn.commit()
-                print(f"Loaded {len(values)} RBs")
-
-        # Load WR/TE stats
-        for pos in ['WR', 'TE']:
-            with open(os.path.join(data_dir, f'{pos}_season.json'), 'r') as f:
-                pos_data = json.load(f)
-                values = []
-                for player in pos_data:
-                    try:
-                        # Fast conversion with minimal validation
-                        values.append((
-                            player.get('PlayerId'), player.get('PlayerName'), player.get('Team'),
-                            int(player.get('ReceivingRec', 0) or 0),
-                            int(player.get('Targets', 0) or 0),
-                            int(player.get('ReceivingYDS', 0) or 0),
-                            int(player.get('ReceivingTD', 0) or 0),
-                            float(player.get('TotalPoints', 0) or 0),
-                            int(player.get('Rank', 999) or 999)
-                        ))
-                    except Exception as e:
-                        print(f"Skipping {pos} {player.get('PlayerName', 'Unknown')}")
-                        continue
+                    # The worker failed outside load_position, e.g. while connecting
+                    print(f"Error loading {pos}: {str(e)}")
+                    results.append({'position': pos, 'rows': 0, 'seconds': 0.0, 'error': str(e)})
+        else:
+            results = [load_position(conn, pos, mode, batch_size, data_dir) for pos in positions]
+        print_load_report(results, time.perf_counter() - started)
 
-                if values:
-                    # Batch insert all players at once
-                    cur.executemany(f"""
-                        INSERT INTO {pos.lower()}_stats (playerid, playername, team, receptions, targets, receivingyards, receivingtds, totalpoints, rank)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (playerid) DO UPDATE 
-                        SET playername = EXCLUDED.playername,
-                            team = EXCLUDED.team,
-                            receptions = EXCLUDED.receptions,
-                            targets = EXCLUDED.targets,
-                            receivingyards = EXCLUDED.receivingyards,
-                            receivingtds = EXCLUDED.receivingtds,
-                            totalpoints = EXCLUDED.totalpoints,
-                            rank = EXCLUDED.rank
-                    """, values)
-                    conn.commit()
-                    print(f"Loaded {len(values)} {pos}s")
-
-        # Load defensive player stats (LB, DL, DB)
-        for pos in ['LB', 'DL', 'DB']:
-            try:
-                if not os.path.exists(os.path.join(data_dir, f'{pos}_season.json')):
-                    print(f"Warning: {pos}_season.json not found")
-                    continue
-                    
-                with open(os.path.join(data_dir, f'{pos}_season.json'), 'r') as f:
-                    def_data = json.load(f)
-                    if not def_data:
-                        continue
-                        
-                    values = []
-                    for player in def_data:
-                        try:
-                            # Fast conversion with minimal validation
-                            values.append((
-                                player.get('PlayerId'), player.get('PlayerName'), player.get('Team'),
-                                float(player.get('TacklesTot', 0) or 0),
-                                float(player.get('TacklesAst', 0) or 0),
-                                float(player.get('TacklesSck', 0) or 0),
-                                float(player.get('TacklesTfl', 0) or 0),
-                                float(player.get('TurnoverInt', 0) or 0),
-                                float(player.get('TurnoverFrcFum', 0) or 0),
-                                float(player.get('TurnoverFumRec', 0) or 0),
-                                float(player.get('PDef', 0) or 0),
-                                float(player.get('QBHit', 0) or 0),
-                                float(player.get('TotalPoints', 0) or 0),
-                                int(player.get('Rank', 999) or 999)
-                            ))
-                        except Exception as e:
-                            print(f"Skipping {pos} {player.get('PlayerName', 'Unknown')}")
-                            continue
-
-                    if values:
-                        # Batch insert all players at once
-                        cur.executemany(f"""
-                            INSERT INTO {pos.lower()}_stats (
-                                playerid, playername, team, 
-                                tackles, tackles_ast, sacks, tackles_tfl,
-                                interceptions, forced_fumbles, fumble_recoveries,
-                                passes_defended, qb_hits, totalpoints, rank
-                            )
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (playerid) DO UPDATE 
-                            SET playername = EXCLUDED.playername,
-                                team = EXCLUDED.team,
-                                tackles = EXCLUDED.tackles,
-                                tackles_ast = EXCLUDED.tackles_ast,
-                                sacks = EXCLUDED.sacks,
-                                tackles_tfl = EXCLUDED.tackles_tfl,
-                                interceptions = EXCLUDED.interceptions,
-                                forced_fumbles = EXCLUDED.forced_fumbles,
-                                fumble_recoveries = EXCLUDED.fumble_recoveries,
-                                passes_defended = EXCLUDED.passes_defended,
-                                qb_hits = EXCLUDED.qb_hits,
-                                totalpoints = EXCLUDED.totalpoints,
-                                rank = EXCLUDED.rank
-                        """, values)
-                        conn.commit()
-                        print(f"Loaded {len(values)} {pos}s")
-            except Exception as e:
-                print(f"Error processing {pos}_season.json")
-
-        # Load K stats
-        with open(os.path.join(data_dir, 'K_season.json'), 'r') as f:
-            k_data = json.load(f)
-            values = []
-            for player in k_data:
-                try:
-                    # Fast conversion with minimal validation
-                    fg_made = sum(int(player.get(f'FgMade_{rng}', 0) or 0) for rng in ['0-19', '20-29', '30-39', '40-49', '50'])
-                    fg_miss = sum(int(player.get(f'FgMiss_{rng}', 0) or 0) for rng in ['0-19', '20-29', '30-39'])
-                    fg_attempts = fg_made + fg_miss
-                    
-                    pat_made = int(player.get('PatMade', 0) or 0)
-                    pat_missed = int(player.get('PatMissed', 0) or 0)
-                    pat_attempts = pat_made + pat_missed
-                    
-                    total_points = float(player.get('TotalPoints', 0) or 0)
-                    rank = int(player.get('Rank', 999) or 999)
-
-                    values.append((
-                        player.get('PlayerId'), player.get('PlayerName'), player.get('Team'),
-                        fg_made, fg_attempts, pat_made, pat_attempts,
-                        total_points, rank
-                    ))
-                except Exception as e:
-                    print(f"Skipping K {player.get('PlayerName', 'Unknown')}")
-                    continue
-
-            if values:
-                # Batch insert all kickers at once
-                cur.executemany("""
-                    INSERT INTO k_stats (playerid, playername, team, fieldgoals, fieldgoalattempts, extrapoints, extrapointattempts, totalpoints, rank)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (playerid) DO UPDATE 
-                    SET playername = EXCLUDED.playername,
-                        team = EXCLUDED.team,
-                        fieldgoals = EXCLUDED.fieldgoals,
-                        fieldgoalattempts = EXCLUDED.fieldgoalattempts,
-                        extrapoints = EXCLUDED.extrapoints,
-                        extrapointattempts = EXCLUDED.extrapointattempts,
-                        totalpoints = EXCLUDED.totalpoints,
-                        rank = EXCLUDED.rank
-                """, values)
-                conn.commit()
-                print(f"Loaded {len(values)} Ks")
+        failed = [result['position'] for result in results if result['error'] is not None]
+        loaded = [result['position'] for result in results if result['error'] is None]
 
+        # Publish the loaded rows to the cross-position view in one refresh. The
+        # positions that loaded are already committed, so they are scored and
+        # published even when others failed, rather than served unscored.
+        if loaded:
+            started = time.perf_counter()
+            rescored = rescore(cur, loaded)
+            if rescored:
+                print(f"Rescored {sum(rescored.values())} rows of {', '.join(rescored)}")
+            refresh_profile_points(cur, loaded)
+            refresh_all_players(cur)
+            bump_data_version(cur)
+            conn.commit()
+            print(f"Refreshed {ALL_PLAYERS_VIEW} in {time.perf_counter() - started:.2f}s")
+        if failed:
+            raise Exception(f"Failed to load positions: {', '.join(failed)}")
         print("Successfully loaded all data!")
+        return results
     except Exception as e:
         print(f"Error loading data: {str(e)}")
         conn.rollback()
@@ -567,6 +1093,244 @@ def load_json_data(conn):
         cur.close()
         conn.close()
 
+def create_sync_state(cur):
+    """Create the tables recording what the last sync wrote"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sync_files (
+            filename VARCHAR(100) PRIMARY KEY,
+            sha256 CHAR(64) NOT NULL,
+            records INTEGER NOT NULL,
+            synced_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS sync_records (
+            table_name VARCHAR(63) NOT NULL,
+            playerid VARCHAR(10) NOT NULL,
+            hash CHAR(32) NOT NULL,
+            PRIMARY KEY (table_name, playerid)
+        );
+    """)
+
+# Schema migrations as (version, description, function(cur)), applied in order
+# by ``migrate`` and recorded in schema_migrations. Applied migrations never run
+# again, so schema changes go in as new entries rather than edits to old ones.
+MIGRATIONS = (
+    (1, 'teams, stats tables, triggers and all_players view', create_schema),
+    (2, 'incremental sync state', create_sync_state),
+    (3, 'scoring profiles and precomputed leaderboards', create_scoring_tables),
+)
+
+# Serializes syncs; any constant shared by every process works
+SYNC_LOCK_ID = 20240901
+
+def migrate(cur):
+    """Apply pending migrations in the current transaction; returns their versions"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cur.fetchall()}
+    pending = [migration for migration in MIGRATIONS if migration[0] not in applied]
+    for version, description, apply in pending:
+        print(f"Applying migration {version}: {description}")
+        apply(cur)
+        cur.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+    return [migration[0] for migration in pending]
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def row_hash(row):
+    """Hash of a converted row; changes only when a stored value changes"""
+    return hashlib.blake2b(repr(row).encode(), digest_size=16).hexdigest()
+
+def hash_rows(rows, hashes):
+    """Yield ``rows``, storing each one's row_hash in ``hashes`` by playerid"""
+    for row in rows:
+        # Later records replace earlier ones with the same playerid, like the upsert
+        hashes[row[0]] = row_hash(row)
+        yield row
+
+def record_sync_state(cur, position, path, hashes):
+    """Record a full load of ``position`` from ``path`` as if a sync had written it.
+
+    The file's SHA-256 is only recorded when the table holds exactly the file's
+    players. Otherwise the next sync re-reads the file to delete the others,
+    but the row hashes still spare it rewriting the loaded players.
+    """
+    table = position.table
+    cur.execute("DELETE FROM sync_records WHERE table_name = %s", (table,))
+    execute_values(cur, "INSERT INTO sync_records (table_name, playerid, hash) VALUES %s",
+                   [(table, playerid, digest) for playerid, digest in hashes.items()],
+                   page_size=LOAD_BATCH_SIZE)
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    if cur.fetchone()[0] == len(hashes):
+        _record_file(cur, position.filename, file_sha256(path), len(hashes))
+    else:
+        cur.execute("DELETE FROM sync_files WHERE filename = %s", (position.filename,))
+
+def _record_file(cur, filename, sha256, records):
+    cur.execute("""
+        INSERT INTO sync_files (filename, sha256, records) VALUES (%s, %s, %s)
+        ON CONFLICT (filename) DO UPDATE
+        SET sha256 = EXCLUDED.sha256, records = EXCLUDED.records, synced_at = now()
+    """, (filename, sha256, records))
+
+def sync_teams(cur, path, sha256, force=False):
+    """Upsert new and changed teams; teams are never deleted since players reference them"""
+    cur.execute("SELECT team_code, team_name, division FROM teams")
+    existing = {row[0]: row for row in cur.fetchall()}
+    teams = [(team['team_code'], team['team_name'], team.get('division'))
+             for team in iter_json_records(path)]
+    changed = [team for team in teams if force or existing.get(team[0]) != team]
+    cur.executemany("""
+        INSERT INTO teams (team_code, team_name, division)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (team_code) DO UPDATE
+        SET team_name = EXCLUDED.team_name,
+            division = EXCLUDED.division
+    """, changed)
+    _record_file(cur, 'teams.json', sha256, len(teams))
+    inserted = sum(team[0] not in existing for team in changed)
+    return {
+        'inserted': inserted,
+        'updated': len(changed) - inserted,
+        'deleted': 0,
+        'unchanged': len(teams) - len(changed),
+    }
+
+def sync_position(cur, position, path, sha256, mode='executemany', force=False):
+    """Write the players of one season file that differ from the last sync.
+
+    New players and players whose converted row hashes differently are
+    upserted; players no longer in the file are deleted. With ``force`` every
+    player is rewritten. Returns the counts for the sync report.
+    """
+    table = position.table
+    cur.execute("SELECT playerid, hash FROM sync_records WHERE table_name = %s", (table,))
+    known = dict(cur.fetchall())
+    cur.execute(f"SELECT playerid FROM {table}")
+    existing = {row[0] for row in cur.fetchall()}
+
+    # Later records replace earlier ones with the same playerid, like the upsert
+    rows = {}
+    for row in convert_records(iter_json_records(path), position.convert, position.code):
+        rows[row[0]] = row
+
+    changed, hashes = [], []
+    inserted = 0
+    for playerid, row in rows.items():
+        digest = row_hash(row)
+        if force or playerid not in existing or known.get(playerid) != digest:
+            changed.append(row)
+            hashes.append((table, playerid, digest))
+            inserted += playerid not in existing
+    removed = list(existing - rows.keys())
+    stale = list(known.keys() - rows.keys())
+
+    load_rows(cur, table, position.column_names, changed, mode)
+    if removed:
+        cur.execute(f"DELETE FROM {table} WHERE playerid = ANY(%s)", (removed,))
+    if stale:
+        cur.execute("DELETE FROM sync_records WHERE table_name = %s AND playerid = ANY(%s)",
+                    (table, stale))
+    execute_values(cur, """
+        INSERT INTO sync_records (table_name, playerid, hash) VALUES %s
+        ON CONFLICT (table_name, playerid) DO UPDATE SET hash = EXCLUDED.hash
+    """, hashes, page_size=LOAD_BATCH_SIZE)
+    _record_file(cur, position.filename, sha256, len(rows))
+    return {
+        'inserted': inserted,
+        'updated': len(changed) - inserted,
+        'deleted': len(removed),
+        'unchanged': len(rows) - len(changed),
+    }
+
+def print_sync_report(results, elapsed):
+    """Print what a sync run changed, one line per season file"""
+    print("\nFile                 Inserted  Updated   Deleted   Unchanged")
+    for filename, result in results.items():
+        if result is None:
+            print(f"{filename:<20} {'file unchanged, skipped'}")
+        else:
+            print(f"{filename:<20} {result['inserted']:<9} {result['updated']:<9} "
+                  f"{result['deleted']:<9} {result['unchanged']}")
+    written = sum(r['inserted'] + r['updated'] + r['deleted'] for r in results.values() if r)
+    print(f"Total: {written} rows written in {elapsed:.2f}s")
+
+def sync_data(conn, mode='executemany', force=False, data_dir=DATA_DIR):
+    """Bring the database up to date with the season files without dropping anything.
+
+    Pending migrations are applied first. Files whose SHA-256 matches the last
+    sync are skipped and, within changed files, only players whose rows differ
+    are written, with the points triggers off and one rescore of each changed
+    table at the end. Everything, including the all_players refresh and the data
+    version bump, commits in one transaction, so readers see either the old or
+    the new data and never an empty table. Returns the per-file report.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode!r}, expected one of: {', '.join(LOAD_MODES)}")
+    required_files = ['teams.json'] + [position.filename for position in POSITIONS.values()]
+    missing_files = [f for f in required_files if not os.path.exists(os.path.join(data_dir, f))]
+    if missing_files:
+        raise FileNotFoundError(f"Missing required files: {', '.join(missing_files)}")
+
+    print(f"Syncing data ({mode}{', forced' if force else ''})...")
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        # Concurrent syncs would compute their changes from the same old state
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (SYNC_LOCK_ID,))
+        applied = migrate(cur)
+        disable_scoring_triggers(cur)
+
+        cur.execute("SELECT filename, sha256 FROM sync_files")
+        synced = dict(cur.fetchall())
+        results = {}
+
+        path = os.path.join(data_dir, 'teams.json')
+        sha256 = file_sha256(path)
+        if force or synced.get('teams.json') != sha256:
+            results['teams.json'] = sync_teams(cur, path, sha256, force)
+        else:
+            results['teams.json'] = None
+
+        for position in POSITIONS.values():
+            path = os.path.join(data_dir, position.filename)
+            sha256 = file_sha256(path)
+            if not force and synced.get(position.filename) == sha256:
+                results[position.filename] = None
+                continue
+            results[position.filename] = sync_position(cur, position, path, sha256, mode, force)
+
+        written = sum(r['inserted'] + r['updated'] + r['deleted'] for r in results.values() if r)
+        if written or applied:
+            changed = [code for code, position in POSITIONS.items() if results[position.filename]]
+            rescore(cur, changed)
+            # A new migration may have created the leaderboards, so fill all of them
+            refresh_profile_points(cur, None if applied else changed)
+            refresh_all_players(cur)
+            bump_data_version(cur)
+        conn.commit()
+        print_sync_report(results, time.perf_counter() - started)
+        return results
+    except Exception as e:
+        print(f"Error syncing data: {str(e)}")
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
 def load_teams_data():
     print("\nLoading teams data...")
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -613,12 +1377,42 @@ def load_teams_data():
         cur.close()
         conn.close()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the NFL stats tables and load the season files")
+    parser.add_argument('--mode', choices=LOAD_MODES, default='executemany',
+                        help="how rows are written (values batches rows into one INSERT; copy is much faster for large files)")
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE,
+                        help="rows per executemany or values batch while streaming season files")
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS,
+                        help="position tables loaded concurrently by reset, each on its own connection")
+    parser.add_argument('--executor', choices=LOAD_EXECUTORS, default='thread',
+                        help="worker pool type used when --workers is above 1")
+    parser.set_defaults(force=False)
+    commands = parser.add_subparsers(dest='command')
+    sync = commands.add_parser('sync', help="apply migrations and write only what changed (default)")
+    sync.add_argument('--force', action='store_true',
+                      help="rewrite every row even if the files and records are unchanged")
+    commands.add_parser('reset', help="drop every table, recreate the schema and reload all data")
+    indexes = commands.add_parser('indexes', help="manage the secondary indexes without reloading")
+    indexes.add_argument('action', choices=INDEX_ACTIONS,
+                         help="create missing indexes, verify they are valid, rebuild them, or report usage")
+    args = parser.parse_args(argv)
+    command = args.command or 'sync'
+
+    if command == 'indexes':
+        manage_indexes(args.action)
+        return
+
+    conn = None
     try:
         # Create a single database connection for the entire process
         conn = get_db_connection()
-        create_tables(conn)
-        load_json_data(conn)  # Pass the connection to load_json_data
+        if command == 'sync':
+            sync_data(conn, mode=args.mode, force=args.force)
+        else:
+            create_tables(conn)
+            load_json_data(conn, mode=args.mode, batch_size=args.batch_size,
+                           workers=args.workers, executor=args.executor)  # Pass the connection to load_json_data
     except Exception as e:
         print(f"Error in main: {str(e)}")
         raise
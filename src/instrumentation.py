@@ -0,0 +1,373 @@
+"""Query instrumentation, per-request timings and Prometheus-style metrics.
+
+Connections opened by ``src.database.connect`` create ``InstrumentedCursor``s,
+which time every statement and count the rows fetched. Between
+``start_request`` and ``finish_request`` those numbers, the time spent waiting
+for a pooled connection and the time spent serializing add up in the
+request's ``RequestStats``, which the API sends back as a ``Server-Timing``
+header. Everything also feeds the process-wide ``METRICS`` served at
+``/api/metrics``. Statements slower than ``SLOW_QUERY_MS`` are logged with
+their ``EXPLAIN (ANALYZE, BUFFERS)`` plan.
+"""
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Statements taking longer are logged; 0 turns the slow-query log off
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+# Re-run slow SELECTs under EXPLAIN (ANALYZE, BUFFERS) and log the plan
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() in ('1', 'true', 'yes')
+# Longest statement text written to the slow-query log
+SLOW_QUERY_MAX_LENGTH = 2000
+
+# Send per-request timings to clients in a Server-Timing header
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds of the latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative histogram of observed values, Prometheus style"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        # labels -> [bucket counts..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {labels: list(series) for labels, series in self._values.items()}
+        for labels, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.label_names, labels, [('le', _number(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-2])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}"
+
+
+class Metrics:
+    """The metrics of this process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def render(self, extra=()):
+        """Exposition text; ``extra`` are (name, type, help, value) read at scrape time"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, kind, help, value in extra:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+REQUESTS = METRICS.counter('nfl_api_requests_total', "HTTP requests served", ('method', 'endpoint', 'status'))
+REQUEST_SECONDS = METRICS.histogram('nfl_api_request_duration_seconds', "Time to build each response", ('endpoint',))
+QUERIES = METRICS.counter('nfl_db_queries_total', "SQL statements executed", ('kind',))
+QUERY_SECONDS = METRICS.histogram('nfl_db_query_duration_seconds', "Time spent executing and fetching each statement", ('kind',))
+ROWS_FETCHED = METRICS.counter('nfl_db_rows_fetched_total', "Rows fetched from the database")
+SLOW_QUERIES = METRICS.counter('nfl_db_slow_queries_total', "Statements slower than SLOW_QUERY_MS")
+ACQUIRE_SECONDS = METRICS.histogram('nfl_db_connection_acquire_seconds', "Time to check a connection out of the pool")
+SERIALIZE_SECONDS = METRICS.histogram('nfl_api_serialization_seconds', "Time spent encoding and compressing response bodies")
+
+
+class RequestStats:
+    """Database and serialization work done for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.acquires = 0
+        self.acquire_time = 0.0
+        self.serialize_time = 0.0
+        # Batch requests add to the same stats from several threads
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def server_timing(self):
+        """Value of the Server-Timing header, durations in milliseconds"""
+        total = time.perf_counter() - self.started
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries, {self.rows} rows"',
+            f'acquire;dur={self.acquire_time * 1000:.2f};desc="{self.acquires} connections"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+def start_request():
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+def current_request():
+    """Stats of the request being served in this context, if any"""
+    return _current.get()
+
+def finish_request(method, endpoint, status):
+    """Record the request in the metrics and return its stats"""
+    stats = _current.get()
+    _current.set(None)
+    REQUESTS.inc(1, method, endpoint, str(status))
+    if stats is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - stats.started, endpoint)
+    return stats
+
+def record_acquire(elapsed):
+    ACQUIRE_SECONDS.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(acquires=1, acquire_time=elapsed)
+
+@contextmanager
+def serializing():
+    """Count the block as serialization time"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SERIALIZE_SECONDS.observe(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.add(serialize_time=elapsed)
+
+
+def record_query(kind, elapsed, rows=0, statement=True):
+    """Add a statement, or a fetch of ``rows``, to the metrics and the request's stats.
+
+    Returns whether it was a statement slower than SLOW_QUERY_MS.
+    """
+    statements = 1 if statement else 0
+    if statements:
+        QUERIES.inc(1, kind)
+    QUERY_SECONDS.observe(elapsed, kind)
+    if rows:
+        ROWS_FETCHED.inc(rows)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(queries=statements, db_time=elapsed, rows=rows)
+    return bool(statements and SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS)
+
+def explainable(kind):
+    """Whether a slow statement of this kind has its plan logged"""
+    return SLOW_QUERY_EXPLAIN and kind in ('select', 'with')
+
+def explain_sql(kind, query):
+    """The EXPLAIN of a slow statement.
+
+    A SELECT is run again under ANALYZE, always inside a transaction or
+    savepoint that is rolled back, so functions it calls leave nothing behind.
+    A WITH may hold INSERT, UPDATE or DELETE, so it is only planned.
+    """
+    options = 'ANALYZE, BUFFERS' if kind == 'select' else 'COSTS'
+    return f"EXPLAIN ({options}) {query}"
+
+def log_slow_query(elapsed, text, plan=None):
+    SLOW_QUERIES.inc()
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+    text = str(text).strip()[:SLOW_QUERY_MAX_LENGTH]
+    if plan:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {text}\n{plan}")
+    else:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {text}")
+
+def statement_kind(query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        # psycopg2.sql.Composed and friends
+        return 'other'
+    words = query.split(None, 1)
+    return words[0].lower() if words else 'other'
+
+def _explain(conn, kind, query, vars):
+    """EXPLAIN output of a slow statement, or None if it cannot be run.
+
+    Whatever the EXPLAIN does is rolled back: to a savepoint inside the
+    caller's transaction, or with the transaction opened for it otherwise.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    in_transaction = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    # A plain cursor, so the EXPLAIN is neither timed nor explained itself
+    cur = psycopg2.extensions.cursor(conn)
+    try:
+        cur.execute("SAVEPOINT slow_query_explain" if in_transaction else "BEGIN")
+        try:
+            cur.execute(explain_sql(kind, query), vars)
+            return '\n'.join(row[0] for row in cur.fetchall())
+        except psycopg2.Error as e:
+            return f"(EXPLAIN failed: {str(e).strip()})"
+        finally:
+            if in_transaction:
+                cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain; RELEASE SAVEPOINT slow_query_explain")
+            else:
+                cur.execute("ROLLBACK")
+    except psycopg2.Error:
+        return None
+    finally:
+        cur.close()
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that times statements, counts fetched rows and logs slow queries"""
+
+    def _record(self, kind, elapsed, rows=0, query=None, vars=None):
+        """Add a statement (``query`` given) or a fetch to the metrics and the request's stats"""
+        slow = record_query(kind, elapsed, rows, statement=query is not None)
+        if slow:
+            text = self.query if self.query is not None else query
+            plan = None
+            if explainable(kind) and not self.connection.closed:
+                plan = _explain(self.connection, kind, query, vars)
+            log_slow_query(elapsed, text, plan)
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(statement_kind(query), time.perf_counter() - started, query=query, vars=vars)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            # Counted as one statement; the rows are sent in one call
+            self._record(statement_kind(query), time.perf_counter() - started, query=query)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._record('copy', time.perf_counter() - started, query=sql)
+
+    def callproc(self, procname, parameters=None):
+        started = time.perf_counter()
+        try:
+            return super().callproc(procname, parameters)
+        finally:
+            self._record('call', time.perf_counter() - started, query=procname)
+
+    # Fetches are timed too: a named cursor makes a round trip for each one
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._record('fetch', time.perf_counter() - started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._record('fetch', time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._record('fetch', time.perf_counter() - started, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
@@ -0,0 +1,221 @@
+"""Read-only in-memory store over the season files, for running the API without Postgres.
+
+The season files are parsed once with the same converters the loader uses,
+so values match what ``python -m src.database`` would have stored. Each
+position becomes a set of NumPy arrays, one per stat column, with team codes
+interned as small integers. Orderings used by the API are computed on first
+use and kept.
+"""
+import os
+import copy
+import time
+import logging
+import threading
+import numpy as np
+
+from src.database import DATA_DIR, iter_json_records, convert_records
+from src.schema import POSITIONS
+from src.scoring import PROFILES
+
+logger = logging.getLogger(__name__)
+
+NUMPY_TYPES = {
+    'INTEGER': np.int64,
+    'NUMERIC': np.float64,
+}
+
+# Columns of a team roster, matching the all_players view
+ROSTER_POSITIONS = ('QB', 'RB', 'WR', 'TE')
+
+class PositionTable:
+    """Columnar copy of one position's stats table"""
+
+    def __init__(self, position, rows, team_ids):
+        self.position = position
+        # Later records replace earlier ones with the same playerid, like the loader's upsert
+        rows = list({row[0]: row for row in rows}.values())
+        self.size = len(rows)
+        values = list(zip(*rows)) if rows else [()] * len(position.columns)
+        self.columns = {}
+        for column, column_values in zip(position.columns, values):
+            if column.numeric:
+                self.columns[column.name] = np.array(column_values, dtype=NUMPY_TYPES[column.sql_type])
+            elif column.name == 'team':
+                self.team = np.array([team_ids.get(code, -1) for code in column_values], dtype=np.int16)
+            else:
+                # Fixed-width unicode arrays: compact, and compared without Python objects
+                self.columns[column.name] = np.array(column_values, dtype=str)
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def order(self, sort, descending=False):
+        """Row indexes ordered by ``sort`` then playerid, as the keyset queries order them"""
+        key = (sort, descending)
+        with self._lock:
+            if key not in self._orders:
+                ascending = np.lexsort((self.columns['playerid'], self.columns[sort]))
+                self._orders[key] = ascending[::-1].copy() if descending else ascending
+            return self._orders[key]
+
+    def rescored(self, totalpoints, rank):
+        """A copy with totalpoints and rank replaced, sharing every other column"""
+        table = copy.copy(self)
+        table.columns = {**self.columns, 'totalpoints': totalpoints, 'rank': rank}
+        table._orders = {}
+        table._lock = threading.Lock()
+        return table
+
+class LocalStore:
+    """The teams and every position's players, loaded from ``data_dir``"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        files = ['teams.json'] + [position.filename for position in POSITIONS.values()]
+        paths = [os.path.join(data_dir, name) for name in files]
+        # Changes whenever a season file is replaced; used like the database's data version
+        self.version = max(os.stat(path).st_mtime_ns for path in paths)
+
+        # Same order as ORDER BY division, team_name: teams without a division last
+        self._teams = sorted(iter_json_records(paths[0]), key=lambda team: (
+            team.get('division') is None, team.get('division') or '', team['team_name']))
+        self.team_codes = [team['team_code'] for team in self._teams]
+        self.team_ids = team_ids = {code: i for i, code in enumerate(self.team_codes)}
+
+        self.tables = {}
+        for code, position in POSITIONS.items():
+            records = iter_json_records(os.path.join(data_dir, position.filename))
+            self.tables[code] = PositionTable(
+                position, convert_records(records, position.convert, code), team_ids
+            )
+        self._profile_tables = {}
+        self._lock = threading.Lock()
+        logger.info(f"Loaded {sum(t.size for t in self.tables.values())} players "
+                    f"and {len(self._teams)} teams from {data_dir}")
+
+    def data_version(self):
+        return self.version
+
+    def health(self):
+        return {'status': 'healthy', 'backend': 'local', 'data_version': self.version}
+
+    def readiness(self):
+        """(facts, pool stats) like PostgresBackend.readiness; the version is the newest file time"""
+        age = max(0.0, time.time() - self.version / 1e9)
+        return {'backend': 'local', 'data': {'version': self.version, 'age_seconds': age}}, None
+
+    def profile_names(self):
+        return list(PROFILES)
+
+    def _table(self, code, profile=None):
+        """A position's table, with points and ranks from ``profile`` if given"""
+        if profile is None:
+            return self.tables[code]
+        with self._lock:
+            if (code, profile) not in self._profile_tables:
+                table = self.tables[code]
+                scoring = PROFILES[profile]
+                if scoring.scores(code):
+                    points = scoring.points(code, table.columns)
+                else:
+                    points = table.columns['totalpoints']
+                # Same as RANK() OVER (ORDER BY points DESC): one plus the players ahead
+                rank = np.searchsorted(np.sort(-points), -points, side='left') + 1
+                self._profile_tables[code, profile] = table.rescored(points, rank.astype(np.int64))
+            return self._profile_tables[code, profile]
+
+    def teams(self):
+        """Every team ordered by division, then name"""
+        return [{'team_code': team['team_code'], 'team_name': team['team_name'],
+                 'division': team.get('division')} for team in self._teams]
+
+    def _team_codes(self, table, indexes):
+        codes = self.team_codes
+        return [codes[i] if i >= 0 else None for i in table.team[indexes].tolist()]
+
+    def _rows(self, table, indexes, fields):
+        values = [
+            self._team_codes(table, indexes) if name == 'team'
+            else table.columns[name][indexes].tolist()
+            for name in fields
+        ]
+        return list(zip(*values))
+
+    def _records(self, table, indexes, fields):
+        return [dict(zip(fields, row)) for row in self._rows(table, indexes, fields)]
+
+    def _view_records(self, table, indexes):
+        """Rows shaped like the all_players view"""
+        position = table.position
+        return [{
+            'position': position.code,
+            'playerid': record['playerid'],
+            'playername': record['playername'],
+            'team': record['team'],
+            'yards': record[position.yards] if position.yards else None,
+            'touchdowns': record[position.touchdowns] if position.touchdowns else None,
+            'totalpoints': record['totalpoints'],
+            'rank': record['rank'],
+        } for record in self._records(table, indexes, position.column_names)]
+
+    def players(self, position, profile=None):
+        """Every player of a position ordered by rank: (columns, rows)"""
+        table = self._table(position, profile)
+        fields = table.position.column_names
+        return fields, self._rows(table, table.order('rank'), fields)
+
+    def players_page(self, position, fields, sort, descending, after, limit, profile=None):
+        """Up to ``limit`` players after the ``(sort value, playerid)`` pair, like Position.page_sql"""
+        table = self._table(position, profile)
+        indexes = table.order(sort, descending)
+        if after is not None and after[0] is None:
+            # NULLs sort last and every column here was converted with a default, so none remain
+            indexes = indexes[:0]
+        elif after is not None:
+            value, playerid = after
+            values, playerids = table.columns[sort][indexes], table.columns['playerid'][indexes]
+            if descending:
+                past = (values < value) | ((values == value) & (playerids < playerid))
+            else:
+                past = (values > value) | ((values == value) & (playerids > playerid))
+            indexes = indexes[past]
+        selected = list(fields)
+        for name in (sort, 'playerid'):
+            if name not in selected:
+                selected.append(name)
+        return selected, self._rows(table, indexes[:limit], selected)
+
+    def team_players(self, team_code, profile=None):
+        """Offensive skill players of a team, best first, as in the all_players view"""
+        team_id = self.team_ids.get(team_code)
+        players = []
+        if team_id is None:
+            return players
+        for code in ROSTER_POSITIONS:
+            table = self._table(code, profile)
+            players += self._view_records(table, np.flatnonzero(table.team == team_id))
+        players.sort(key=lambda player: (-player['totalpoints'], player['playerid']))
+        return players
+
+    def teams_players(self, team_codes, profile=None):
+        """{team code: players} for several teams"""
+        teams = {code: self.team_players(code, profile) for code in team_codes}
+        return {code: players for code, players in teams.items() if players}
+
+    def players_by_id(self, playerids):
+        """Players of any position by id, best first, as in the all_players view"""
+        wanted = set(playerids)
+        players = []
+        for table in self.tables.values():
+            indexes = np.flatnonzero(np.isin(table.columns['playerid'], list(wanted)))
+            players += self._view_records(table, indexes)
+        players.sort(key=lambda player: (-player['totalpoints'], player['playerid']))
+        return players
+
+    def all_players(self):
+        """Every player of every position, for the search index"""
+        fields = ('playerid', 'playername', 'team', 'totalpoints', 'rank')
+        return [
+            {'position': code, **record}
+            for code, table in self.tables.items()
+            for record in self._records(table, np.arange(table.size), fields)
+        ]
@@ -0,0 +1,318 @@
+"""Position schema registry.
+
+Every stats table is described once here. The DDL, the season-file row
+converters, the API SELECTs and the Streamlit COALESCE projections are all
+generated from these definitions, so adding a position or a stat column only
+means adding it to ``POSITIONS``.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+# Python type used to convert season-file values for each SQL type
+PYTHON_TYPES = {
+    'INTEGER': int,
+    'NUMERIC': float,
+}
+
+
+class Column:
+    """A stats column and where its value comes from in the season files.
+
+    ``source`` is a season-file key, or a tuple of keys whose values are summed.
+    """
+
+    def __init__(self, name, sql_type, source, default=0):
+        self.name = name
+        self.sql_type = sql_type
+        self.source = source
+        self.default = default
+
+    @property
+    def sources(self):
+        return self.source if isinstance(self.source, tuple) else (self.source,)
+
+    @property
+    def numeric(self):
+        return self.sql_type in PYTHON_TYPES
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.sql_type!r})"
+
+
+class Index:
+    """A secondary index on a stats table or view"""
+
+    def __init__(self, table, name, columns, unique=False):
+        self.table = table
+        self.name = f"{table}_{name}"
+        self.columns = columns
+        self.unique = unique
+
+    def create_sql(self, concurrently=False):
+        return (
+            f"CREATE {'UNIQUE ' if self.unique else ''}INDEX "
+            f"{'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+            f"{self.name} ON {self.table} ({self.columns})"
+        )
+
+    def __repr__(self):
+        return f"Index({self.name!r})"
+
+
+# Identity columns shared by every stats table, in table order
+PLAYER_COLUMNS = (
+    Column('playerid', 'VARCHAR(10) PRIMARY KEY', 'PlayerId', default=None),
+    Column('playername', 'VARCHAR(100) NOT NULL', 'PlayerName', default=None),
+    Column('team', 'VARCHAR(3) REFERENCES teams(team_code)', 'Team', default=None),
+)
+
+# Scoring columns shared by every stats table, always last
+SCORE_COLUMNS = (
+    Column('totalpoints', 'NUMERIC', 'TotalPoints'),
+    Column('rank', 'INTEGER', 'Rank', default=999),
+)
+
+
+class Position:
+    """Schema of one position's stats table"""
+
+    def __init__(self, code, group, stats, yards=None, touchdowns=None):
+        self.code = code
+        self.group = group
+        # Headline columns shown in cross-position listings, if the position has them
+        self.yards = yards
+        self.touchdowns = touchdowns
+        self.table = f"{code.lower()}_stats"
+        self.filename = f"{code}_season.json"
+        self.stat_columns = tuple(stats)
+        self.columns = PLAYER_COLUMNS + self.stat_columns + SCORE_COLUMNS
+        self.column_names = tuple(c.name for c in self.columns)
+        self.columns_by_name = {c.name: c for c in self.columns}
+        self.numeric_columns = tuple(c.name for c in self.columns if c.numeric)
+        self.convert = _compile_converter(self)
+
+        # Access paths of the API and dashboard queries: team rosters, rank and
+        # points ordering (with playerid for keyset pages) and name lookups
+        self.indexes = (
+            Index(self.table, 'team_idx', 'team'),
+            Index(self.table, 'rank_idx', 'rank, playerid'),
+            Index(self.table, 'totalpoints_idx', 'totalpoints, playerid'),
+            Index(self.table, 'playername_idx', 'playername'),
+        )
+
+        # Statements are built once here rather than per request
+        self.create_table_sql = (
+            f"CREATE TABLE IF NOT EXISTS {self.table} (\n"
+            + ",\n".join(f"    {c.name} {c.sql_type}" for c in self.columns)
+            + "\n)"
+        )
+        self.select_sql = (
+            f"SELECT {', '.join(self.column_names)} FROM {self.table} ORDER BY rank ASC"
+        )
+        # The table with totalpoints and rank taken from the profile named by the
+        # first query parameter; same columns, same order, so queries work on either
+        # playerid comes from profile_points so keyset pages can range-scan its rank index
+        stats = ', '.join('pp.playerid' if name == 'playerid' else f"s.{name}"
+                          for name in self.column_names if name not in ('totalpoints', 'rank'))
+        self.profile_source_sql = (
+            f"(SELECT {stats}, pp.points AS totalpoints, pp.rank "
+            f"FROM profile_points pp "
+            f"JOIN scoring_profiles sp ON sp.id = pp.profile_id "
+            f"JOIN {self.table} s ON s.playerid = pp.playerid "
+            f"WHERE sp.name = %s AND pp.position = '{self.code}') {self.table}"
+        )
+        self.profile_select_sql = (
+            f"SELECT {', '.join(self.column_names)} FROM {self.profile_source_sql} "
+            f"ORDER BY rank ASC, playerid ASC"
+        )
+        self.coalesce_select_sql = (
+            "SELECT playername, playerid, team, "
+            + ", ".join(f"COALESCE({name}, 0) AS {name}"
+                        for name in self.numeric_columns if name != 'rank')
+            + f", rank FROM {self.table} ORDER BY totalpoints DESC"
+        )
+
+    @lru_cache(maxsize=None)
+    def page_sql(self, fields, sort, descending, after, profile=False, after_null=False):
+        """SELECT for one keyset page, ordered by ``sort`` then ``playerid``.
+
+        The query selects ``fields`` plus the sort key and takes the row limit
+        as its last parameter. With ``after`` set it continues past the
+        ``(sort value, playerid)`` pair given as its next two parameters, or
+        past the playerid alone among the NULL sort values if ``after_null``.
+        NULLs sort last in either direction, so paging reaches every row. With
+        ``profile`` set, points and ranks come from the scoring profile named
+        by the first parameter.
+        """
+        selected = list(fields)
+        for name in (sort, 'playerid'):
+            if name not in selected:
+                selected.append(name)
+        direction, compare = ('DESC', '<') if descending else ('ASC', '>')
+        sort_type = self.columns_by_name[sort].sql_type
+        if not after:
+            where = ""
+        elif after_null:
+            where = f"WHERE {sort} IS NULL AND playerid {compare} %s "
+        else:
+            where = f"WHERE ({sort} IS NULL OR ({sort}, playerid) {compare} (%s::{sort_type}, %s)) "
+        source = self.profile_source_sql if profile else self.table
+        return (
+            f"SELECT {', '.join(selected)} FROM {source} {where}"
+            f"ORDER BY {sort} {direction} NULLS LAST, playerid {direction} LIMIT %s"
+        )
+
+    def page_query(self, fields, sort, descending, after, limit, profile=None):
+        """(SQL, parameters) for one keyset page after the ``(sort value, playerid)`` pair"""
+        after_null = after is not None and after[0] is None
+        query = self.page_sql(fields, sort, descending, after is not None,
+                              profile is not None, after_null)
+        keyset = (after[1],) if after_null else (after or ())
+        return query, (*((profile,) if profile else ()), *keyset, limit)
+
+    def __repr__(self):
+        return f"Position({self.code!r})"
+
+
+def _compile_converter(position):
+    """Generate a converter from a season-file record to a table row.
+
+    All source keys are fetched with a single ``itemgetter`` call and each
+    value is converted by a generated expression, instead of one ``dict.get``
+    method call per column. Records missing a key fall back to ``dict.get``
+    so they still convert with defaults.
+    """
+    keys = []
+    for column in position.columns:
+        for key in column.sources:
+            if key not in keys:
+                keys.append(key)
+
+    expressions = []
+    for column in position.columns:
+        values = [f"v[{keys.index(key)}]" for key in column.sources]
+        if not column.numeric:
+            expressions.append(values[0])
+            continue
+        cast = PYTHON_TYPES[column.sql_type].__name__
+        expressions.append(" + ".join(f"{cast}({value} or {column.default!r})" for value in values))
+
+    source = (
+        "def convert(record):\n"
+        "    try:\n"
+        "        v = fetch(record)\n"
+        "    except KeyError:\n"
+        "        v = tuple(map(record.get, keys))\n"
+        f"    return ({', '.join(expressions)},)\n"
+    )
+    namespace = {'fetch': itemgetter(*keys), 'keys': tuple(keys), 'int': int, 'float': float}
+    exec(compile(source, f"<{position.code} converter>", 'exec'), namespace)
+    convert = namespace['convert']
+    convert.__name__ = f"convert_{position.code.lower()}"
+    return convert
+
+
+def _defense(code):
+    return Position(code, 'Defense', [
+        Column('tackles', 'NUMERIC', 'TacklesTot'),
+        Column('tackles_ast', 'NUMERIC', 'TacklesAst'),
+        Column('sacks', 'NUMERIC', 'TacklesSck'),
+        Column('tackles_tfl', 'NUMERIC', 'TacklesTfl'),
+        Column('interceptions', 'NUMERIC', 'TurnoverInt'),
+        Column('forced_fumbles', 'NUMERIC', 'TurnoverFrcFum'),
+        Column('fumble_recoveries', 'NUMERIC', 'TurnoverFumRec'),
+        Column('passes_defended', 'NUMERIC', 'PDef'),
+        Column('qb_hits', 'NUMERIC', 'QBHit'),
+    ])
+
+
+def _receiver(code):
+    return Position(code, 'Offense', [
+        Column('receptions', 'INTEGER', 'ReceivingRec'),
+        Column('targets', 'INTEGER', 'Targets'),
+        Column('receivingyards', 'INTEGER', 'ReceivingYDS'),
+        Column('receivingtds', 'INTEGER', 'ReceivingTD'),
+    ], yards='receivingyards', touchdowns='receivingtds')
+
+
+FG_MADE_RANGES = ('0-19', '20-29', '30-39', '40-49', '50')
+FG_MISS_RANGES = ('0-19', '20-29', '30-39')
+
+# All positions, in load order
+POSITIONS = {position.code: position for position in [
+    Position('QB', 'Offense', [
+        Column('passingyards', 'INTEGER', 'PassingYDS'),
+        Column('passingtds', 'INTEGER', 'PassingTD'),
+        Column('interceptions', 'INTEGER', 'PassingInt'),
+        Column('rushingyards', 'INTEGER', 'RushingYDS'),
+        Column('rushingtds', 'INTEGER', 'RushingTD'),
+    ], yards='passingyards', touchdowns='passingtds'),
+    Position('RB', 'Offense', [
+        Column('rushingyards', 'INTEGER', 'RushingYDS'),
+        Column('rushingtds', 'INTEGER', 'RushingTD'),
+        Column('receptions', 'INTEGER', 'ReceivingRec'),
+        Column('receivingyards', 'INTEGER', 'ReceivingYDS'),
+        Column('receivingtds', 'INTEGER', 'ReceivingTD'),
+    ], yards='rushingyards', touchdowns='rushingtds'),
+    _receiver('WR'),
+    _receiver('TE'),
+    _defense('LB'),
+    _defense('DL'),
+    _defense('DB'),
+    Position('K', 'Special Teams', [
+        Column('fieldgoals', 'INTEGER', tuple(f'FgMade_{rng}' for rng in FG_MADE_RANGES)),
+        Column('fieldgoalattempts', 'INTEGER',
+               tuple(f'FgMade_{rng}' for rng in FG_MADE_RANGES)
+               + tuple(f'FgMiss_{rng}' for rng in FG_MISS_RANGES)),
+        Column('extrapoints', 'INTEGER', 'PatMade'),
+        Column('extrapointattempts', 'INTEGER', ('PatMade', 'PatMissed')),
+    ]),
+]}
+
+POSITION_CODES = tuple(POSITIONS)
+
+# Position groups as shown in the Streamlit sidebar
+POSITION_GROUPS = {}
+for _position in POSITIONS.values():
+    POSITION_GROUPS.setdefault(_position.group, []).append(_position.code)
+del _position
+
+
+# Every player of every position in one indexed relation, so cross-position
+# queries read a single table instead of a UNION ALL over the stats tables
+ALL_PLAYERS_VIEW = 'all_players'
+ALL_PLAYERS_COLUMNS = (
+    'position', 'playerid', 'playername', 'team', 'yards', 'touchdowns', 'totalpoints', 'rank',
+)
+
+
+def _all_players_select(position):
+    yards = position.yards or 'NULL::INTEGER'
+    touchdowns = position.touchdowns or 'NULL::INTEGER'
+    return (
+        f"SELECT '{position.code}'::VARCHAR(3) AS position, playerid, playername, team, "
+        f"{yards} AS yards, {touchdowns} AS touchdowns, totalpoints, rank FROM {position.table}"
+    )
+
+
+CREATE_ALL_PLAYERS_SQL = (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {ALL_PLAYERS_VIEW} AS\n"
+    + "\nUNION ALL\n".join(_all_players_select(position) for position in POSITIONS.values())
+)
+
+# The unique index is what allows REFRESH MATERIALIZED VIEW CONCURRENTLY
+ALL_PLAYERS_INDEXES = (
+    Index(ALL_PLAYERS_VIEW, 'pkey', 'position, playerid', unique=True),
+    Index(ALL_PLAYERS_VIEW, 'team_idx', 'team'),
+    Index(ALL_PLAYERS_VIEW, 'totalpoints_idx', 'totalpoints DESC'),
+)
+
+# Every secondary index managed by ``python -m src.database indexes``
+INDEXES = tuple(
+    index for position in POSITIONS.values() for index in position.indexes
+) + ALL_PLAYERS_INDEXES
+
+
+def get_position(code):
+    """Look up a position by its code, case-insensitively"""
+    return POSITIONS.get(code.upper()) if code else None
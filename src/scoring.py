@@ -0,0 +1,330 @@
+"""Fantasy scoring profiles and the set-based points engine.
+
+A profile gives the points per unit of each stat column, by position.
+Positions a profile does not mention keep the points from the season files.
+The same weights produce:
+
+- a SQL function per stats table, ``<table>_points(<table>)``, used both by the
+  row triggers and by ``rescore``, which recomputes a whole table in one UPDATE
+- ``ScoringProfile.points``, which scores NumPy arrays (or single values) in Python
+
+Bulk loads switch the row triggers off for their transaction with
+``disable_scoring_triggers`` and call ``rescore`` once when the rows are in.
+"""
+import os
+import json
+import numpy as np
+
+from src.schema import POSITIONS
+
+# Transaction-local setting that the points triggers' WHEN clause checks
+BULK_LOAD_SETTING = 'nfl_stats.bulk_load'
+
+
+class ScoringProfile:
+    """Points per unit of each stat column, by position code"""
+
+    def __init__(self, name, weights, description=''):
+        self.name = name
+        self.description = description
+        self.weights = {}
+        for code, columns in weights.items():
+            position = POSITIONS.get(code)
+            if position is None:
+                raise ValueError(f"Profile {name!r}: unknown position {code!r}")
+            unknown = [c for c in columns if c not in position.numeric_columns]
+            if unknown:
+                raise ValueError(f"Profile {name!r}: {code} has no stat columns {', '.join(unknown)}")
+            # Zero weights are kept out of the formulas
+            self.weights[code] = {c: w for c, w in columns.items() if w}
+
+    def derive(self, name, weights, description=''):
+        """A copy of this profile with some weights replaced or added"""
+        merged = {code: dict(columns) for code, columns in self.weights.items()}
+        for code, columns in weights.items():
+            merged.setdefault(code, {}).update(columns)
+        return ScoringProfile(name, merged, description)
+
+    def scores(self, code):
+        return code in self.weights
+
+    def points_sql(self, code, alias):
+        """SQL expression for a row's points, its columns qualified with ``alias``"""
+        terms = [f"COALESCE({alias}.{column}, 0) * {weight!r}"
+                 for column, weight in self.weights[code].items()]
+        return f"ROUND(({' + '.join(terms) or '0'})::NUMERIC, 2)"
+
+    def breakdown(self, code, stats):
+        """Points earned by each weighted column.
+
+        ``stats`` maps column names to numbers or NumPy arrays; missing columns count as 0.
+        """
+        return {
+            column: np.round(np.nan_to_num(np.asarray(stats.get(column, 0), dtype=np.float64)) * weight, 2)
+            for column, weight in self.weights[code].items()
+        }
+
+    def points(self, code, stats):
+        """Total points, computed over whole NumPy columns at once"""
+        return np.round(sum(self.breakdown(code, stats).values(), np.float64(0)), 2)
+
+    def formula(self, code):
+        """Human-readable formula, e.g. for the dashboard"""
+        return " + ".join(f"({column} × {weight:g})" for column, weight in self.weights[code].items())
+
+    def __repr__(self):
+        return f"ScoringProfile({self.name!r})"
+
+
+_PASSING = {'passingyards': 0.04, 'passingtds': 4, 'interceptions': -2}
+_RUSHING = {'rushingyards': 0.1, 'rushingtds': 6}
+_RECEIVING = {'receivingyards': 0.1, 'receivingtds': 6}
+
+
+def _offense(reception):
+    return {
+        'QB': {**_PASSING, **_RUSHING},
+        'RB': {**_RUSHING, 'receptions': reception, **_RECEIVING},
+        'WR': {'receptions': reception, **_RECEIVING},
+        'TE': {'receptions': reception, **_RECEIVING},
+    }
+
+
+_IDP = {'tackles': 1, 'sacks': 2, 'interceptions': 3, 'forced_fumbles': 3,
+        'fumble_recoveries': 3, 'passes_defended': 1}
+
+STANDARD = ScoringProfile('standard', _offense(0), "No points per reception")
+PROFILES = {profile.name: profile for profile in [
+    STANDARD,
+    STANDARD.derive('half_ppr', _offense(0.5), "Half a point per reception"),
+    STANDARD.derive('ppr', _offense(1), "One point per reception"),
+    STANDARD.derive('idp', {**_offense(1), **{code: _IDP for code in ('LB', 'DL', 'DB')}},
+                    "PPR with individual defensive players scored"),
+]}
+
+
+def load_profiles(path):
+    """Add custom profiles from a JSON file.
+
+    Each entry derives from a built-in (or earlier) profile, for example
+    ``{"big_sacks": {"base": "idp", "weights": {"DL": {"sacks": 4}}}}``.
+    """
+    with open(path) as f:
+        definitions = json.load(f)
+    for name, definition in definitions.items():
+        base = get_profile(definition.get('base', 'standard'))
+        PROFILES[name] = base.derive(name, definition.get('weights', {}), definition.get('description', ''))
+
+
+if os.getenv('SCORING_PROFILES_FILE'):
+    load_profiles(os.getenv('SCORING_PROFILES_FILE'))
+
+# Profile installed by create_procedures and shown in the dashboard.
+# PPR matches the original QB and RB triggers.
+SCORING_PROFILE = os.getenv('SCORING_PROFILE', 'ppr')
+# Positions whose totalpoints and rank the installed profile computes. The
+# others keep the season files' points, which count stats (returns, kick
+# distances) the profiles do not weigh.
+SCORED_POSITIONS = tuple(code.strip().upper() for code in
+                         os.getenv('SCORED_POSITIONS', 'QB,RB').split(',') if code.strip())
+
+
+def get_profile(name=None):
+    name = name or SCORING_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown scoring profile {name!r}, expected one of: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def _points_function(position):
+    return f"{position.table}_points"
+
+
+def install_scoring(cur, profile, codes=SCORED_POSITIONS):
+    """Create the points functions and row triggers for ``profile`` on ``codes``.
+
+    Other positions, and those the profile does not score, lose their points
+    trigger, so their points are whatever the season files say.
+    """
+    unknown = [code for code in codes if code not in POSITIONS]
+    if unknown:
+        raise ValueError(f"Unknown positions {', '.join(unknown)}, expected some of: {', '.join(POSITIONS)}")
+    for code, position in POSITIONS.items():
+        table, function = position.table, _points_function(position)
+        trigger = f"calculate_{code.lower()}_points"
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}_trigger ON {table}")
+        if code not in codes or not profile.scores(code):
+            cur.execute(f"DROP FUNCTION IF EXISTS {function}({table}); "
+                        f"DROP FUNCTION IF EXISTS {trigger}()")
+            continue
+        # A single-SELECT SQL function is inlined into the rescore UPDATE
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION {function}(p {table})
+            RETURNS NUMERIC AS $$
+                SELECT {profile.points_sql(code, 'p')}
+            $$ LANGUAGE sql IMMUTABLE;
+
+            CREATE OR REPLACE FUNCTION {trigger}()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.totalpoints := {function}(NEW);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER {trigger}_trigger
+                BEFORE INSERT OR UPDATE ON {table}
+                FOR EACH ROW
+                WHEN (current_setting('{BULK_LOAD_SETTING}', true) IS DISTINCT FROM 'on')
+                EXECUTE FUNCTION {trigger}();
+        """)
+        # The comment records which profile the function implements
+        cur.execute(f"COMMENT ON FUNCTION {function}({table}) IS %s", (profile.name,))
+
+
+def installed_profiles(cur):
+    """{position code: profile name} for every position scored in the database"""
+    installed = {}
+    for code, position in POSITIONS.items():
+        cur.execute(
+            "SELECT obj_description(to_regprocedure(%s), 'pg_proc')",
+            (f"{_points_function(position)}({position.table})",)
+        )
+        name = cur.fetchone()[0]
+        if name is not None:
+            installed[code] = name
+    return installed
+
+
+def disable_scoring_triggers(cur):
+    """Skip the points triggers for the rest of the current transaction.
+
+    Only a setting is changed, so unlike ALTER TABLE ... DISABLE TRIGGER this
+    takes no lock and needs no extra privileges. Call ``rescore`` before committing.
+    """
+    cur.execute("SELECT set_config(%s, 'on', true)", (BULK_LOAD_SETTING,))
+
+
+def rescore_sql(position):
+    """One UPDATE recomputing the points and rank of every changed row in a table"""
+    table = position.table
+    return f"""
+        UPDATE {table} t
+        SET totalpoints = s.points, rank = s.rank
+        FROM (
+            SELECT playerid, points, RANK() OVER (ORDER BY points DESC) AS rank
+            FROM (SELECT playerid, {_points_function(position)}(x) AS points FROM {table} x) scored
+        ) s
+        WHERE t.playerid = s.playerid
+          AND (t.totalpoints, t.rank) IS DISTINCT FROM (s.points, s.rank)
+    """
+
+
+def rescore(cur, codes=None):
+    """Recompute points and ranks of the scored positions among ``codes`` (default all).
+
+    Returns {position code: rows changed}.
+    """
+    installed = installed_profiles(cur)
+    disable_scoring_triggers(cur)
+    changed = {}
+    for code in POSITIONS if codes is None else codes:
+        if code in installed:
+            cur.execute(rescore_sql(POSITIONS[code]))
+            changed[code] = cur.rowcount
+    return changed
+
+
+# Points and ranks of every player under every stored profile
+PROFILE_TABLES = ('profile_points', 'scoring_profiles')
+
+
+def create_scoring_tables(cur):
+    """Create the stored profiles and their precomputed leaderboards"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scoring_profiles (
+            id SMALLSERIAL PRIMARY KEY,
+            name VARCHAR(50) NOT NULL UNIQUE,
+            description TEXT NOT NULL DEFAULT '',
+            weights JSONB NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS profile_points (
+            profile_id SMALLINT NOT NULL REFERENCES scoring_profiles(id) ON DELETE CASCADE,
+            position VARCHAR(3) NOT NULL,
+            playerid VARCHAR(10) NOT NULL,
+            points NUMERIC NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY (profile_id, position, playerid)
+        );
+        CREATE INDEX IF NOT EXISTS profile_points_rank_idx
+            ON profile_points (profile_id, position, rank, playerid);
+    """)
+
+
+def store_profiles(cur, profiles):
+    """Save ``profiles`` in scoring_profiles and delete any other stored profile.
+
+    Deleting a profile drops its profile_points rows with it. Returns the
+    names that were added, changed or deleted.
+    """
+    profiles = list(profiles)
+    cur.execute(
+        "DELETE FROM scoring_profiles WHERE name <> ALL(%s) RETURNING name",
+        ([profile.name for profile in profiles],)
+    )
+    changed = [row[0] for row in cur.fetchall()]
+    for profile in profiles:
+        cur.execute("""
+            INSERT INTO scoring_profiles (name, description, weights)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (name) DO UPDATE
+            SET description = EXCLUDED.description, weights = EXCLUDED.weights, updated_at = now()
+            WHERE (scoring_profiles.description, scoring_profiles.weights)
+                IS DISTINCT FROM (EXCLUDED.description, EXCLUDED.weights)
+            RETURNING name
+        """, (profile.name, profile.description, json.dumps(profile.weights, sort_keys=True)))
+        changed += [row[0] for row in cur.fetchall()]
+    return changed
+
+
+def stored_profiles(cur):
+    """{profile id: ScoringProfile} for every profile in scoring_profiles"""
+    cur.execute("SELECT id, name, description, weights FROM scoring_profiles ORDER BY id")
+    return {
+        profile_id: ScoringProfile(name, weights, description)
+        for profile_id, name, description, weights in cur.fetchall()
+    }
+
+
+def profile_points_sql(position, profile):
+    """INSERT ... SELECT ranking one position under one profile (profile id is the parameter).
+
+    Positions the profile does not score are ranked by their stored totalpoints.
+    """
+    points = profile.points_sql(position.code, 'p') if profile.scores(position.code) else 'p.totalpoints'
+    return f"""
+        INSERT INTO profile_points (profile_id, position, playerid, points, rank)
+        SELECT %s, '{position.code}', playerid, points, RANK() OVER (ORDER BY points DESC)
+        FROM (SELECT playerid, COALESCE({points}, 0) AS points FROM {position.table} p) scored
+    """
+
+
+def refresh_profile_points(cur, codes=None):
+    """Store the built-in profiles and recompute the leaderboards of ``codes`` (default all).
+
+    Every position is recomputed when a profile was added or changed.
+    Returns the number of rows written.
+    """
+    if store_profiles(cur, PROFILES.values()):
+        codes = None
+    profiles = stored_profiles(cur)
+    codes = list(POSITIONS) if codes is None else list(codes)
+    written = 0
+    for code in codes:
+        position = POSITIONS[code]
+        cur.execute("DELETE FROM profile_points WHERE position = %s", (code,))
+        for profile_id, profile in profiles.items():
+            cur.execute(profile_points_sql(position, profile), (profile_id,))
+            written += cur.rowcount
+    return written
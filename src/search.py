@@ -0,0 +1,127 @@
+"""In-memory player name search.
+
+The index is built once from every player row and answers typeahead queries
+without touching the database. It combines:
+
+- a trigram index (as in pg_trgm) for fuzzy, typo-tolerant matching, and
+- a sorted token list for prefix matching on partially typed words.
+
+Prefix matches rank first, then substring matches, then fuzzy matches by
+trigram score; ties go to the player with more total points.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+# Share of the query's trigrams a name must contain to count as a fuzzy match
+WORD_SIMILARITY_THRESHOLD = 0.6
+PREFIX_SCORE = 1.0
+SUBSTRING_SCORE = 0.9
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize(name):
+    """Lowercase, strip accents and punctuation: "Ja'Marr Chase" -> "jamarr chase" """
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(_NON_WORD.sub('', name.lower()).split())
+
+
+def trigrams(text):
+    """pg_trgm style trigrams of each word, padded with two leading blanks and one trailing"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PlayerSearchIndex:
+    """Trigram and prefix index over player names.
+
+    ``players`` are dicts with at least ``position``, ``playerid``,
+    ``playername`` and ``totalpoints``; they are returned as-is in results.
+    Names are indexed once however many rows share them (the same player
+    across seasons or positions), so lookups scale with distinct names.
+    """
+
+    def __init__(self, players, version=None):
+        self.version = version
+        self.players = list(players)
+        self._points = [float(p.get('totalpoints') or 0) for p in self.players]
+        self._names = []       # distinct normalized names
+        self._name_docs = []   # name id -> indexes into self.players
+        self._gram_counts = []
+        self._postings = {}
+        name_ids = {}
+        for doc, player in enumerate(self.players):
+            name = normalize(player['playername'])
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(self._names)
+                self._names.append(name)
+                self._name_docs.append([])
+                grams = trigrams(name)
+                self._gram_counts.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(name_id)
+            self._name_docs[name_id].append(doc)
+        tokens = sorted((token, name_id) for name_id, name in enumerate(self._names)
+                        for token in name.split())
+        self._tokens = [token for token, _ in tokens]
+        self._token_names = [name_id for _, name_id in tokens]
+
+    def __len__(self):
+        return len(self.players)
+
+    def _prefix_names(self, prefix):
+        start = bisect_left(self._tokens, prefix)
+        end = bisect_left(self._tokens, prefix + '\x7f', start)
+        return set(self._token_names[start:end])
+
+    def _score_names(self, query):
+        """Score every distinct name matching ``query``: {name id: score}"""
+        # Every query word must prefix some word of the name
+        words = query.split()
+        scores = dict.fromkeys(self._prefix_names(words[0]), PREFIX_SCORE)
+        for word in words[1:]:
+            scores = dict.fromkeys(self._prefix_names(word).intersection(scores), PREFIX_SCORE)
+
+        # Queries too short for a full trigram are served by prefix matches alone
+        if len(query) < 3:
+            return scores
+
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        for name_id, common in shared.items():
+            if name_id in scores:
+                continue
+            if query in self._names[name_id]:
+                scores[name_id] = SUBSTRING_SCORE
+                continue
+            # Average of pg_trgm's word_similarity and similarity, always below 0.9
+            coverage = common / len(query_grams)
+            if coverage >= WORD_SIMILARITY_THRESHOLD:
+                similarity = common / (len(query_grams) + self._gram_counts[name_id] - common)
+                scores[name_id] = min((coverage + similarity) / 2, SUBSTRING_SCORE - 0.01)
+        return scores
+
+    def search(self, query, position=None, limit=25):
+        """Ranked players whose names match ``query``, best match first"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        players, points = self.players, self._points
+        matches = (
+            (score, points[doc], doc)
+            for name_id, score in self._score_names(query).items()
+            for doc in self._name_docs[name_id]
+            if not position or players[doc]['position'] == position
+        )
+        return [dict(players[doc], score=round(score, 3))
+                for score, _, doc in heapq.nlargest(limit, matches)]
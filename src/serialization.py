@@ -0,0 +1,104 @@
+"""Response bodies: fast JSON, optional MessagePack, and gzip/brotli compression.
+
+Bodies are built and cached as JSON bytes. ``negotiate`` picks the format and
+content encoding from the request's Accept and Accept-Encoding headers, and
+``encode`` converts a JSON body to them. orjson, msgpack and brotli are
+optional dependencies: without orjson JSON is written by the standard
+library, and MessagePack or brotli are only offered when installed.
+"""
+import os
+import json
+import gzip
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 'orjson' or 'json' (standard library); orjson when it is installed
+JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'orjson' if orjson else 'json').lower()
+# Smaller bodies are not worth compressing
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+JSON = 'application/json'
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Offered formats and encodings, preferred first when the client has no preference
+MEDIA_TYPES = (JSON,) + (MSGPACK_TYPES if msgpack else ())
+ENCODINGS = (('br',) if brotli else ()) + ('gzip',)
+
+def _default(obj):
+    # Decimals only appear when a cursor was opened without the float caster
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+def _orjson_dumps(obj, sort_keys):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+def _json_dumps(obj, sort_keys):
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+SERIALIZERS = {'json': _json_dumps}
+if orjson is not None:
+    SERIALIZERS['orjson'] = _orjson_dumps
+
+if JSON_SERIALIZER not in SERIALIZERS:
+    raise ValueError(f"Unknown JSON_SERIALIZER {JSON_SERIALIZER!r}, expected one of: {', '.join(SERIALIZERS)}")
+
+def dumps(obj, sort_keys=False):
+    """``obj`` as UTF-8 JSON bytes"""
+    return SERIALIZERS[JSON_SERIALIZER](obj, sort_keys)
+
+def dumps_rows(columns, rows, sort_keys=False):
+    """Fetched row tuples as a JSON array of objects keyed by ``columns``.
+
+    Values past the last column are left out. Each row is paired with the
+    column names only for the duration of the encode call.
+    """
+    columns = tuple(columns)
+    return dumps([dict(zip(columns, row)) for row in rows], sort_keys)
+
+def loads(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+def negotiate(accept_mimetypes, accept_encodings):
+    """(media type, content encoding or None) best matching the request's headers.
+
+    Takes Werkzeug's parsed ``request.accept_mimetypes`` and ``request.accept_encodings``.
+    """
+    media_type = accept_mimetypes.best_match(MEDIA_TYPES, default=JSON)
+    return media_type, accept_encodings.best_match(ENCODINGS)
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # A fixed mtime keeps the output, and so its ETag, stable
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+def encode(body, media_type=JSON, encoding=None):
+    """A JSON body converted to ``media_type`` and compressed with ``encoding``.
+
+    Returns (body, encoding applied); bodies under COMPRESS_MIN_SIZE stay uncompressed.
+    """
+    if media_type in MSGPACK_TYPES:
+        body = msgpack.packb(loads(body), use_bin_type=True)
+    if encoding and len(body) >= COMPRESS_MIN_SIZE:
+        return compress(body, encoding), encoding
+    return body, None
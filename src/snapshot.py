@@ -0,0 +1,261 @@
+"""Columnar snapshots of the stats tables.
+
+``python -m src.snapshot export`` copies ``teams`` and every position table
+into a new snapshot directory, read in one consistent transaction:
+
+    snapshots/
+        LATEST                  name of the newest complete snapshot
+        v42-20241230T120000Z/
+            manifest.json       data version, row counts, schemas, checksums
+            qb_stats.arrow      Arrow IPC file, uncompressed, for memory-mapping
+            qb_stats.parquet    Parquet file, zstd-compressed, for archiving and transfer
+            ...
+
+Readers memory-map the ``.arrow`` files, so opening a table copies nothing
+into the heap. pyarrow is an optional dependency: it is only needed by
+whoever writes or reads snapshots.
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import time
+from datetime import datetime, timezone
+
+from src.database import connect, get_data_version
+from src.schema import POSITIONS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots'))
+SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', 3))
+SNAPSHOT_COMPRESSION = os.getenv('SNAPSHOT_COMPRESSION', 'zstd')
+SNAPSHOT_BATCH_SIZE = 10000
+
+# Columns of the teams table, which is not part of the position registry
+TEAM_COLUMNS = (('team_code', 'VARCHAR'), ('team_name', 'VARCHAR'), ('division', 'VARCHAR'))
+
+def _require_pyarrow():
+    if pa is None:
+        raise Exception("Snapshots need pyarrow: pip install pyarrow")
+
+def _arrow_type(sql_type):
+    if sql_type.startswith('INTEGER'):
+        return pa.int32()
+    if sql_type.startswith('NUMERIC'):
+        return pa.float64()
+    return pa.string()
+
+def snapshot_tables():
+    """{table: ((column, sql type), ...)} for every table a snapshot contains"""
+    tables = {'teams': TEAM_COLUMNS}
+    for position in POSITIONS.values():
+        tables[position.table] = tuple((c.name, c.sql_type) for c in position.columns)
+    return tables
+
+def _select_sql(table, columns):
+    # NUMERIC comes back as Decimal; casting on the server keeps the conversion out of Python
+    selected = [f"{name}::float8 AS {name}" if sql_type.startswith('NUMERIC') else name
+                for name, sql_type in columns]
+    return f"SELECT {', '.join(selected)} FROM {table} ORDER BY {columns[0][0]}"
+
+def _export_table(conn, table, columns, directory, compression):
+    schema = pa.schema([(name, _arrow_type(sql_type)) for name, sql_type in columns])
+    arrow_path = os.path.join(directory, f"{table}.arrow")
+    parquet_path = os.path.join(directory, f"{table}.parquet")
+    rows = 0
+    cur = conn.cursor(name=f"snapshot_{table}")
+    try:
+        cur.execute(_select_sql(table, columns))
+        with pa.OSFile(arrow_path, 'wb') as sink, \
+                pa.ipc.new_file(sink, schema) as arrow_writer, \
+                pq.ParquetWriter(parquet_path, schema, compression=compression) as parquet_writer:
+            while True:
+                chunk = cur.fetchmany(SNAPSHOT_BATCH_SIZE)
+                if not chunk:
+                    break
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)],
+                    schema=schema
+                )
+                arrow_writer.write_batch(batch)
+                parquet_writer.write_batch(batch)
+                rows += len(chunk)
+    finally:
+        cur.close()
+    return {
+        'rows': rows,
+        'columns': [{'name': field.name, 'type': str(field.type)} for field in schema],
+        'arrow': os.path.basename(arrow_path),
+        'parquet': os.path.basename(parquet_path),
+        'sha256': _sha256(arrow_path),
+    }
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def export_snapshot(root=SNAPSHOT_DIR, compression=SNAPSHOT_COMPRESSION, keep=SNAPSHOT_KEEP):
+    """Write a new snapshot of every table under ``root`` and return its directory.
+
+    All tables are read in one REPEATABLE READ transaction, so the snapshot
+    matches the data version recorded in its manifest. The snapshot becomes
+    visible through ``LATEST`` only once it is complete.
+    """
+    _require_pyarrow()
+    os.makedirs(root, exist_ok=True)
+    conn = connect()
+    started = time.perf_counter()
+    try:
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cur = conn.cursor()
+        version = get_data_version(cur)
+        cur.close()
+
+        created = datetime.now(timezone.utc)
+        name = f"v{version if version is not None else 0}-{created.strftime('%Y%m%dT%H%M%SZ')}"
+        directory = os.path.join(root, name)
+        staging = os.path.join(root, f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        manifest = {
+            'name': name,
+            'data_version': version,
+            'created_at': created.isoformat(),
+            'compression': compression,
+            'tables': {},
+        }
+        try:
+            for table, columns in snapshot_tables().items():
+                manifest['tables'][table] = _export_table(conn, table, columns, staging, compression)
+                print(f"Exported {manifest['tables'][table]['rows']} rows from {table}")
+            with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, directory)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        conn.rollback()
+    finally:
+        conn.close()
+
+    _write_latest(root, name)
+    prune_snapshots(root, keep)
+    print(f"Snapshot {name} written to {directory} in {time.perf_counter() - started:.2f}s")
+    return directory
+
+def _write_latest(root, name):
+    # Replace the pointer atomically so readers never see a partial name
+    tmp_path = os.path.join(root, '.LATEST.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(name + '\n')
+    os.replace(tmp_path, os.path.join(root, 'LATEST'))
+
+def list_snapshots(root=SNAPSHOT_DIR):
+    """Complete snapshot directory names under ``root``, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    names = [name for name in os.listdir(root)
+             if os.path.isfile(os.path.join(root, name, 'manifest.json'))]
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(root, name)))
+
+def prune_snapshots(root=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """Delete all but the newest ``keep`` snapshots, never the one LATEST points to"""
+    latest = latest_snapshot(root)
+    latest_name = os.path.basename(latest) if latest else None
+    for name in list_snapshots(root)[:-keep] if keep > 0 else []:
+        if name != latest_name:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def latest_snapshot(root=SNAPSHOT_DIR):
+    """Directory of the newest complete snapshot, or None"""
+    try:
+        with open(os.path.join(root, 'LATEST')) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    directory = os.path.join(root, name)
+    return directory if os.path.isfile(os.path.join(directory, 'manifest.json')) else None
+
+class Snapshot:
+    """A snapshot opened for reading; tables are memory-mapped on first access"""
+
+    def __init__(self, directory):
+        _require_pyarrow()
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.name = self.manifest['name']
+        self.data_version = self.manifest['data_version']
+        self._tables = {}
+
+    @property
+    def table_names(self):
+        return list(self.manifest['tables'])
+
+    def table(self, name):
+        """The table as a pyarrow.Table backed by the memory-mapped file (zero-copy)"""
+        if name not in self._tables:
+            entry = self.manifest['tables'].get(name)
+            if entry is None:
+                raise KeyError(f"Snapshot {self.name} has no table {name!r}")
+            source = pa.memory_map(os.path.join(self.directory, entry['arrow']), 'r')
+            self._tables[name] = pa.ipc.open_file(source).read_all()
+        return self._tables[name]
+
+    def verify(self):
+        """Names of tables whose Arrow file does not match the manifest checksum"""
+        return [
+            name for name, entry in self.manifest['tables'].items()
+            if _sha256(os.path.join(self.directory, entry['arrow'])) != entry['sha256']
+        ]
+
+    def __repr__(self):
+        return f"Snapshot({self.name!r})"
+
+def open_snapshot(directory=None, root=SNAPSHOT_DIR):
+    """Open ``directory``, or the latest snapshot under ``root``; None if there is none"""
+    directory = directory or latest_snapshot(root)
+    return Snapshot(directory) if directory else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and inspect columnar snapshots of the stats tables")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help="directory holding the snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="write a new snapshot from the database")
+    export.add_argument('--compression', default=SNAPSHOT_COMPRESSION,
+                        help="Parquet codec: zstd, snappy, gzip, brotli, lz4 or none")
+    export.add_argument('--keep', type=int, default=SNAPSHOT_KEEP,
+                        help="snapshots to keep, older ones are deleted (0 keeps all)")
+    info = commands.add_parser('info', help="describe the latest snapshot and verify its checksums")
+    info.add_argument('snapshot', nargs='?', help="snapshot directory (default: latest)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        export_snapshot(args.dir, args.compression, args.keep)
+        return
+
+    snapshot = open_snapshot(args.snapshot, args.dir)
+    if snapshot is None:
+        raise Exception(f"No snapshot found in {args.dir}, run: python -m src.snapshot export")
+    print(f"Snapshot {snapshot.name} (data version {snapshot.data_version}, "
+          f"created {snapshot.manifest['created_at']})")
+    for name, entry in snapshot.manifest['tables'].items():
+        print(f"  {name:<10} {entry['rows']:>8} rows")
+    corrupt = snapshot.verify()
+    if corrupt:
+        raise Exception(f"Checksum mismatch in: {', '.join(corrupt)}")
+    print("All checksums match")
+
+if __name__ == '__main__':
+    main()
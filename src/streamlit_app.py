@@ -2,9 +2,18 @@ import streamlit as st
 import pandas as pd
 import os
 import re
+import time
+import queue
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.sql import text
-from src.database import get_db_connection
+from src.database import (
+    pooled_connection, bump_data_version, get_data_version, refresh_all_players,
+    ReadOnlyQuery, QUERY_MAX_ROWS, QUERY_STATEMENT_TIMEOUT_MS,
+)
+from src.schema import POSITIONS, POSITION_GROUPS
+from src.scoring import PROFILES, installed_profiles, stored_profiles, refresh_profile_points
+from src.snapshot import open_snapshot
 
 # Set page config - MUST BE FIRST STREAMLIT COMMAND
 st.set_page_config(
@@ -16,23 +25,187 @@ st.set_page_config(
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/nfl_stats')
 
-# Create a connection to the database using SQLAlchemy
-try:
+# Seconds between data version checks shared by all dashboard sessions
+DATA_VERSION_TTL = float(os.getenv('DASHBOARD_VERSION_TTL', 5))
+# Upper bound on how long a cached position stays in memory
+POSITION_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', 3600))
+
+@st.cache_resource
+def get_engine():
+    """One SQLAlchemy engine per server process, shared by every session and rerun"""
+    url = DATABASE_URL
     # Replace 'postgres://' with 'postgresql://' for SQLAlchemy
-    if DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
     
     # Create SQLAlchemy engine with appropriate SSL mode
-    if 'localhost' in DATABASE_URL:
-        engine = create_engine(DATABASE_URL)
+    if 'localhost' in url:
+        engine = create_engine(url, pool_pre_ping=True)
     else:
         # For Heroku, we need to specify SSL mode
-        engine = create_engine(DATABASE_URL, connect_args={'sslmode': 'require'})
+        engine = create_engine(url, pool_pre_ping=True, connect_args={'sslmode': 'require'})
     
-    # Test the connection
+    # Test the connection once, not on every rerun
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
-        st.success("Successfully connected to the database!")
+    return engine
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def current_data_version():
+    """Data version published by the loader, re-read at most once per TTL"""
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            return get_data_version(cur)
+        finally:
+            cur.close()
+
+@st.cache_resource(ttl=POSITION_CACHE_TTL, show_spinner=False)
+def installed_profile(code, version):
+    """The profile the database's points trigger for ``code`` implements, or None if it has none"""
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            name = installed_profiles(cur).get(code)
+            if name is None:
+                return None
+            # The stored weights are the ones installed, even for a profile this process lacks
+            cur.execute("SELECT to_regclass('scoring_profiles') IS NOT NULL")
+            if cur.fetchone()[0]:
+                for profile in stored_profiles(cur).values():
+                    if profile.name == name:
+                        return profile
+            return PROFILES.get(name)
+        finally:
+            cur.close()
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def current_snapshot(version):
+    """The latest columnar snapshot if it was taken at ``version``, else None"""
+    snapshot = open_snapshot()
+    if snapshot is None or snapshot.data_version != version:
+        return None
+    return snapshot
+
+def snapshot_position_frame(snapshot, position):
+    """The Stats View frame of a position, read from the memory-mapped snapshot"""
+    pos = POSITIONS[position]
+    df = snapshot.table(pos.table).to_pandas()
+    # Same projection and order as coalesce_select_sql
+    numeric = [name for name in pos.numeric_columns if name != 'rank']
+    df[numeric] = df[numeric].fillna(0)
+    df = df[['playername', 'playerid', 'team'] + numeric + ['rank']]
+    return df.sort_values('totalpoints', ascending=False, kind='stable').reset_index(drop=True)
+
+@st.cache_data(ttl=POSITION_CACHE_TTL, max_entries=2 * len(POSITIONS), show_spinner=False)
+def load_position_stats(position, version):
+    """Stats table, summary and top 10 of a position, memoized per data version.
+
+    Reads the columnar snapshot when one exists for ``version``, otherwise Postgres.
+    """
+    snapshot = current_snapshot(version)
+    if snapshot is not None:
+        df = snapshot_position_frame(snapshot, position)
+    else:
+        df = pd.read_sql_query(POSITIONS[position].coalesce_select_sql, get_engine())
+    
+    # Convert totalpoints to numeric, replacing any invalid values with 0
+    df['totalpoints'] = pd.to_numeric(df['totalpoints'], errors='coerce').fillna(0)
+    return df, df.describe(), df.nlargest(10, 'totalpoints')
+
+def cancel_running_query():
+    """Cancel button callback: abort this session's running query on the server"""
+    running = st.session_state.get('running_query')
+    if running is not None:
+        running.cancel()
+
+def _fetch_chunks(guarded, results):
+    # Runs in a worker thread so the script can keep polling for a cancel click
+    try:
+        for rows in guarded.chunks():
+            results.put(rows)
+        results.put(None)
+    except Exception as e:
+        results.put(e)
+
+def run_guarded_query(query):
+    """Run an ad-hoc SELECT read-only, rendering rows as they arrive.
+
+    The fetch runs in a worker thread while this script polls for results.
+    Every poll updates the status line, and each Streamlit call is a point
+    where a Cancel click can stop this run. When that happens the ``finally``
+    cancels the statement on the server.
+    """
+    results_col, info_col = st.columns([3, 2])
+    status = results_col.empty()
+    table = results_col.empty()
+    with pooled_connection() as conn:
+        guarded = ReadOnlyQuery(conn, query)
+        started = time.perf_counter()
+        plan = guarded.explain()
+        info_col.markdown("**Query plan**")
+        info_col.code(plan, language='text')
+
+        results = queue.Queue()
+        worker = threading.Thread(target=_fetch_chunks, args=(guarded, results), daemon=True)
+        st.session_state['running_query'] = guarded
+        worker.start()
+        chunks = []
+        first_row_at = None
+        finished = False
+        try:
+            while True:
+                try:
+                    rows = results.get(timeout=0.25)
+                except queue.Empty:
+                    status.info(f"Running... {time.perf_counter() - started:.1f}s, "
+                                f"{guarded.row_count:,} rows so far")
+                    continue
+                if rows is None:
+                    finished = True
+                    break
+                if isinstance(rows, Exception):
+                    finished = True
+                    raise rows
+                chunk = pd.DataFrame.from_records(rows, columns=guarded.columns, coerce_float=True)
+                if first_row_at is None:
+                    first_row_at = time.perf_counter() - started
+                    rendered = table.dataframe(chunk)
+                else:
+                    rendered.add_rows(chunk)
+                chunks.append(chunk)
+                status.info(f"Fetched {guarded.row_count:,} rows...")
+        finally:
+            if not finished:
+                # This run was stopped by a Cancel click or another widget change
+                guarded.cancel()
+                st.session_state['query_cancelled'] = True
+            worker.join()
+            st.session_state.pop('running_query', None)
+    elapsed = time.perf_counter() - started
+
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=guarded.columns)
+    if not chunks:
+        table.dataframe(df)
+    status.success("Query executed successfully!")
+    if guarded.truncated:
+        results_col.warning(f"Stopped at the {QUERY_MAX_ROWS:,} row limit; add a LIMIT or WHERE clause to see other rows.")
+    info_col.markdown("**Timing**")
+    info_col.write({
+        'rows': len(df),
+        'first rows (s)': round(first_row_at, 3) if first_row_at is not None else None,
+        'total (s)': round(elapsed, 3),
+    })
+    results_col.info(f"Number of rows returned: {len(df)}")
+    
+    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
+    if not numeric_cols.empty:
+        results_col.subheader("Summary Statistics for Numeric Columns")
+        results_col.write(df[numeric_cols].describe())
+
+try:
+    engine = get_engine()
+    st.success("Successfully connected to the database!")
 except Exception as e:
     st.error(f"Failed to connect to database: {str(e)}")
     st.stop()
@@ -50,134 +223,37 @@ if view_mode == "Stats View":
     # Original stats view code
     st.sidebar.header("Filters")
 
-    # Position groups
-    position_groups = {
-        "Offense": ["QB", "RB", "WR", "TE"],
-        "Defense": ["LB", "DL", "DB"],
-        "Special Teams": ["K"]
-    }
-
     # Position group selection
     position_group = st.sidebar.selectbox(
         "Select Position Group",
-        list(position_groups.keys())
+        list(POSITION_GROUPS.keys())
     )
 
     # Position selection based on group
     position = st.sidebar.selectbox(
         "Select Position",
-        position_groups[position_group]
+        POSITION_GROUPS[position_group]
     )
 
-    # Get table name based on position
-    table_name = f"{position.lower()}_stats"
-
-    # Query to get all data for the selected position
-    if position in ["LB", "DL", "DB"]:
-        query = f"""
-            SELECT 
-                playername,
-                playerid,
-                team,
-                COALESCE(tackles, 0) as tackles,
-                COALESCE(tackles_ast, 0) as tackles_ast,
-                COALESCE(sacks, 0) as sacks,
-                COALESCE(tackles_tfl, 0) as tackles_tfl,
-                COALESCE(interceptions, 0) as interceptions,
-                COALESCE(forced_fumbles, 0) as forced_fumbles,
-                COALESCE(fumble_recoveries, 0) as fumble_recoveries,
-                COALESCE(passes_defended, 0) as passes_defended,
-                COALESCE(qb_hits, 0) as qb_hits,
-                COALESCE(totalpoints, 0) as totalpoints,
-                rank
-            FROM {table_name}
-            ORDER BY totalpoints DESC
-        """
-    elif position == "QB":
-        query = f"""
-            SELECT 
-                playername,
-                playerid,
-                team,
-                COALESCE(passingyards, 0) as passingyards,
-                COALESCE(passingtds, 0) as passingtds,
-                COALESCE(interceptions, 0) as interceptions,
-                COALESCE(rushingyards, 0) as rushingyards,
-                COALESCE(rushingtds, 0) as rushingtds,
-                COALESCE(totalpoints, 0) as totalpoints
-            FROM {table_name}
-            ORDER BY totalpoints DESC
-        """
-    elif position == "RB":
-        query = f"""
-            SELECT 
-                playername,
-                playerid,
-                team,
-                COALESCE(rushingyards, 0) as rushingyards,
-                COALESCE(rushingtds, 0) as rushingtds,
-                COALESCE(receptions, 0) as receptions,
-                COALESCE(receivingyards, 0) as receivingyards,
-                COALESCE(receivingtds, 0) as receivingtds,
-                COALESCE(totalpoints, 0) as totalpoints,
-                rank
-            FROM {table_name}
-            ORDER BY totalpoints DESC
-        """
-    elif position in ["WR", "TE"]:
-        query = f"""
-            SELECT 
-                playername,
-                playerid,
-                team,
-                COALESCE(receptions, 0) as receptions,
-                COALESCE(targets, 0) as targets,
-                COALESCE(receivingyards, 0) as receivingyards,
-                COALESCE(receivingtds, 0) as receivingtds,
-                COALESCE(totalpoints, 0) as totalpoints,
-                rank
-            FROM {table_name}
-            ORDER BY totalpoints DESC
-        """
-    else:  # Kickers
-        query = f"""
-            SELECT 
-                playername,
-                playerid,
-                team,
-                COALESCE(fieldgoals, 0) as fieldgoals,
-                COALESCE(fieldgoalattempts, 0) as fieldgoalattempts,
-                COALESCE(extrapoints, 0) as extrapoints,
-                COALESCE(extrapointattempts, 0) as extrapointattempts,
-                COALESCE(totalpoints, 0) as totalpoints,
-                rank
-            FROM {table_name}
-            ORDER BY totalpoints DESC
-        """
-
     try:
-        # Read data into a pandas DataFrame using SQLAlchemy engine
-        df = pd.read_sql_query(query, engine)
-        
-        # Convert totalpoints to numeric, replacing any invalid values with 0
-        df['totalpoints'] = pd.to_numeric(df['totalpoints'], errors='coerce').fillna(0)
+        # Served from the cache until the loader publishes a new data version
+        df, summary, top_10 = load_position_stats(position, current_data_version())
         
         # Display the data
         st.dataframe(df)
         
         # Basic stats
         st.subheader("Summary Statistics")
-        st.write(df.describe())
+        st.write(summary)
         
         # Additional position-specific stats
-        if position in ["QB", "RB", "WR", "TE"]:
+        if POSITIONS[position].group == "Offense":
             st.subheader(f"Top 10 {position}s by Total Points")
-            top_10 = df.nlargest(10, 'totalpoints')[['playername', 'playerid', 'team', 'totalpoints']]
-            st.dataframe(top_10)
-        elif position in ["LB", "DL", "DB"]:
+            st.dataframe(top_10[['playername', 'playerid', 'team', 'totalpoints']])
+        elif POSITIONS[position].group == "Defense":
             st.subheader(f"Top 10 {position}s by Total Points")
-            top_10 = df.nlargest(10, 'totalpoints')[['playername', 'playerid', 'team', 'tackles', 'tackles_ast', 'sacks', 'tackles_tfl', 'interceptions', 'forced_fumbles', 'fumble_recoveries', 'passes_defended', 'qb_hits', 'totalpoints']]
-            st.dataframe(top_10)
+            stat_columns = [column.name for column in POSITIONS[position].stat_columns]
+            st.dataframe(top_10[['playername', 'playerid', 'team'] + stat_columns + ['totalpoints']])
         elif position == "K":
             st.subheader("Kicker Rankings")
             kicker_stats = df[['playername', 'playerid', 'team', 'totalpoints']]
@@ -191,20 +267,13 @@ else:
     st.sidebar.header("Available Tables")
     st.sidebar.markdown("""
     **Tables:**
-    - qb_stats
-    - rb_stats
-    - wr_stats
-    - te_stats
-    - lb_stats
-    - dl_stats
-    - db_stats
-    - k_stats
+""" + "\n".join(f"    - {position.table}" for position in POSITIONS.values()) + """
     
     **Procedures:**
     - get_team_player_stats(team_code)
     
     **Triggers:**
-    - Points calculation on QB/RB stats update
+    - Points calculation on stats update (scoring profile)
     """)
 
     # Example queries
@@ -224,8 +293,18 @@ else:
     with tab1:
         st.subheader("Custom SQL Query")
         query = st.text_area("Enter your SQL query:", height=150)
+        st.caption(
+            f"Queries run read-only, time out after {QUERY_STATEMENT_TIMEOUT_MS / 1000:g}s "
+            f"and return at most {QUERY_MAX_ROWS:,} rows."
+        )
+        
+        execute_col, cancel_col = st.columns([1, 6])
+        execute = execute_col.button("Execute Query")
+        cancel_col.button("Cancel", on_click=cancel_running_query)
+        if st.session_state.pop('query_cancelled', False):
+            st.warning("Query cancelled.")
         
-        if st.button("Execute Query"):
+        if execute:
             if query:
                 # Basic SQL injection prevention
                 if re.search(r'\b(DELETE|INSERT|UPDATE|DROP|CREATE|ALTER)\b', query, re.IGNORECASE):
@@ -234,15 +313,7 @@ else:
                     st.error("Only SELECT queries are allowed!")
                 else:
                     try:
-                        df = pd.read_sql_query(query, engine)
-                        st.success("Query executed successfully!")
-                        st.dataframe(df)
-                        st.info(f"Number of rows returned: {len(df)}")
-                        
-                        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-                        if not numeric_cols.empty:
-                            st.subheader("Summary Statistics for Numeric Columns")
-                            st.write(df[numeric_cols].describe())
+                        run_guarded_query(query)
                     except Exception as e:
                         st.error(f"Error executing query: {str(e)}")
             else:
@@ -256,84 +327,92 @@ else:
         st.write("This procedure shows all players and their points for a selected team.")
         team_code = st.selectbox("Select Team", ["KC", "SF", "DAL", "PHI", "BUF"])
         if st.button("Get Team Stats"):
-            conn = get_db_connection()
-            cur = conn.cursor()
-            try:
-                cur.execute("SELECT * FROM get_team_player_stats(%s)", (team_code,))
-                results = cur.fetchall()
-                if results:
-                    df = pd.DataFrame(results, columns=['Player Name', 'Position', 'Team', 'Points'])
-                    st.dataframe(df)
-                else:
-                    st.warning("No players found for this team")
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-            finally:
-                cur.close()
-                conn.close()
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute("SELECT * FROM get_team_player_stats(%s)", (team_code,))
+                    results = cur.fetchall()
+                    if results:
+                        df = pd.DataFrame(results, columns=['Player Name', 'Position', 'Team', 'Points'])
+                        st.dataframe(df)
+                    else:
+                        st.warning("No players found for this team")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+                finally:
+                    cur.close()
 
         # 2. Points Calculation Trigger
         st.subheader("2. Points Calculation Trigger")
-        st.write("""
-        This demonstrates how points are automatically calculated when player stats are updated.
-        The trigger will recalculate points based on the formula:
-        - QB Points = (PassingYards × 0.04) + (PassingTDs × 4) + (Interceptions × -2) + (RushingYards × 0.1) + (RushingTDs × 6)
-        """)
-
-        player_name = st.text_input("Enter QB Name (e.g., Patrick Mahomes)")
-        passing_yards = st.number_input("Passing Yards", min_value=0, value=3000)
-        passing_tds = st.number_input("Passing TDs", min_value=0, value=25)
-        interceptions = st.number_input("Interceptions", min_value=0, value=10)
-        rushing_yards = st.number_input("Rushing Yards", min_value=0, value=0)
-        rushing_tds = st.number_input("Rushing TDs", min_value=0, value=0)
-
-        if st.button("Update Stats & Calculate Points"):
-            conn = get_db_connection()
-            cur = conn.cursor()
-            try:
-                # Calculate points first
-                passing_points = round(passing_yards * 0.04, 2)
-                td_points = round(passing_tds * 4, 2)
-                int_points = round(interceptions * -2, 2)
-                rush_points = round(rushing_yards * 0.1, 2)
-                rush_td_points = round(rushing_tds * 6, 2)
-                total_points = round(passing_points + td_points + int_points + rush_points + rush_td_points, 2)
-
-                # Update stats and points
-                cur.execute("""
-                    UPDATE qb_stats 
-                    SET passingyards = %s, 
-                        passingtds = %s, 
-                        interceptions = %s,
-                        rushingyards = %s, 
-                        rushingtds = %s,
-                        totalpoints = %s
-                    WHERE playername = %s
-                    RETURNING playername, totalpoints;
-                """, (passing_yards, passing_tds, interceptions, rushing_yards, rushing_tds, total_points, player_name))
+        profile = installed_profile('QB', current_data_version())
+        if profile is None or not profile.scores('QB'):
+            st.warning("No points trigger is installed on qb_stats. Run "
+                       "`python src/create_procedures.py --positions QB ...` to score quarterbacks.")
+        else:
+            st.write(f"""
+            This demonstrates how points are automatically calculated when player stats are updated.
+            The trigger will recalculate points based on the {profile.name} scoring profile:
+            - QB Points = {profile.formula('QB')}
+            """)
+
+            player_name = st.text_input("Enter QB Name (e.g., Patrick Mahomes)")
+            passing_yards = st.number_input("Passing Yards", min_value=0, value=3000)
+            passing_tds = st.number_input("Passing TDs", min_value=0, value=25)
+            interceptions = st.number_input("Interceptions", min_value=0, value=10)
+            rushing_yards = st.number_input("Rushing Yards", min_value=0, value=0)
+            rushing_tds = st.number_input("Rushing TDs", min_value=0, value=0)
+
+            if st.button("Update Stats & Calculate Points"):
+                with pooled_connection() as conn:
+                    cur = conn.cursor()
+                    try:
+                        # Calculate points first, with the same weights as the trigger
+                        stats = {
+                            'passingyards': passing_yards,
+                            'passingtds': passing_tds,
+                            'interceptions': interceptions,
+                            'rushingyards': rushing_yards,
+                            'rushingtds': rushing_tds,
+                        }
+                        breakdown = "\n".join(
+                            f"- {column} ({stats[column]}): {value:g}"
+                            for column, value in profile.breakdown('QB', stats).items()
+                        )
+                        total_points = float(profile.points('QB', stats))
+
+                        # Update stats and points
+                        cur.execute("""
+                            UPDATE qb_stats 
+                            SET passingyards = %s, 
+                                passingtds = %s, 
+                                interceptions = %s,
+                                rushingyards = %s, 
+                                rushingtds = %s,
+                                totalpoints = %s
+                            WHERE playername = %s
+                            RETURNING playername, totalpoints;
+                        """, (passing_yards, passing_tds, interceptions, rushing_yards, rushing_tds, total_points, player_name))
                 
-                result = cur.fetchone()
-                if result:
-                    st.success(f"""
-                    ✅ Stats Updated Successfully!
-                    - Player: {result[0]}
-                    - New Points: {result[1]}
-                    
-                    Points Breakdown:
-                    - Passing Yards ({passing_yards}): {passing_points}
-                    - Passing TDs ({passing_tds}): {td_points}
-                    - Interceptions ({interceptions}): {int_points}
-                    - Rushing Yards ({rushing_yards}): {rush_points}
-                    - Rushing TDs ({rushing_tds}): {rush_td_points}
-                    - Total Points: {total_points}
-                    """)
-                    conn.commit()
-                else:
-                    st.warning("Player not found. Please check the name.")
+                        result = cur.fetchone()
+                        if result:
+                            st.success(
+                                f"✅ Stats Updated Successfully!\n"
+                                f"- Player: {result[0]}\n"
+                                f"- New Points: {result[1]}\n\n"
+                                f"Points Breakdown:\n{breakdown}\n"
+                                f"- Total Points: {total_points:g}"
+                            )
+                            refresh_profile_points(cur, ['QB'])
+                            refresh_all_players(cur)
+                            bump_data_version(cur)
+                            conn.commit()
+                            # Show the new points in this session without waiting for the TTL
+                            current_data_version.clear()
+                        else:
+                            st.warning("Player not found. Please check the name.")
                 
-            except Exception as e:
-                st.error(f"Error updating stats: {str(e)}")
-                conn.rollback()
-            finally:
-                cur.close()
-                conn.close()
\ No newline at end of file
+                    except Exception as e:
+                        st.error(f"Error updating stats: {str(e)}")
+                        conn.rollback()
+                    finally:
+                        cur.close()
\ No newline at end of file
@@ -1,27 +1,298 @@
+"""Combined deployment: the Flask API with the Streamlit dashboard behind it.
+
+Gunicorn serves ``application``. Requests under ``STREAMLIT_PATH`` are proxied
+to one long-lived Streamlit process (the sidecar), which gunicorn starts and
+stops through the hooks in ``config/gunicorn.conf.py``; everything else goes to
+the Flask app. Both processes read the same ``DATABASE_URL`` and ``DB_POOL_*``
+settings from the environment.
+
+Only gunicorn's gthread worker is supported: the WebSocket tunnel takes over
+the client socket and relies on how that worker closes a connection.
+"""
 import os
+import sys
+import socket
+import ipaddress
+import asyncio
+import subprocess
+import threading
+import logging
+import http.client
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from werkzeug.serving import run_simple
 from src.app import app as flask_app
-import streamlit.web.bootstrap
-import sys
-from werkzeug.wrappers import Response
 
-def run_streamlit():
-    """Run the Streamlit application"""
-    sys.argv = ["streamlit", "run", "src/streamlit_app.py"]
-    return streamlit.web.bootstrap.run()
+logger = logging.getLogger(__name__)
 
-def create_app():
-    """Create the WSGI application"""
-    def streamlit_handler(environ, start_response):
-        if environ['PATH_INFO'].startswith('/api/'):
-            return flask_app(environ, start_response)
-        return run_streamlit()(environ, start_response)
+# Where the dashboard is mounted, and where the sidecar listens
+STREAMLIT_PATH = '/' + os.environ.get('STREAMLIT_PATH', '/dashboard').strip('/')
+STREAMLIT_HOST = os.environ.get('STREAMLIT_HOST', '127.0.0.1')
+STREAMLIT_PORT = int(os.environ.get('STREAMLIT_PORT', 8501))
+STREAMLIT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
+PROXY_TIMEOUT = float(os.environ.get('PROXY_TIMEOUT', 30))
+
+# Per-hop headers that must not be forwarded (RFC 9110, section 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade',
+}
+
+_sidecar = None
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def check_worker_class(worker_class):
+    """Raise RuntimeError unless ``worker_class`` is gunicorn's gthread worker"""
+    from gunicorn.workers.gthread import ThreadWorker
+    if not issubclass(worker_class, ThreadWorker):
+        raise RuntimeError(
+            f"The dashboard proxy needs gunicorn's gthread worker, not {worker_class.__name__}; "
+            "set GUNICORN_WORKER_CLASS=gthread or STREAMLIT_SIDECAR=false"
+        )
+
+def start_streamlit():
+    """Start the Streamlit sidecar once for the whole deployment"""
+    global _sidecar
+    if _sidecar is not None and _sidecar.poll() is None:
+        return _sidecar
+    # Only the proxy may reach the sidecar, so it keeps Streamlit's CORS and XSRF
+    # protection and must not listen on a public address
+    if not is_loopback(STREAMLIT_HOST):
+        raise RuntimeError(f"STREAMLIT_HOST must be a loopback address, not {STREAMLIT_HOST!r}")
+    command = [
+        sys.executable, '-m', 'streamlit', 'run', STREAMLIT_SCRIPT,
+        '--server.address', STREAMLIT_HOST,
+        '--server.port', str(STREAMLIT_PORT),
+        '--server.baseUrlPath', STREAMLIT_PATH.strip('/'),
+        '--server.headless', 'true',
+    ]
+    logger.info(f"Starting Streamlit sidecar on {STREAMLIT_HOST}:{STREAMLIT_PORT}{STREAMLIT_PATH}")
+    _sidecar = subprocess.Popen(command, env=os.environ.copy())
+    return _sidecar
+
+def stop_streamlit(timeout=10):
+    """Stop the Streamlit sidecar if this process started it"""
+    global _sidecar
+    if _sidecar is None:
+        return
+    if _sidecar.poll() is None:
+        logger.info("Stopping Streamlit sidecar")
+        _sidecar.terminate()
+        try:
+            _sidecar.wait(timeout)
+        except subprocess.TimeoutExpired:
+            _sidecar.kill()
+    _sidecar = None
+
+def _request_headers(environ):
+    """Request headers from a WSGI environ, as (name, value) pairs"""
+    headers = []
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            headers.append((key[5:].replace('_', '-').title(), value))
+    for key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+        if environ.get(key):
+            headers.append((key.replace('_', '-').title(), environ[key]))
+    return headers
+
+def _request_target(environ):
+    # The dispatcher moves the mount point to SCRIPT_NAME; Streamlit expects it back
+    path = environ.get('SCRIPT_NAME', '') + environ.get('PATH_INFO', '')
+    query = environ.get('QUERY_STRING')
+    return f"{path}?{query}" if query else path
+
+class WebSocketRelay:
+    """Relays tunnelled WebSocket connections on one event loop thread per worker process.
+
+    An open dashboard session costs two sockets on the loop rather than a
+    gunicorn thread, so any number of them leave the API's threads free.
+    """
+
+    def __init__(self, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        # The loop only keeps weak references to tasks; idle relays would be collected
+        self._relays = set()
+        self._loop = None
+        self._pid = None
+
+    def _running_loop(self):
+        with self._lock:
+            # Threads do not survive a fork, so each worker starts its own loop
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='websocket-relay', daemon=True).start()
+                self._pid = os.getpid()
+            return self._loop
 
-    return streamlit_handler
+    def relay(self, client, upstream):
+        """Take over both connected sockets and relay between them until either side closes"""
+        asyncio.run_coroutine_threadsafe(self._relay(client, upstream), self._running_loop())
+
+    @property
+    def connections(self):
+        return len(self._relays)
+
+    async def _relay(self, client, upstream):
+        task = asyncio.current_task()
+        self._relays.add(task)
+        writers = []
+        try:
+            client_reader, client_writer = await asyncio.open_connection(sock=client)
+            writers.append(client_writer)
+            upstream_reader, upstream_writer = await asyncio.open_connection(sock=upstream)
+            writers.append(upstream_writer)
+            pipes = [asyncio.ensure_future(self._pipe(client_reader, upstream_writer)),
+                     asyncio.ensure_future(self._pipe(upstream_reader, client_writer))]
+            await asyncio.wait(pipes, return_when=asyncio.FIRST_COMPLETED)
+            for pipe in pipes:
+                pipe.cancel()
+        except OSError as e:
+            logger.debug(f"Dashboard WebSocket closed: {str(e)}")
+        finally:
+            self._relays.discard(task)
+            for writer in writers:
+                writer.close()
+            # Sockets not yet wrapped in a stream
+            for sock in (client, upstream)[len(writers):]:
+                sock.close()
+
+    async def _pipe(self, reader, writer):
+        while True:
+            data = await reader.read(self.chunk_size)
+            if not data:
+                return
+            writer.write(data)
+            await writer.drain()
+
+class StreamlitProxy:
+    """WSGI reverse proxy to the Streamlit sidecar.
+
+    Plain HTTP requests reuse one keep-alive upstream connection per thread.
+    WebSocket upgrades (Streamlit's ``/_stcore/stream``) are tunnelled on the
+    client socket, which gunicorn exposes as ``gunicorn.socket``. After the
+    handshake is sent upstream, both sockets go to a ``WebSocketRelay`` and the
+    worker thread returns to serving requests.
+    """
+
+    def __init__(self, host=STREAMLIT_HOST, port=STREAMLIT_PORT, timeout=PROXY_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.relay = WebSocketRelay()
+        self._local = threading.local()
+
+    def __call__(self, environ, start_response):
+        if environ.get('HTTP_UPGRADE', '').lower() == 'websocket':
+            return self.tunnel(environ, start_response)
+        try:
+            return self.forward(environ, start_response)
+        except (OSError, http.client.HTTPException) as e:
+            logger.error(f"Streamlit sidecar unavailable: {str(e)}")
+            start_response('502 Bad Gateway', [('Content-Type', 'text/plain')])
+            return [b'Dashboard is starting or unavailable, please retry shortly.']
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def forward(self, environ, start_response):
+        """Proxy one HTTP request and stream the response back"""
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else None
+        headers = {
+            name: value for name, value in _request_headers(environ)
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        headers['X-Forwarded-For'] = environ.get('REMOTE_ADDR', '')
+        headers['X-Forwarded-Proto'] = environ.get('wsgi.url_scheme', 'http')
+        target = _request_target(environ)
+
+        # A kept-alive connection may have been closed upstream; retry once on a new one
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(environ['REQUEST_METHOD'], target, body=body, headers=headers)
+                response = conn.getresponse()
+                break
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                self._drop_connection()
+                if attempt:
+                    raise
+
+        start_response(f"{response.status} {response.reason}", [
+            (name, value) for name, value in response.getheaders()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        ])
+        return self._stream(response)
+
+    def _stream(self, response, chunk_size=64 * 1024):
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            response.close()
+            if response.will_close:
+                self._drop_connection()
+
+    def tunnel(self, environ, start_response):
+        """Relay a WebSocket connection between the client and the sidecar"""
+        client = environ.get('gunicorn.socket')
+        if client is None:
+            start_response('501 Not Implemented', [('Content-Type', 'text/plain')])
+            return [b'WebSocket proxying requires gunicorn.']
+        try:
+            upstream = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            logger.error(f"Streamlit sidecar unavailable: {str(e)}")
+            start_response('502 Bad Gateway', [('Content-Type', 'text/plain')])
+            return [b'Dashboard is starting or unavailable, please retry shortly.']
+
+        # Replay the handshake upstream as-is; the sidecar answers the client directly
+        lines = [f"{environ['REQUEST_METHOD']} {_request_target(environ)} HTTP/1.1"]
+        lines += [f"{name}: {value}" for name, value in _request_headers(environ)]
+        try:
+            upstream.sendall(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+            # The relay keeps its own descriptor of the client connection, so
+            # gunicorn closing its socket below leaves the connection open
+            self.relay.relay(client.dup(), upstream)
+        except OSError:
+            upstream.close()
+            raise
+        # gthread workers treat StopIteration as "close this connection": they
+        # close their descriptor without writing a response of its own.
+        # check_worker_class refuses to start any other worker with the sidecar.
+        raise StopIteration("WebSocket handed to the relay")
+
+def create_app():
+    """Create the WSGI application: the API at /, the dashboard at STREAMLIT_PATH"""
+    return DispatcherMiddleware(flask_app, {STREAMLIT_PATH: StreamlitProxy()})
 
 application = create_app()
 
 if __name__ == '__main__':
+    # Development server: proxies plain HTTP only, open the sidecar port for the dashboard itself
     port = int(os.environ.get('PORT', 5000))
-    run_simple('0.0.0.0', port, application, use_reloader=True)
+    start_streamlit()
+    try:
+        run_simple('0.0.0.0', port, application, threaded=True)
+    finally:
+        stop_streamlit()
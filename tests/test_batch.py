@@ -0,0 +1,94 @@
+import pytest
+
+import src.app as api
+from src.local_store import LocalStore
+
+@pytest.fixture(scope='module')
+def store():
+    return LocalStore()
+
+@pytest.fixture
+def client(monkeypatch, store):
+    """The API served from the season files, with fresh caches"""
+    monkeypatch.setattr(api, 'backend', store)
+    monkeypatch.setattr(api, 'data_version', api.DataVersion())
+    monkeypatch.setattr(api, 'players_cache', api.ResponseCache())
+    monkeypatch.setattr(api, 'search_index', api.SearchIndexCache())
+    api.cached_profile_names.cache_clear()
+    yield api.app.test_client()
+    api.cached_profile_names.cache_clear()
+
+def batch(client, *requests):
+    response = client.post('/api/batch', json={'requests': list(requests)})
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+@pytest.mark.parametrize('body', [
+    None,
+    [],
+    {},
+    {'requests': []},
+    {'requests': {'type': 'teams'}},
+    {'requests': [{'type': 'teams'}] * (api.BATCH_MAX_REQUESTS + 1)},
+])
+def test_malformed_body(client, body):
+    response = client.post('/api/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad Request'
+
+@pytest.mark.parametrize('sub, message', [
+    ('teams', 'JSON object'),
+    ({}, 'type must be one of'),
+    ({'type': 'roster'}, 'type must be one of'),
+    ({'type': 'players', 'position': 'XX'}, 'Position must be one of'),
+    ({'type': 'players', 'position': 'QB', 'profile': 'nope'}, 'profile must be one of'),
+    ({'type': 'team'}, 'team is required'),
+    ({'type': 'team', 'team': 7}, 'team is required'),
+    ({'type': 'player_ids', 'ids': []}, 'non-empty list'),
+    ({'type': 'player_ids', 'ids': ['1', 2]}, 'non-empty list'),
+    ({'type': 'player_ids', 'ids': ['1'] * (api.MAX_PAGE_SIZE + 1)}, 'At most'),
+    ({'type': 'search', 'name': '  '}, 'name is required'),
+    ({'type': 'search', 'name': 'allen', 'position': 'XX'}, 'Invalid position'),
+    ({'type': 'search', 'name': 'allen', 'limit': True}, 'limit must be an integer'),
+    ({'type': 'search', 'name': 'allen', 'limit': 0}, 'limit must be an integer'),
+    ({'type': 'search', 'name': 'allen', 'limit': '5'}, 'limit must be an integer'),
+    ({'type': 'search', 'name': 'allen', 'limit': api.MAX_PAGE_SIZE + 1}, 'limit must be an integer'),
+])
+def test_invalid_subrequest_is_a_400_result(client, sub, message):
+    # The batch itself succeeds; only the bad sub-request fails
+    invalid, valid = batch(client, sub, {'type': 'teams'})
+    assert invalid['status'] == 400 and message in invalid['body']['message']
+    assert valid['status'] == 200
+
+def test_mixed_requests_come_back_in_order(client):
+    results = batch(
+        client,
+        {'type': 'players', 'position': 'QB', 'id': 'qbs'},
+        {'type': 'team', 'team': 'KC'},
+        {'type': 'team', 'team': 'ZZZ'},
+        {'type': 'nope'},
+        {'type': 'teams'},
+        {'type': 'player_ids', 'ids': ['2560757', 'unknown']},
+        {'type': 'search', 'name': 'mahomes', 'limit': 1},
+    )
+    assert [(result['id'], result['status']) for result in results] == [
+        ('qbs', 200), (1, 200), (2, 404), (3, 400), (4, 200), (5, 200), (6, 200),
+    ]
+    players, team, _, _, teams, by_id, search = (result['body'] for result in results)
+    assert {player['team'] for player in team} == {'KC'}
+    assert [player['playerid'] for player in by_id] == ['2560757']
+    assert [player['playername'] for player in search] == ['Patrick Mahomes']
+    # Each body is what the matching GET endpoint returns
+    assert players == client.get('/api/players/QB').get_json()
+    assert teams == client.get('/api/teams').get_json()
+    assert team == client.get('/api/teams/KC/players').get_json()
+
+def test_profiles_apply_per_subrequest(client):
+    standard, ppr = batch(
+        client,
+        {'type': 'players', 'position': 'WR', 'profile': 'standard'},
+        {'type': 'players', 'position': 'WR', 'profile': 'ppr'},
+    )
+    assert standard['status'] == ppr['status'] == 200
+    points = lambda body: {player['playerid']: player['totalpoints'] for player in body}
+    assert points(standard['body']) != points(ppr['body'])
@@ -0,0 +1,81 @@
+import base64
+import json
+
+import pytest
+
+from src.app import InvalidParameter, decode_cursor, encode_cursor
+from src.schema import POSITIONS
+
+@pytest.mark.parametrize('value', [3928, 311.7, -0.84, 0, None])
+def test_round_trip(value):
+    cursor = encode_cursor('totalpoints', 'desc', value, '2558125')
+    assert decode_cursor(cursor, 'totalpoints', 'desc', 'NUMERIC') == (value, '2558125')
+
+def test_value_takes_the_column_type():
+    value, _ = decode_cursor(encode_cursor('rank', 'asc', 12, '1'), 'rank', 'asc', 'INTEGER')
+    assert value == 12 and type(value) is int
+    value, _ = decode_cursor(encode_cursor('sacks', 'asc', 12, '1'), 'sacks', 'asc', 'NUMERIC')
+    assert value == 12.0 and type(value) is float
+
+def test_null_is_not_the_string_none():
+    cursor = encode_cursor('rank', 'asc', None, '1')
+    assert decode_cursor(cursor, 'rank', 'asc', 'INTEGER')[0] is None
+    with pytest.raises(InvalidParameter, match='Malformed cursor'):
+        decode_cursor(encode_cursor('rank', 'asc', 'None', '1'), 'rank', 'asc', 'INTEGER')
+
+def test_round_trip_with_profile():
+    cursor = encode_cursor('rank', 'asc', 12, '1', 'half_ppr')
+    assert decode_cursor(cursor, 'rank', 'asc', 'INTEGER', 'half_ppr') == (12, '1')
+    with pytest.raises(InvalidParameter, match='scoring profile'):
+        decode_cursor(cursor, 'rank', 'asc', 'INTEGER')
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor('totalpoints', 'desc', 'x' * 50, '?/+&=' * 5)
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+
+@pytest.mark.parametrize('sort, order', [('rank', 'asc'), ('totalpoints', 'asc')])
+def test_cursor_is_tied_to_its_sort_order(sort, order):
+    cursor = encode_cursor('totalpoints', 'desc', 1, '1')
+    with pytest.raises(InvalidParameter, match='sort order'):
+        decode_cursor(cursor, sort, order, 'NUMERIC')
+
+def raw_cursor(*fields):
+    return base64.urlsafe_b64encode(json.dumps(fields).encode()).decode()
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    encode_cursor('rank', 'asc', 1, '1')[:-4],
+    # Well-formed JSON holding the wrong types
+    encode_cursor('rank', 'asc', 1, 1),
+    raw_cursor('rank', 'asc', [1], '1'),
+    raw_cursor('rank', 'asc', '1'),
+    # Values the rank column's INTEGER type cannot hold
+    encode_cursor('rank', 'asc', 'abc', '1'),
+    encode_cursor('rank', 'asc', '1.5', '1'),
+    encode_cursor('rank', 'asc', 2 ** 31, '1'),
+    encode_cursor('rank', 'asc', '', '1'),
+])
+def test_malformed_cursor(cursor):
+    with pytest.raises(InvalidParameter, match='Malformed cursor'):
+        decode_cursor(cursor, 'rank', 'asc', 'INTEGER')
+
+@pytest.mark.parametrize('value', ['abc', 'nan', 'inf', '-Infinity', '1e400'])
+def test_malformed_numeric_value(value):
+    cursor = encode_cursor('totalpoints', 'desc', value, '1')
+    with pytest.raises(InvalidParameter, match='Malformed cursor'):
+        decode_cursor(cursor, 'totalpoints', 'desc', 'NUMERIC')
+
+def test_page_past_a_null_sort_value():
+    query, params = POSITIONS['WR'].page_query(
+        ('playername',), 'totalpoints', True, (None, '123'), 25)
+    assert 'WHERE totalpoints IS NULL AND playerid < %s' in query
+    assert 'ORDER BY totalpoints DESC NULLS LAST, playerid DESC' in query
+    assert params == ('123', 25)
+
+def test_page_past_a_value_keeps_the_null_rows():
+    query, params = POSITIONS['WR'].page_query(
+        ('playername',), 'totalpoints', False, ('1.5', '123'), 25, 'ppr')
+    assert 'totalpoints IS NULL OR (totalpoints, playerid) > (%s::NUMERIC, %s)' in query
+    assert params == ('ppr', '1.5', '123', 25)
+    first, params = POSITIONS['WR'].page_query(('playername',), 'totalpoints', False, None, 25)
+    assert 'WHERE' not in first and params == (25,)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from src.database import iter_json_records
+
+RECORDS = [
+    {'PlayerId': '1', 'PlayerName': 'Patrick Mahomes', 'Team': 'KC', 'PassingYards': 3928},
+    {'PlayerId': '2', 'PlayerName': "Ja'Marr \"Chase\"", 'Notes': 'ends in \\', 'Splits': [[1, 2], {'wk': [3]}]},
+    {'PlayerId': '3', 'PlayerName': 'Brackets ] } [ { and , in a string', 'Nested': {'a': {'b': {'c': []}}}},
+    {'PlayerId': '4', 'PlayerName': 'Aaron Rodgers é–', 'TotalPoints': -1.5e-3},
+    42,
+    'plain string',
+]
+
+def write(tmp_path, text, name='season.json'):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def records(path, chunk_size):
+    return list(iter_json_records(path, chunk_size=chunk_size))
+
+@pytest.mark.parametrize('text', [
+    json.dumps(RECORDS),
+    json.dumps(RECORDS, indent=2),
+    json.dumps(RECORDS, ensure_ascii=False),
+    '\n\n   ' + json.dumps(RECORDS, separators=(',', ':')) + '\n',
+])
+def test_array_across_every_chunk_boundary(tmp_path, text):
+    path = write(tmp_path, text)
+    # Every chunk size splits the records, strings and escapes somewhere different
+    for chunk_size in range(1, len(text) + 2):
+        assert records(path, chunk_size) == RECORDS, chunk_size
+
+def test_empty_array(tmp_path):
+    assert records(write(tmp_path, ' [ ] '), 1) == []
+    assert records(write(tmp_path, '[]'), 64) == []
+
+def test_newline_delimited(tmp_path):
+    text = '\n'.join(json.dumps(record) for record in RECORDS) + '\n\n'
+    path = write(tmp_path, '\n' + text, 'season.ndjson')
+    for chunk_size in (1, 7, 64 * 1024):
+        assert records(path, chunk_size) == RECORDS
+
+def test_newline_delimited_error_names_the_line(tmp_path):
+    path = write(tmp_path, '{"PlayerId": "1"}\n{"PlayerId": \n', 'season.ndjson')
+    with pytest.raises(ValueError, match='season.ndjson line 2'):
+        records(path, 64)
+
+@pytest.mark.parametrize('text', [
+    '[{"PlayerId": "1"}, {"PlayerId": "2"',
+    '[{"PlayerId": "1"}, {"PlayerName": "unterminated',
+    '[{"PlayerId": "1"},',
+    '[{"PlayerId": "1"}',
+    '[1, 23',
+    '[',
+])
+def test_truncated_array_raises(tmp_path, text):
+    path = write(tmp_path, text)
+    for chunk_size in range(1, len(text) + 2):
+        with pytest.raises(ValueError):
+            records(path, chunk_size)
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+from src.database import ConnectionPool, PoolTimeout
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    def fetchone(self):
+        return (1,)
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.in_transaction = False
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+def make_pool(**kwargs):
+    settings = {'min_size': 0, 'max_size': 2, 'timeout': 1, 'idle_check': 60, 'max_age': 3600}
+    return ConnectionPool(connect=FakeConnection, **{**settings, **kwargs})
+
+def test_checkout_and_return_reuses_the_connection():
+    pool = make_pool()
+    conn = pool.getconn()
+    assert pool.stats()['in_use'] == 1
+    pool.putconn(conn)
+    assert pool.stats()['idle'] == 1 and pool.stats()['in_use'] == 0
+    assert pool.getconn() is conn
+    stats = pool.stats()
+    assert stats['checkouts'] == 2 and stats['connections_opened'] == 1
+
+def test_min_size_connections_are_opened_up_front():
+    pool = make_pool(min_size=2)
+    assert pool.stats()['idle'] == 2 and pool.stats()['connections_opened'] == 2
+
+def test_connection_block_returns_the_connection_on_error():
+    pool = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.in_transaction = True
+            raise RuntimeError
+    assert pool.stats()['in_use'] == 0
+    # The open transaction was rolled back before the connection went idle
+    assert not conn.in_transaction and conn.rollbacks == 1
+
+def test_exhausted_pool_times_out():
+    pool = make_pool(max_size=1)
+    pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()['timeouts'] == 1 and pool.stats()['size'] == 1
+
+def test_waiter_gets_the_returned_connection():
+    pool = make_pool(max_size=1)
+    conn = pool.getconn()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(pool.getconn(timeout=5)))
+    waiter.start()
+    while pool.stats()['waiting'] == 0:
+        time.sleep(0.01)
+    pool.putconn(conn)
+    waiter.join(5)
+    assert received == [conn]
+
+def test_discarded_connection_frees_its_slot():
+    pool = make_pool(max_size=1)
+    conn = pool.getconn()
+    pool.putconn(conn, discard=True)
+    assert conn.closed
+    replacement = pool.getconn(timeout=0.05)
+    assert replacement is not conn and pool.stats()['connections_closed'] == 1
+
+def test_foreign_connection_is_refused():
+    pool = make_pool()
+    with pytest.raises(ValueError):
+        pool.putconn(FakeConnection())
+
+def test_old_connections_are_recycled():
+    pool = make_pool(max_age=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is not conn
+    assert conn.closed and pool.stats()['recycled'] == 1
+
+def test_stale_connection_is_replaced_on_checkout():
+    pool = make_pool(idle_check=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    stats = pool.stats()
+    assert stats['validations'] == 1 and stats['failed_validations'] == 1
+
+def test_closed_pool_refuses_checkouts():
+    pool = make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    pool.close()
+    assert conn.closed
+    with pytest.raises(Exception, match='closed'):
+        pool.getconn()
+
+@pytest.mark.parametrize('min_size, max_size', [(0, 0), (-1, 2), (3, 2)])
+def test_invalid_sizes(min_size, max_size):
+    with pytest.raises(ValueError):
+        make_pool(min_size=min_size, max_size=max_size)
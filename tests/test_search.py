@@ -0,0 +1,56 @@
+from src.search import PlayerSearchIndex, normalize
+
+PLAYERS = [
+    {'position': 'QB', 'playerid': '1', 'playername': 'Patrick Mahomes', 'totalpoints': 300},
+    {'position': 'QB', 'playerid': '2', 'playername': 'Josh Allen', 'totalpoints': 400},
+    {'position': 'LB', 'playerid': '3', 'playername': 'Josh Allen', 'totalpoints': 100},
+    {'position': 'WR', 'playerid': '4', 'playername': "Ja'Marr Chase", 'totalpoints': 311.7},
+    {'position': 'WR', 'playerid': '5', 'playername': 'Keenan Allen', 'totalpoints': 150},
+    {'position': 'TE', 'playerid': '6', 'playername': 'Tyler Vallen', 'totalpoints': 500},
+    {'position': 'RB', 'playerid': '7', 'playername': 'Alen Smith', 'totalpoints': 600},
+    {'position': 'QB', 'playerid': '8', 'playername': 'Dak Prescott', 'totalpoints': 120},
+]
+
+def search(query, **kwargs):
+    return [(player['playerid'], player['score'])
+            for player in PlayerSearchIndex(PLAYERS).search(query, **kwargs)]
+
+def test_normalize():
+    assert normalize("Ja'Marr  Chase") == 'jamarr chase'
+    assert normalize('Patrick Mahómes') == 'patrick mahomes'
+    assert normalize(None) == ''
+
+def test_prefix_then_substring_then_fuzzy():
+    ids = [playerid for playerid, _ in search('allen')]
+    # Prefix matches by points, then the substring match, then the misspelling
+    assert ids == ['2', '5', '3', '6', '7']
+    scores = dict(search('allen'))
+    assert scores['2'] == 1.0 and scores['6'] == 0.9
+    assert 0 < scores['7'] < 0.9
+
+def test_every_query_word_must_prefix_a_name_word():
+    assert search('josh al') == [('2', 1.0), ('3', 1.0)]
+    assert search('pat mah') == [('1', 1.0)]
+
+def test_typo_tolerance():
+    assert [playerid for playerid, _ in search('mahomse')] == ['1']
+    assert [playerid for playerid, _ in search('presscott')] == ['8']
+    assert search('kenan allen')[0][0] == '5'
+    assert search('xyzzy') == []
+
+def test_punctuation_and_accents_are_ignored():
+    assert search('jamarr') == [('4', 1.0)]
+    assert search('MAHÓMES') == [('1', 1.0)]
+
+def test_short_queries_only_match_prefixes():
+    assert [playerid for playerid, _ in search('ke')] == ['5']
+    assert search('') == []
+
+def test_position_filter_and_limit():
+    assert search('allen', position='LB') == [('3', 1.0)]
+    assert [playerid for playerid, _ in search('allen', limit=2)] == ['2', '5']
+
+def test_results_keep_player_fields():
+    index = PlayerSearchIndex(PLAYERS, version=7)
+    assert index.version == 7 and len(index) == len(PLAYERS)
+    assert index.search('chase')[0] == {**PLAYERS[3], 'score': 1.0}
@@ -0,0 +1,31 @@
+import pytest
+
+from src.database import single_statement
+
+@pytest.mark.parametrize('query, expected', [
+    ('SELECT 1', 'SELECT 1'),
+    (' SELECT 1 ;  -- done\n', 'SELECT 1'),
+    ("SELECT ';' AS s;", "SELECT ';' AS s"),
+    ("SELECT 'it''s; fine'", "SELECT 'it''s; fine'"),
+    ('SELECT 1 AS ";x"', 'SELECT 1 AS ";x"'),
+    ('SELECT $$a;b$$', 'SELECT $$a;b$$'),
+    ('SELECT $tag$ ; $$ ; $tag$;', 'SELECT $tag$ ; $$ ; $tag$'),
+    ("SELECT E'\\'; DROP TABLE x; --'", "SELECT E'\\'; DROP TABLE x; --'"),
+    ('SELECT 1 /* ; /* ; */ ; */', 'SELECT 1 /* ; /* ; */ ; */'),
+    ('SELECT 1 -- ; DROP TABLE x', 'SELECT 1 -- ; DROP TABLE x'),
+])
+def test_single_statement(query, expected):
+    assert single_statement(query) == expected
+
+@pytest.mark.parametrize('query', [
+    'SELECT 1; COMMIT; TRUNCATE qb_stats CASCADE',
+    'SELECT 1;;',
+    'SELECT 1; SELECT 2',
+    "SELECT 'a'; DROP TABLE x",
+    "SELECT 'it\\'; DROP TABLE x",
+    'SELECT $$a$$; DROP TABLE x',
+    'SELECT 1 /* c */; /* c */ DROP TABLE x',
+])
+def test_stacked_statements_are_rejected(query):
+    with pytest.raises(ValueError, match='single SQL statement'):
+        single_statement(query)
@@ -0,0 +1,113 @@
+"""Incremental sync against a scratch database.
+
+Set TEST_DATABASE_URL to a database these tests may drop and recreate every
+table in; they are skipped without it.
+"""
+import json
+import os
+import shutil
+
+import psycopg2
+import pytest
+
+from src.database import DATA_DIR, DB_SSLMODE, create_tables, get_data_version, sync_data
+from src.schema import POSITIONS
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+FILES = ['teams.json'] + [position.filename for position in POSITIONS.values()]
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in FILES:
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path)
+    return str(tmp_path)
+
+@pytest.fixture
+def conn():
+    conn = psycopg2.connect(TEST_DATABASE_URL, sslmode=DB_SSLMODE)
+    create_tables(conn)
+    yield conn
+    conn.rollback()
+    conn.close()
+
+def query(conn, sql, *params):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.rollback()
+
+def data_version(conn):
+    cur = conn.cursor()
+    try:
+        return get_data_version(cur)
+    finally:
+        cur.close()
+        conn.rollback()
+
+def edit_records(data_dir, filename, edit):
+    path = os.path.join(data_dir, filename)
+    with open(path) as f:
+        records = json.load(f)
+    records = edit(records)
+    # Indented, so the file's bytes change even when its records do not
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=2)
+    return records
+
+def test_first_sync_writes_every_file(conn, data_dir):
+    results = sync_data(conn, data_dir=data_dir)
+    assert all(results[name] is not None for name in FILES)
+    qb = results['QB_season.json']
+    assert qb['updated'] == qb['deleted'] == qb['unchanged'] == 0
+    assert query(conn, "SELECT COUNT(*) FROM qb_stats")[0][0] == qb['inserted'] > 0
+
+def test_unchanged_files_are_skipped(conn, data_dir):
+    sync_data(conn, data_dir=data_dir)
+    version = data_version(conn)
+    results = sync_data(conn, data_dir=data_dir)
+    assert results == dict.fromkeys(FILES)
+    # Nothing was written, so cached responses stay valid
+    assert data_version(conn) == version
+
+def test_changed_file_writes_only_the_changed_players(conn, data_dir):
+    sync_data(conn, data_dir=data_dir)
+    version = data_version(conn)
+
+    def edit(records):
+        records[0] = dict(records[0], PassingYDS='5000')
+        added = dict(records[2], PlayerId='9999999', PlayerName='New Player')
+        return records[:1] + records[2:] + [added]
+    records = edit_records(data_dir, 'QB_season.json', edit)
+    changed_id = records[0]['PlayerId']
+
+    results = sync_data(conn, data_dir=data_dir)
+    assert results['QB_season.json'] == {
+        'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': len(records) - 2,
+    }
+    assert all(results[name] is None for name in FILES if name != 'QB_season.json')
+    assert query(conn, "SELECT passingyards FROM qb_stats WHERE playerid = %s", changed_id) == [(5000,)]
+    assert query(conn, "SELECT COUNT(*) FROM qb_stats")[0][0] == len(records)
+    assert data_version(conn) > version
+
+def test_reformatted_file_is_reread_but_rewrites_nothing(conn, data_dir):
+    sync_data(conn, data_dir=data_dir)
+    version = data_version(conn)
+    # New bytes, so the file is re-read, but every converted row is the same
+    records = edit_records(data_dir, 'K_season.json', lambda records: records)
+    results = sync_data(conn, data_dir=data_dir)
+    assert results['K_season.json'] == {
+        'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': len(records),
+    }
+    assert data_version(conn) == version
+
+def test_force_rewrites_every_player(conn, data_dir):
+    sync_data(conn, data_dir=data_dir)
+    results = sync_data(conn, force=True, data_dir=data_dir)
+    qb = results['QB_season.json']
+    assert qb['inserted'] == qb['unchanged'] == 0 and qb['updated'] > 0